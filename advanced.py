@@ -1,13 +1,19 @@
-from dash import html, dcc, Input, Output
-import plotly.express as px
+from dash import html, dcc, Input, Output, callback_context
+from dash.exceptions import PreventUpdate
 import plotly.graph_objects as go
-from utils import df, volatility, calculate_metrics
+from flask import has_request_context
+import dataset
+import renderizacao
+from utils import calculate_metrics
+from payload import binario
+from config import LIMITE_PONTOS_DENSIDADE
+from densidade import extensao_visivel, recortar, figura_densidade
 import pandas as pd
 
 def layout():
     return html.Div([
         html.H1('Análise Avançada', className='text-4xl font-bold text-blue-400 mb-6'),
-        html.Button('Exportar Dados', id='export-button', className='neon-button text-white font-bold py-2 px-4 rounded mb-4'),
+        html.Button('Exportar Dados', id={'type': 'export-button', 'index': 'advanced'}, className='neon-button text-white font-bold py-2 px-4 rounded mb-4'),
         html.H2('Correlação entre Variáveis', className='text-xl font-semibold mb-2 text-blue-300'),
         html.Div(className='loading-spinner', id='loading-correlation', style={'display': 'none'}),
         dcc.Graph(id='correlation-heatmap'),
@@ -31,50 +37,51 @@ def register_callbacks(app):
          Output('volatility-analysis', 'figure'),
          Output('movement-magnitude', 'figure'),
          Output('sequence-analysis', 'figure'),
-         Output('error-vs-movement', 'figure'),
          Output('loading-correlation', 'style'),
          Output('loading-volatility', 'style'),
          Output('loading-movement', 'style'),
-         Output('loading-sequences', 'style'),
-         Output('loading-error-vs-movement', 'style')],
+         Output('loading-sequences', 'style')],
         [Input('error-type', 'value')]
     )
+    @binario
     def update_advanced(error_type):
+        import plotly.express as px
+        snapshot = dataset.atual()
+        df = snapshot.df
         corr_matrix = df[['valor_real', 'previsao', 'previsao_com_delta']].corr()
         corr_fig = px.imshow(corr_matrix, text_auto=True, title='Correlação entre Variáveis',
                              template='plotly_dark', color_continuous_scale='Plasma')
 
+        # Volatilidade por par (acumuladores Welford), normalizada pelo preço médio do par
+        # para que pares com escalas diferentes possam ser comparados e combinados
+        volatility = snapshot.volatility_acc.consultar(por=['par', 'hour', 'day_of_week'])
+        volatility['volatility'] = volatility['volatility'] / volatility['media'] * 100
+        volatility = volatility.groupby(['hour', 'day_of_week'])['volatility'].mean().reset_index()
         volatility_fig = px.scatter(
-            volatility,
+            volatility.dropna(),
             x='hour',
             y='day_of_week',
             size='volatility',
             color='volatility',
             title='Volatilidade por Hora e Dia',
-            labels={'hour': 'Hora', 'day_of_week': 'Dia da Semana', 'volatility': 'Volatilidade'},
+            labels={'hour': 'Hora', 'day_of_week': 'Dia da Semana', 'volatility': 'Volatilidade (%)'},
             template='plotly_dark',
             color_continuous_scale='Plasma',
             hover_data={'volatility': ':.2f'}
         )
 
-        bins = pd.qcut(df['movement_magnitude'], q=4, duplicates='drop')
-        movement_metrics = df.groupby(bins, observed=True).agg({
-            'acerto_sem_delta': 'mean',
-            'acerto_com_delta': 'mean'
-        }).reset_index()
-        movement_metrics['acerto_sem_delta'] = movement_metrics['acerto_sem_delta'] * 100
-        movement_metrics['acerto_com_delta'] = movement_metrics['acerto_com_delta'] * 100
+        movement_metrics = snapshot.quantis.bins('movimento')
         movement_fig = go.Figure()
         movement_fig.add_trace(go.Bar(
-            x=movement_metrics['movement_magnitude'],
-            y=movement_metrics['acerto_sem_delta'],
+            x=movement_metrics['intervalo'],
+            y=movement_metrics['taxa_acerto_sem_delta'],
             name='Sem Delta',
             marker_color='#3B82F6',
             hovertemplate='Magnitude: %{x}<br>Taxa: %{y:.2f}%<extra></extra>'
         ))
         movement_fig.add_trace(go.Bar(
-            x=movement_metrics['movement_magnitude'],
-            y=movement_metrics['acerto_com_delta'],
+            x=movement_metrics['intervalo'],
+            y=movement_metrics['taxa_acerto_com_delta'],
             name='Com Delta',
             marker_color='#10B981',
             hovertemplate='Magnitude: %{x}<br>Taxa: %{y:.2f}%<extra></extra>'
@@ -114,17 +121,55 @@ def register_callbacks(app):
             color_discrete_sequence=['#3B82F6', '#EF4444']
         )
 
+        return (corr_fig, volatility_fig, movement_fig, sequence_fig,
+                {'display': 'none'}, {'display': 'none'}, {'display': 'none'}, {'display': 'none'})
+
+    @app.callback(
+        [Output('error-vs-movement', 'figure'),
+         Output('loading-error-vs-movement', 'style')],
+        [Input('error-type', 'value'),
+         Input('error-vs-movement', 'relayoutData')]
+    )
+    @binario
+    def update_error_vs_movement(error_type, relayout):
+        import plotly.express as px
+        erro_col = 'diff_previsao' if error_type == 'acerto_sem_delta' else 'diff_previsao_com_delta'
+        x_range, y_range = extensao_visivel(relayout)
+        # Fora de um request (relatorio.py) não há contexto de callback: é o primeiro desenho
+        zoom = has_request_context() and callback_context.triggered_id == 'error-vs-movement'
+        if zoom and relayout and not any(k.startswith(('xaxis', 'yaxis')) for k in relayout):
+            raise PreventUpdate
+
+        df = dataset.atual().df
+        pontos = df[['par', 'movement_magnitude', error_type]].assign(erro_abs=df[erro_col].abs())
+        visiveis = recortar(pontos, 'movement_magnitude', 'erro_abs', x_range, y_range)
+        title = f'Erro Absoluto vs Magnitude de Movimento ({error_type})'
+        labels = {'movement_magnitude': 'Magnitude de Movimento', 'erro_abs': 'Erro Absoluto'}
+
+        if len(visiveis) > LIMITE_PONTOS_DENSIDADE:
+            # Muitos pontos: histograma 2D por par no servidor, re-binado a cada zoom
+            densidade = figura_densidade(visiveis, 'movement_magnitude', 'erro_abs', grupo='par',
+                                         x_range=x_range, y_range=y_range, title=title, labels=labels)
+            return renderizacao.registrar(densidade, len(visiveis), 'densidade'), {'display': 'none'}
+        if zoom and len(pontos) <= LIMITE_PONTOS_DENSIDADE:
+            # Scatter completo já está no navegador, o zoom é feito no cliente
+            raise PreventUpdate
+
         error_vs_movement_fig = px.scatter(
-            df,
+            visiveis,
             x='movement_magnitude',
-            y=error_type.replace('acerto', 'diff').abs(),
+            y='erro_abs',
             color='par',
-            title=f'Erro Absoluto vs Magnitude de Movimento ({error_type})',
-            labels={'movement_magnitude': 'Magnitude de Movimento', error_type.replace('acerto', 'diff'): 'Erro Absoluto'},
+            title=title,
+            labels=labels,
             template='plotly_dark',
             color_discrete_sequence=px.colors.sequential.Plasma,
-            hover_data={'par': True, error_type: True}
+            hover_data={'par': True, error_type: True},
+            # WebGL acima de LIMITE_PONTOS_WEBGL (ver renderizacao.py)
+            render_mode=renderizacao.modo_px(len(visiveis))
         )
+        renderizacao.registrar(error_vs_movement_fig, len(visiveis))
+        if x_range is not None or y_range is not None:
+            error_vs_movement_fig.update_layout(xaxis_range=x_range, yaxis_range=y_range)
 
-        return (corr_fig, volatility_fig, movement_fig, sequence_fig, error_vs_movement_fig,
-                {'display': 'none'}, {'display': 'none'}, {'display': 'none'}, {'display': 'none'}, {'display': 'none'})
\ No newline at end of file
+        return error_vs_movement_fig, {'display': 'none'}
@@ -0,0 +1,39 @@
+// Cache condicional das respostas de callback: o navegador não revalida POSTs sozinho,
+// então guardamos a última resposta por corpo de request e enviamos If-None-Match.
+// Se o servidor responder 304 (mesma versão do dataset e mesmos inputs), reaproveitamos.
+(function () {
+    var LIMITE = 50;
+    var cache = new Map();
+    var fetchOriginal = window.fetch.bind(window);
+
+    window.fetch = function (url, opcoes) {
+        var alvo = typeof url === 'string' ? url : (url && url.url) || '';
+        if (alvo.indexOf('_dash-update-component') < 0 || !opcoes || typeof opcoes.body !== 'string') {
+            return fetchOriginal(url, opcoes);
+        }
+        var chave = opcoes.body;
+        var anterior = cache.get(chave);
+        if (anterior) {
+            opcoes = Object.assign({}, opcoes, {headers: Object.assign({}, opcoes.headers, {'If-None-Match': anterior.etag})});
+        }
+        return fetchOriginal(url, opcoes).then(function (resposta) {
+            if (resposta.status === 304 && anterior) {
+                // LRU: reinsere para marcar como usado recentemente
+                cache.delete(chave);
+                cache.set(chave, anterior);
+                return new Response(anterior.corpo, {status: 200, headers: anterior.headers});
+            }
+            var etag = resposta.headers.get('ETag');
+            if (resposta.status === 200 && etag) {
+                resposta.clone().text().then(function (corpo) {
+                    cache.delete(chave);
+                    cache.set(chave, {etag: etag, corpo: corpo, headers: {'Content-Type': resposta.headers.get('Content-Type')}});
+                    if (cache.size > LIMITE) {
+                        cache.delete(cache.keys().next().value);
+                    }
+                });
+            }
+            return resposta;
+        });
+    };
+})();
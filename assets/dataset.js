@@ -0,0 +1,16 @@
+// Seletor de dataset (modelo) do menu lateral: a escolha vai para o cookie lido pelo
+// servidor (dataset.selecionado) e a página é recarregada com os dados do modelo escolhido.
+(function () {
+    window.dash_clientside = window.dash_clientside || {};
+    window.dash_clientside.dataset = {
+        selecionar: function (nome) {
+            var atual = document.cookie.match(/(?:^|;\s*)dataset=([^;]*)/);
+            if (!nome || (atual && decodeURIComponent(atual[1]) === nome)) {
+                return window.dash_clientside.no_update;
+            }
+            document.cookie = 'dataset=' + encodeURIComponent(nome) + '; path=/; max-age=31536000; SameSite=Lax';
+            window.location.reload();
+            return window.dash_clientside.no_update;
+        }
+    };
+})();
@@ -0,0 +1,125 @@
+// Filtros recalculados no navegador a partir do agregado compacto enviado pelo servidor
+// (store 'filtros-agregados', ver utils.payload_filtros). Mudar o filtro não gera requisição.
+(function () {
+    var AZUL = '#3B82F6';
+    var VERDE = '#10B981';
+    var ESCONDIDO = {display: 'none'};
+
+    // Soma acertos/totais por chave (função de linha -> chave), apenas nas linhas aceitas pelo filtro
+    function agrupar(dados, filtro, chave) {
+        var grupos = {};
+        for (var i = 0; i < dados.total.length; i++) {
+            if (!filtro(i)) {
+                continue;
+            }
+            var k = chave(i);
+            var g = grupos[k] || (grupos[k] = {total: 0, sem: 0, com: 0});
+            g.total += dados.total[i];
+            g.sem += dados.acertos_sem[i];
+            g.com += dados.acertos_com[i];
+        }
+        return grupos;
+    }
+
+    function taxa(acertos, total) {
+        return total ? acertos / total * 100 : null;
+    }
+
+    function barrasTaxa(grupos, chaves, rotulos, titulo, eixoX, rotuloHover, template) {
+        var presentes = chaves.filter(function (k) { return grupos[k]; });
+        var x = presentes.map(function (k) { return rotulos ? rotulos[k] : k; });
+        return {
+            data: [
+                {type: 'bar', x: x, y: presentes.map(function (k) { return taxa(grupos[k].sem, grupos[k].total); }),
+                 name: 'Sem Delta', marker: {color: AZUL},
+                 hovertemplate: rotuloHover + ': %{x}<br>Taxa: %{y:.2f}%<extra></extra>'},
+                {type: 'bar', x: x, y: presentes.map(function (k) { return taxa(grupos[k].com, grupos[k].total); }),
+                 name: 'Com Delta', marker: {color: VERDE},
+                 hovertemplate: rotuloHover + ': %{x}<br>Taxa: %{y:.2f}%<extra></extra>'}
+            ],
+            layout: {title: {text: titulo}, xaxis: {title: {text: eixoX}}, yaxis: {title: {text: 'Taxa de Acerto (%)'}},
+                     barmode: 'group', hovermode: 'x unified', template: template}
+        };
+    }
+
+    function intervalo(n) {
+        var res = [];
+        for (var i = 0; i < n; i++) {
+            res.push(i);
+        }
+        return res;
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        filtros: {
+            hourDay: function (day, dados) {
+                if (!dados) {
+                    return window.dash_clientside.no_update;
+                }
+                var diaSel = day === 'Todos' ? -1 : dados.dias.indexOf(day);
+                var filtro = function (i) { return diaSel < 0 || dados.dia[i] === diaSel; };
+                var horas = intervalo(24);
+
+                var porHora = agrupar(dados, filtro, function (i) { return dados.hora[i]; });
+                var porDia = agrupar(dados, filtro, function (i) { return dados.dia[i]; });
+                var porPeriodo = agrupar(dados, filtro, function (i) { return dados.periodo[i]; });
+                var porDiaHora = agrupar(dados, filtro, function (i) { return dados.dia[i] + '|' + dados.hora[i]; });
+
+                var hourly = barrasTaxa(porHora, horas, null, 'Taxa de Acerto por Hora do Dia', 'Hora', 'Hora', dados.template);
+                var daily = barrasTaxa(porDia, intervalo(dados.dias.length), dados.dias,
+                                       'Taxa de Acerto por Dia da Semana', 'Dia da Semana', 'Dia', dados.template);
+                var period = barrasTaxa(porPeriodo, intervalo(dados.periodos.length), dados.periodos,
+                                        'Taxa de Acerto por Período do Dia', 'Período do Dia', 'Período', dados.template);
+
+                var dias = intervalo(dados.dias.length).filter(function (d) { return porDia[d]; });
+                var horasPresentes = horas.filter(function (h) { return porHora[h]; });
+                var z = dias.map(function (d) {
+                    return horasPresentes.map(function (h) {
+                        var g = porDiaHora[d + '|' + h];
+                        return g ? taxa(g.sem, g.total) : null;
+                    });
+                });
+                var heatmap = {
+                    data: [{type: 'heatmap', z: z, x: horasPresentes, y: dias.map(function (d) { return dados.dias[d]; }),
+                            colorscale: 'Plasma', texttemplate: '%{z:.1f}', colorbar: {title: {text: 'Taxa de Acerto (%)'}}}],
+                    layout: {title: {text: 'Taxa de Acerto por Hora e Dia'}, xaxis: {title: {text: 'Hora'}},
+                             yaxis: {title: {text: 'Dia da Semana'}, autorange: 'reversed'}, template: dados.template}
+                };
+                return [hourly, daily, period, heatmap, ESCONDIDO, ESCONDIDO, ESCONDIDO, ESCONDIDO];
+            },
+
+            pair: function (pair, dados) {
+                if (!dados) {
+                    return window.dash_clientside.no_update;
+                }
+                var parSel = pair === 'Todos' ? -1 : dados.pares.indexOf(pair);
+                var filtro = function (i) { return parSel < 0 || dados.par[i] === parSel; };
+
+                var porPar = agrupar(dados, filtro, function (i) { return dados.par[i]; });
+                var pairFig = barrasTaxa(porPar, intervalo(dados.pares.length), dados.pares,
+                                         'Taxa de Acerto por Par', 'Par', 'Par', dados.template);
+
+                var porParPeriodo = agrupar(dados, filtro, function (i) { return dados.par[i] + '|' + dados.periodo[i]; });
+                var cores = ['#0d0887', '#46039f', '#7201a8', '#9c179e'];
+                var traces = dados.periodos.map(function (periodo, p) {
+                    var pares = intervalo(dados.pares.length).filter(function (k) { return porParPeriodo[k + '|' + p]; });
+                    return {
+                        type: 'bar', name: periodo, marker: {color: cores[p % cores.length]},
+                        x: pares.map(function (k) { return dados.pares[k]; }),
+                        y: pares.map(function (k) {
+                            var g = porParPeriodo[k + '|' + p];
+                            return taxa(g.sem, g.total);
+                        })
+                    };
+                });
+                var pairPeriodFig = {
+                    data: traces,
+                    layout: {title: {text: 'Taxa de Acerto por Par e Período'}, xaxis: {title: {text: 'Par'}},
+                             yaxis: {title: {text: 'Taxa de Acerto (%)'}}, legend: {title: {text: 'Período'}},
+                             barmode: 'group', template: dados.template}
+                };
+                return [pairFig, pairPeriodFig, ESCONDIDO, ESCONDIDO];
+            }
+        }
+    });
+})();
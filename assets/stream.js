@@ -0,0 +1,96 @@
+// Modo ao vivo por Server-Sent Events: a conexão recebe os pacotes prontos do servidor
+// (push.py) e o dcc.Interval da página temporal apenas drena este buffer, sem requisições.
+// O id de cada evento é o último timestamp enviado: a reconexão automática continua dele
+// (Last-Event-ID) e, ao religar o modo ao vivo, a conexão nova também. Se o servidor
+// recusar a conexão (503: limite de conexões do processo), tenta de novo depois de ESPERA_MS.
+(function () {
+    var ESPERA_MS = 5000;
+    var fonte = null;
+    var buffer = [];
+    var ultimo = null;
+    var tentarApos = 0;
+
+    function desconectar(esquecer) {
+        if (fonte) {
+            fonte.close();
+            fonte = null;
+        }
+        buffer = [];
+        // Saindo da página os gráficos são refeitos pelo layout; o ponto de partida volta a ser o dele
+        if (esquecer) {
+            ultimo = null;
+        }
+    }
+
+    function conectar(desde) {
+        fonte = new EventSource('/stream/previsoes' + (desde ? '?desde=' + encodeURIComponent(desde) : ''));
+        fonte.onmessage = function (evento) {
+            // Página temporal fora da tela: ninguém vai drenar o buffer
+            if (!document.getElementById('price-series')) {
+                desconectar(true);
+                return;
+            }
+            // Pacote já recebido (reenvio entre a conexão e a assinatura no servidor)
+            if (ultimo && evento.lastEventId && evento.lastEventId <= ultimo) {
+                return;
+            }
+            ultimo = evento.lastEventId || ultimo;
+            buffer.push(JSON.parse(evento.data));
+        };
+        fonte.onerror = function () {
+            // Erro de rede o navegador reconecta sozinho; resposta de erro (503) fecha a fonte
+            if (fonte && fonte.readyState === EventSource.CLOSED) {
+                fonte = null;
+                tentarApos = Date.now() + ESPERA_MS;
+            }
+        };
+    }
+
+    function formatarKpis(kpis, delta) {
+        delta = delta || {total: 0, taxa_sem_delta: 0, taxa_com_delta: 0};
+        var sinal = function (v) { return (v >= 0 ? '+' : '') + v.toFixed(2); };
+        return 'Previsões: ' + kpis.total + ' (+' + delta.total + ') | ' +
+               'Sem Delta: ' + kpis.taxa_sem_delta.toFixed(2) + '% (' + sinal(delta.taxa_sem_delta) + ') | ' +
+               'Com Delta: ' + kpis.taxa_com_delta.toFixed(2) + '% (' + sinal(delta.taxa_com_delta) + ')';
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        live: {
+            sse: function (nIntervals, desligado, estado) {
+                var sem = window.dash_clientside.no_update;
+                if (desligado) {
+                    desconectar();
+                    return [sem, sem, sem, sem, sem];
+                }
+                if (!fonte && Date.now() >= tentarApos) {
+                    // Continua do último pacote aplicado (ou do que veio no layout)
+                    ultimo = ultimo || (estado && estado.ultimo);
+                    conectar(ultimo);
+                }
+                if (!buffer.length) {
+                    return [sem, sem, sem, sem, sem];
+                }
+                var pacotes = buffer.splice(0, buffer.length);
+                var x = [], precos = [[], [], []], rolling = [[], []], intervalos = [{x: [], y: []}, {x: [], y: []}];
+                pacotes.forEach(function (p) {
+                    x = x.concat(p.x);
+                    for (var i = 0; i < 3; i++) { precos[i] = precos[i].concat(p.precos[i]); }
+                    for (var j = 0; j < 2; j++) {
+                        rolling[j] = rolling[j].concat(p.rolling[j]);
+                        intervalos[j].x = intervalos[j].x.concat(p.intervalos[j].x);
+                        intervalos[j].y = intervalos[j].y.concat(p.intervalos[j].y);
+                    }
+                });
+                var ultimoPacote = pacotes[pacotes.length - 1];
+                var maximo = estado && estado.max_pontos || 5000;
+                return [
+                    [{x: [x, x, x], y: precos}, [0, 1, 2], maximo],
+                    [{x: [x, x], y: rolling}, [0, 1], maximo],
+                    [{x: [intervalos[0].x], y: [intervalos[0].y]}, [0], maximo],
+                    [{x: [intervalos[1].x], y: [intervalos[1].y]}, [0], maximo],
+                    formatarKpis(ultimoPacote.kpis, ultimoPacote.kpis_delta)
+                ];
+            }
+        }
+    });
+})();
@@ -0,0 +1,311 @@
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+# ==============================
+# BENCHMARKS COM BASELINE (detecção de regressões)
+# ==============================
+
+# Uso: python benchmark.py                  # roda e compara com benchmark_baseline.json
+#      python benchmark.py --salvar         # grava os resultados como nova baseline
+#      python benchmark.py --filtro hour_day --tamanhos 5000,20000
+# Cada benchmark roda em datasets sintéticos de vários tamanhos (simulador.gerar_linhas).
+# As repetições são feitas em rodadas intercaladas (todos os benchmarks e tamanhos a cada
+# rodada), então uma interferência passageira atinge uma rodada e não um benchmark inteiro.
+# Mede tempo (mínimo, mediana e o mínimo de cada rodada) e pico de memória (tracemalloc,
+# em uma execução separada para não distorcer o tempo). A comparação usa o mínimo, que
+# o ruído só faz subir, e só aponta regressão quando a piora passa da tolerância relativa,
+# do ruído entre rodadas das duas execuções e de um piso absoluto; o código de saída é 1
+# se houver regressão.
+
+FORMATO = 2
+BASELINE = 'benchmark_baseline.json'
+# Ruído: diferenças menores que K_RUIDO desvios dos mínimos por rodada não contam
+K_RUIDO = 3.0
+# Diferenças de tempo abaixo disto (s) são ignoradas (resolução e jitter do sistema)
+PISO_S = 0.002
+# Piora de memória abaixo disto (MB) é ignorada mesmo acima da tolerância relativa
+MEMORIA_MINIMA_MB = 1.0
+
+# O app não deve usar caches persistentes, dataset compartilhado nem retenção durante a medição
+for _variavel in ('DASHBOARD_CACHE_DIR', 'DASHBOARD_SEGUNDO_PLANO_DIR', 'DASHBOARD_SHARED_DIR',
+                  'DASHBOARD_DADOS_DIR', 'DASHBOARD_RETENCAO_DIAS'):
+    os.environ.pop(_variavel, None)
+
+
+def _csv_sintetico(diretorio, linhas):
+    from simulador import gerar_linhas
+    caminho = os.path.join(diretorio, f'dados_{linhas}.csv')
+    if not os.path.exists(caminho):
+        df, _ = gerar_linhas(linhas, pd.Timestamp('2024-01-01'), '2min', rng=np.random.default_rng(linhas))
+        df.to_csv(caminho, index=False)
+    return caminho
+
+
+class Contexto:
+    # Dataset de um tamanho: CSV, DataFrame preparado e o app (importado uma vez)
+    def __init__(self, diretorio, linhas):
+        self.linhas = linhas
+        self.csv = _csv_sintetico(diretorio, linhas)
+        # O app publica o primeiro dataset ao ser importado; os demais entram por publicar()
+        if 'utils' not in sys.modules:
+            os.environ['DASHBOARD_DADOS'] = self.csv
+        import dados
+        self.df = dados.carregar(self.csv)
+
+    def publicar(self):
+        # Snapshot novo a cada repetição: os derivados são recalculados (primeiro request após a carga)
+        import dataset
+        dataset.publicar(dataset.Snapshot.construir(self.df.copy(), f'bench-{self.linhas}-{time.monotonic_ns()}'))
+
+    def callback(self, saida):
+        # Função do callback registrado no app (com a conversão binária das figuras)
+        from main import app
+        for chave, spec in app.callback_map.items():
+            if saida in chave:
+                return spec['callback'].__wrapped__
+        raise KeyError(saida)
+
+
+# nome -> preparar(contexto) que retorna (setup por repetição, função medida)
+BENCHMARKS = {}
+
+
+def _benchmark(nome):
+    def decorador(preparar):
+        BENCHMARKS[nome] = preparar
+        return preparar
+    return decorador
+
+
+@_benchmark('dados.carregar')
+def _carregar(ctx):
+    import dados
+    return None, lambda: dados.carregar(ctx.csv)
+
+
+@_benchmark('utils.calculate_metrics')
+def _calculate_metrics(ctx):
+    import utils
+    return None, lambda: utils.calculate_metrics(ctx.df, ['day_of_week', 'hour'])
+
+
+@_benchmark('dataset.Snapshot.construir')
+def _snapshot(ctx):
+    import dataset
+    return None, lambda: dataset.Snapshot.construir(ctx.df, 'bench').aquecer()
+
+
+@_benchmark('temporal.update_graficos')
+def _temporal(ctx):
+    func = ctx.callback('temporal-accuracy.figure')
+    return ctx.publicar, lambda: func(None, None)
+
+
+@_benchmark('hour_day.update_metricas_hour_day')
+def _hour_day_metricas(ctx):
+    func = ctx.callback('hourly-accuracy.figure')
+    return ctx.publicar, lambda: func('Todos')
+
+
+@_benchmark('hour_day.update_hour_day')
+def _hour_day(ctx):
+    func = ctx.callback('sequencia-hora.figure')
+    return ctx.publicar, lambda: func('Todos')
+
+
+@_benchmark('other.update_hour_day')
+def _other(ctx):
+    func = ctx.callback('hourday-hourly-accuracy.figure')
+    return ctx.publicar, lambda: func('Todos')
+
+
+def cronometrar(preparar, ctx, repeticoes):
+    # Tempos de uma rodada (a primeira execução é aquecimento)
+    setup, funcao = preparar(ctx)
+    tempos = []
+    for i in range(repeticoes + 1):
+        if setup:
+            setup()
+        inicio = time.perf_counter()
+        funcao()
+        if i:
+            tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def pico_memoria(preparar, ctx):
+    setup, funcao = preparar(ctx)
+    if setup:
+        setup()
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico / 2 ** 20
+
+
+def resumir(rodadas, pico_mb):
+    # rodadas: lista de listas de tempos (uma por rodada)
+    tempos = np.concatenate(rodadas)
+    mediana = float(np.median(tempos))
+    return {
+        'mediana_s': mediana,
+        'mad_s': float(np.median(np.abs(tempos - mediana))),
+        'min_s': float(tempos.min()),
+        'min_rodadas_s': [float(min(rodada)) for rodada in rodadas],
+        'repeticoes': len(rodadas[0]),
+        'pico_mb': pico_mb,
+    }
+
+
+def _desvio_rodadas(medida):
+    # Desvio padrão dos mínimos por rodada: quanto o mesmo código varia entre execuções
+    minimos = medida['min_rodadas_s']
+    return float(np.std(minimos, ddof=1)) if len(minimos) > 1 else 0.0
+
+
+def _ambiente():
+    return {'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+            'maquina': platform.machine(), 'processador': platform.processor() or platform.node()}
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(base, novo, tolerancia, tolerancia_memoria):
+    # Uma linha por (benchmark, tamanho) com a variação e o veredito
+    linhas = []
+    chaves = sorted(set(base) | set(novo), key=lambda c: (c[0], c[1]))
+    for nome, tamanho in chaves:
+        b, n = base.get((nome, tamanho)), novo.get((nome, tamanho))
+        linha = {'benchmark': nome, 'linhas': tamanho}
+        if b is None or n is None:
+            linha['status'] = 'novo' if b is None else 'não medido'
+            if n is not None:
+                linha.update(novo_ms=n['min_s'] * 1000, novo_mb=n['pico_mb'])
+            linhas.append(linha)
+            continue
+        diferenca = n['min_s'] - b['min_s']
+        # Ruído combinado entre rodadas das duas execuções (não só dentro de uma rodada)
+        ruido = K_RUIDO * np.hypot(_desvio_rodadas(b), _desvio_rodadas(n))
+        limiar = max(tolerancia * b['min_s'], ruido, PISO_S)
+        dif_memoria = n['pico_mb'] - b['pico_mb']
+        regressao_memoria = dif_memoria > max(tolerancia_memoria * b['pico_mb'], MEMORIA_MINIMA_MB)
+        if diferenca > limiar or regressao_memoria:
+            status = 'REGRESSÃO'
+        elif -diferenca > limiar:
+            status = 'melhora'
+        else:
+            status = 'ok'
+        linha.update(
+            base_ms=b['min_s'] * 1000, novo_ms=n['min_s'] * 1000,
+            tempo_pct=diferenca / b['min_s'] * 100 if b['min_s'] else 0.0,
+            limiar_ms=limiar * 1000,
+            base_mb=b['pico_mb'], novo_mb=n['pico_mb'],
+            memoria_pct=dif_memoria / b['pico_mb'] * 100 if b['pico_mb'] else 0.0,
+            status=status + (' (memória)' if regressao_memoria else ''),
+        )
+        linhas.append(linha)
+    return pd.DataFrame(linhas)
+
+
+def _indexar(resultados):
+    return {(nome, int(tamanho)): medida
+            for nome, tamanhos in resultados.items() for tamanho, medida in tamanhos.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks do dashboard com comparação contra a baseline.')
+    parser.add_argument('--tamanhos', default='2000,10000', help='linhas dos datasets sintéticos')
+    parser.add_argument('--repeticoes', type=int, default=5, help='repetições por rodada')
+    parser.add_argument('--rodadas', type=int, default=3, help='rodadas intercaladas (ruído entre execuções)')
+    parser.add_argument('--filtro', default=None, help='regex dos benchmarks a rodar')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--salvar', action='store_true', help='grava os resultados na baseline')
+    parser.add_argument('--tolerancia', type=float, default=0.10, help='piora de tempo aceita (fração)')
+    parser.add_argument('--tolerancia-memoria', type=float, default=0.15, help='piora de memória aceita (fração)')
+    parser.add_argument('--relatorio', default=None, help='grava o relatório de diferenças em JSON')
+    args = parser.parse_args()
+
+    tamanhos = [int(t) for t in args.tamanhos.split(',')]
+    nomes = [nome for nome in BENCHMARKS if not args.filtro or re.search(args.filtro, nome)]
+    diretorio = tempfile.mkdtemp(prefix='benchmark_')
+
+    contextos = {tamanho: Contexto(diretorio, tamanho) for tamanho in tamanhos}
+    tempos = {}
+    for rodada in range(max(1, args.rodadas)):
+        for tamanho, ctx in contextos.items():
+            for nome in nomes:
+                tempos.setdefault((nome, tamanho), []).append(cronometrar(BENCHMARKS[nome], ctx, args.repeticoes))
+        print(f'rodada {rodada + 1}/{max(1, args.rodadas)}', flush=True)
+
+    resultados = {}
+    for (nome, tamanho), rodadas in tempos.items():
+        medida = resumir(rodadas, pico_memoria(BENCHMARKS[nome], contextos[tamanho]))
+        resultados.setdefault(nome, {})[str(tamanho)] = medida
+        print(f'{nome} @ {tamanho}: mín {medida["min_s"] * 1000:.1f} ms, mediana {medida["mediana_s"] * 1000:.1f} ms '
+              f'(±{_desvio_rodadas(medida) * 1000:.1f} entre rodadas), pico {medida["pico_mb"]:.1f} MB', flush=True)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as arquivo:
+            baseline = json.load(arquivo)
+        if baseline.get('formato') != FORMATO:
+            if not args.salvar:
+                sys.exit(f'{args.baseline}: formato {baseline.get("formato")} não suportado (esperado {FORMATO}); '
+                         'regrave com --salvar')
+            print(f'{args.baseline}: formato {baseline.get("formato")} substituído pelo {FORMATO}')
+            baseline = None
+
+    codigo = 0
+    if baseline is not None:
+        if baseline.get('ambiente') != _ambiente():
+            print(f'Aviso: baseline gerada em outro ambiente {baseline.get("ambiente")}; '
+                  'diferenças podem não ser do código')
+        relatorio = comparar(_indexar(baseline['benchmarks']), _indexar(resultados),
+                             args.tolerancia, args.tolerancia_memoria)
+        # Só compara o que foi medido agora
+        relatorio = relatorio[relatorio['status'] != 'não medido']
+        print(f'\nComparação com {args.baseline} (commit {baseline.get("commit")}):')
+        print(relatorio.to_string(index=False, float_format=lambda v: f'{v:.1f}'))
+        regressoes = relatorio['status'].str.startswith('REGRESSÃO').sum()
+        if regressoes:
+            print(f'\n{regressoes} regressão(ões) acima da tolerância')
+            codigo = 1
+        if args.relatorio:
+            with open(args.relatorio, 'w') as arquivo:
+                json.dump({'baseline_commit': baseline.get('commit'), 'commit': _commit(),
+                           'regressoes': int(regressoes), 'linhas': relatorio.to_dict('records')},
+                          arquivo, indent=2, default=float)
+    elif not args.salvar:
+        print(f'\nSem baseline em {args.baseline}; use --salvar para criar')
+
+    if args.salvar:
+        benchmarks = baseline['benchmarks'] if baseline is not None else {}
+        for nome, medidas in resultados.items():
+            benchmarks.setdefault(nome, {}).update(medidas)
+        with open(args.baseline, 'w') as arquivo:
+            json.dump({'formato': FORMATO, 'commit': _commit(), 'gerado_em': pd.Timestamp.now().isoformat(),
+                       'ambiente': _ambiente(), 'benchmarks': benchmarks}, arquivo, indent=2, sort_keys=True)
+        print(f'Baseline gravada em {args.baseline}')
+        codigo = 0
+    sys.exit(codigo)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+import itertools
+import numpy as np
+import pandas as pd
+
+# ==============================
+# ÍNDICES BITMAP (filtros combinados por AND/OR de bits)
+# ==============================
+
+# Para cada valor das colunas categóricas e booleanas, um bitmap empacotado (1 bit por
+# linha do df do snapshot, na ordem das linhas). Um filtro como par + dia + erro vira um
+# AND de bitmaps (OR entre valores da mesma coluna); contagens saem do popcount sem
+# montar as linhas, e as linhas só são materializadas quando a página precisa delas.
+# Na ingestão os bits das linhas novas são anexados no fim de um buffer com folga
+# (capacidade dobra quando enche), compartilhado com o snapshot anterior como em
+# prefixos._Serie: cada snapshot lê só os seus n primeiros bits. A retenção corta o começo.
+COLUNAS = ['par', 'day_of_week', 'hour', 'direcao_real', 'direcao_prevista', 'direcao_com_delta',
+           'acerto_sem_delta', 'acerto_com_delta']
+_CAPACIDADE_MINIMA = 1024  # bytes
+
+if hasattr(np, 'bitwise_count'):
+    def _popcount(bits):
+        return int(np.bitwise_count(bits).sum())
+else:
+    _BITS_POR_BYTE = np.array([bin(i).count('1') for i in range(256)], dtype='uint8')
+
+    def _popcount(bits):
+        return int(_BITS_POR_BYTE[bits].sum())
+
+
+def _empacotar(mascara):
+    return np.packbits(mascara, bitorder='little')
+
+
+def _desempacotar(bits, n):
+    return np.unpackbits(bits, count=n, bitorder='little').view(bool)
+
+
+def _contar(bits, n):
+    # Bits ligados entre os n primeiros; no último byte, os bits depois de n podem ser de
+    # linhas que um snapshot mais novo anexou no mesmo buffer
+    inteiros, resto = divmod(n, 8)
+    total = _popcount(bits[:inteiros])
+    if resto:
+        total += _popcount(bits[inteiros:inteiros + 1] & ((1 << resto) - 1))
+    return total
+
+
+class _Bitmap:
+    # Bits das linhas no começo de buf; 'cauda' é compartilhada pelos bitmaps do mesmo
+    # buffer e aponta quem pode anexar nele
+    __slots__ = ('buf', 'cauda')
+
+    def __init__(self, buf, cauda=None):
+        self.buf = buf
+        self.cauda = cauda if cauda is not None else [self]
+        self.cauda[0] = self
+
+    def estendido(self, n, mascara, folga=True):
+        # Bits de 'mascara' depois dos n primeiros; só o byte incompleto é refeito
+        inicio, resto = divmod(n, 8)
+        total = (n + len(mascara) + 7) // 8
+        if resto:
+            parcial = np.unpackbits(self.buf[inicio:inicio + 1], count=resto, bitorder='little').view(bool)
+            mascara = np.concatenate([parcial, mascara])
+        if self.cauda[0] is self and total <= len(self.buf):
+            buf, cauda = self.buf, self.cauda
+        else:
+            # Sem folga (ou outro bitmap já anexou neste buffer): copia para um buffer novo
+            buf = np.zeros(max(2 * total, _CAPACIDADE_MINIMA) if folga else total, dtype='uint8')
+            buf[:inicio] = self.buf[:inicio]
+            cauda = None
+        buf[inicio:total] = _empacotar(mascara)
+        return _Bitmap(buf, cauda)
+
+
+def _valores_coluna(serie):
+    # Valores distintos (sem nulos) e as máscaras de cada um
+    codigos, valores = pd.factorize(serie, sort=True)
+    return [(valor.item() if hasattr(valor, 'item') else valor, codigos == k) for k, valor in enumerate(valores)]
+
+
+class IndiceBitmaps:
+    def __init__(self, n=0, bitmaps=None):
+        self.n = n
+        # coluna -> {valor: _Bitmap}
+        self.bitmaps = bitmaps if bitmaps is not None else {coluna: {} for coluna in COLUNAS}
+
+    @classmethod
+    def construir(cls, df):
+        return cls().estendido(df, folga=False)
+
+    def _bits(self, bitmap):
+        # Bytes deste snapshot no buffer (o último pode ter bits de linhas mais novas)
+        return bitmap.buf[:(self.n + 7) // 8]
+
+    def estendido(self, novas, folga=True):
+        # Índice novo com as linhas anexadas ao fim do df; este não muda
+        if novas.empty:
+            return self
+        m = len(novas)
+        bitmaps = {}
+        for coluna, anteriores in self.bitmaps.items():
+            mascaras = dict(_valores_coluna(novas[coluna])) if coluna in novas else {}
+            atual = {}
+            for valor in anteriores.keys() | mascaras.keys():
+                bitmap = anteriores.get(valor)
+                mascara = mascaras.get(valor)
+                if mascara is None:
+                    mascara = np.zeros(m, dtype=bool)
+                if bitmap is None:
+                    bitmap = _Bitmap(np.zeros((self.n + 7) // 8, dtype='uint8'))
+                atual[valor] = bitmap.estendido(self.n, mascara, folga)
+            bitmaps[coluna] = atual
+        return IndiceBitmaps(self.n + m, bitmaps)
+
+    def cortado(self, k):
+        # Sem as k primeiras linhas (retenção); valores que somem deixam de ter bitmap
+        if k <= 0:
+            return self
+        bitmaps = {}
+        for coluna, valores in self.bitmaps.items():
+            bitmaps[coluna] = {}
+            for valor, bitmap in valores.items():
+                restante = _desempacotar(self._bits(bitmap), self.n)[k:]
+                if restante.any():
+                    bitmaps[coluna][valor] = _Bitmap(_empacotar(restante))
+        return IndiceBitmaps(self.n - k, bitmaps)
+
+    def memoria(self):
+        # Bytes dos buffers (com a folga; buffers compartilhados contam em cada snapshot)
+        return sum(bitmap.buf.nbytes for valores in self.bitmaps.values() for bitmap in valores.values())
+
+    def valores(self, coluna):
+        return sorted(self.bitmaps[coluna])
+
+    def filtro(self, **filtros):
+        # Bitmap do AND entre colunas (OR entre os valores de uma lista); None = todas as linhas.
+        # Valores 'Todos' ou None não filtram.
+        resultado = None
+        for coluna, valor in filtros.items():
+            if valor is None or valor == 'Todos':
+                continue
+            valores = valor if isinstance(valor, (list, tuple, set)) else [valor]
+            bits = np.zeros((self.n + 7) // 8, dtype='uint8')
+            for v in valores:
+                existente = self.bitmaps[coluna].get(v)
+                if existente is not None:
+                    bits |= self._bits(existente)
+            resultado = bits if resultado is None else resultado & bits
+        return resultado
+
+    def contar(self, **filtros):
+        bits = self.filtro(**filtros)
+        return self.n if bits is None else _contar(bits, self.n)
+
+    def contagens(self, colunas, **filtros):
+        # Número de linhas por combinação de valores de 'colunas' (como groupby(...).size(),
+        # sem combinações vazias), só com AND e popcount
+        colunas = [colunas] if isinstance(colunas, str) else list(colunas)
+        base = self.filtro(**filtros)
+        chaves, contagens = [], []
+        for combinacao in itertools.product(*(sorted(self.bitmaps[c].items()) for c in colunas)):
+            bits = base
+            for _, bitmap in combinacao:
+                bits = self._bits(bitmap) if bits is None else bits & self._bits(bitmap)
+            total = _contar(bits, self.n)
+            if total:
+                chaves.append(tuple(valor for valor, _ in combinacao))
+                contagens.append(total)
+        indice = (pd.MultiIndex.from_tuples(chaves, names=colunas) if len(colunas) > 1
+                  else pd.Index([c[0] for c in chaves], name=colunas[0]))
+        return pd.Series(contagens, index=indice, dtype='int64')
+
+    def posicoes(self, **filtros):
+        # Posições (iloc) das linhas do filtro; None = todas
+        bits = self.filtro(**filtros)
+        return None if bits is None else np.flatnonzero(_desempacotar(bits, self.n))
+
+    def selecionar(self, df, **filtros):
+        # Linhas do df do snapshot que passam no filtro
+        posicoes = self.posicoes(**filtros)
+        return df if posicoes is None else df.iloc[posicoes]
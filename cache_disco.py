@@ -0,0 +1,183 @@
+import atexit
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from flask import jsonify
+from config import CACHE_DIR, CACHE_LIMITE_MB
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CACHE DE RESULTADOS EM DISCO (compartilhado entre workers)
+# ==============================
+
+# Um arquivo SQLite em DASHBOARD_CACHE_DIR guarda respostas de callbacks (figuras já
+# serializadas) e derivados dos snapshots (DataFrames em pickle). As chaves incluem a
+# versão do dataset, então nada precisa ser invalidado: entradas de versões antigas
+# deixam de ser lidas e saem pela remoção das menos usadas quando o arquivo passa do
+# limite. Todos os workers (e os que sobem depois de um restart) leem o mesmo arquivo.
+#
+# Um acerto não escreve no arquivo: hits/misses ficam em memória e vão para a tabela de
+# contadores a cada CONTADORES_FLUSH_S, e o acesso da entrada só é renovado quando tem
+# mais de RENOVAR_ACESSO_S (a ordem para remoção continua boa nessa resolução). O total
+# de bytes é mantido em contadores a cada gravação, sem somar a tabela.
+CONTADORES_FLUSH_S = 5
+RENOVAR_ACESSO_S = 60
+
+
+class CacheDisco:
+    def __init__(self, diretorio, limite_bytes):
+        os.makedirs(diretorio, exist_ok=True)
+        self.caminho = os.path.join(diretorio, 'resultados.sqlite')
+        self.limite = limite_bytes
+        self._local = threading.local()
+        # Hits/misses ainda não gravados (por processo)
+        self._pendentes = {}
+        self._pendentes_pid = os.getpid()
+        self._ultimo_flush = time.monotonic()
+        self._trava = threading.Lock()
+        con = self._conexao()
+        con.execute('CREATE TABLE IF NOT EXISTS entradas '
+                    '(chave TEXT PRIMARY KEY, valor BLOB, tamanho INTEGER, acesso REAL)')
+        con.execute('CREATE INDEX IF NOT EXISTS entradas_acesso ON entradas (acesso)')
+        con.execute('CREATE TABLE IF NOT EXISTS contadores (nome TEXT PRIMARY KEY, valor INTEGER)')
+        # Arquivo de uma versão sem o total em contadores: soma uma vez
+        con.execute("INSERT OR IGNORE INTO contadores SELECT 'bytes', COALESCE(SUM(tamanho), 0) FROM entradas")
+
+    def _conexao(self):
+        # Uma conexão por thread (e por processo: a do master não é herdada após o fork)
+        con = getattr(self._local, 'con', None)
+        if con is None or self._local.pid != os.getpid():
+            con = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute('PRAGMA synchronous=NORMAL')
+            self._local.con, self._local.pid = con, os.getpid()
+        return con
+
+    def _somar(self, con, nome, valor):
+        con.execute('INSERT INTO contadores VALUES (?, ?) '
+                    'ON CONFLICT(nome) DO UPDATE SET valor = valor + excluded.valor', (nome, valor))
+
+    def _contar(self, nome):
+        with self._trava:
+            if self._pendentes_pid != os.getpid():
+                # Processo filho: os pendentes herdados são do master
+                self._pendentes, self._pendentes_pid = {}, os.getpid()
+            self._pendentes[nome] = self._pendentes.get(nome, 0) + 1
+            if time.monotonic() - self._ultimo_flush < CONTADORES_FLUSH_S:
+                return
+        self.gravar_contadores()
+
+    def gravar_contadores(self):
+        with self._trava:
+            pendentes, self._pendentes = self._pendentes, {}
+            self._ultimo_flush = time.monotonic()
+        if not pendentes or self._pendentes_pid != os.getpid():
+            return
+        con = self._conexao()
+        con.execute('BEGIN IMMEDIATE')
+        with con:
+            for nome, valor in pendentes.items():
+                self._somar(con, nome, valor)
+
+    def obter(self, chave):
+        # (True, valor) ou (False, None); um acerto renova o acesso da entrada se ele for antigo
+        con = self._conexao()
+        linha = con.execute('SELECT valor, acesso FROM entradas WHERE chave = ?', (chave,)).fetchone()
+        if linha is None:
+            self._contar('misses')
+            return False, None
+        agora = time.time()
+        if agora - linha[1] > RENOVAR_ACESSO_S:
+            con.execute('UPDATE entradas SET acesso = ? WHERE chave = ?', (agora, chave))
+        self._contar('hits')
+        return True, pickle.loads(linha[0])
+
+    def guardar(self, chave, valor):
+        blob = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.limite:
+            return
+        con = self._conexao()
+        con.execute('BEGIN IMMEDIATE')
+        with con:
+            anterior = con.execute('SELECT tamanho FROM entradas WHERE chave = ?', (chave,)).fetchone()
+            con.execute('INSERT OR REPLACE INTO entradas VALUES (?, ?, ?, ?)',
+                        (chave, blob, len(blob), time.time()))
+            self._somar(con, 'bytes', len(blob) - (anterior[0] if anterior else 0))
+            total = con.execute("SELECT valor FROM contadores WHERE nome = 'bytes'").fetchone()[0]
+            if total > self.limite:
+                # Mantém as mais recentes até 90% do limite
+                removidas = con.execute(
+                    'DELETE FROM entradas WHERE chave IN (SELECT chave FROM ('
+                    'SELECT chave, SUM(tamanho) OVER (ORDER BY acesso DESC) AS acumulado FROM entradas'
+                    ') WHERE acumulado > ?) RETURNING tamanho', (int(self.limite * 0.9),)).fetchall()
+                self._somar(con, 'removidas', len(removidas))
+                self._somar(con, 'bytes', -sum(tamanho for tamanho, in removidas))
+
+    def estatisticas(self):
+        # Os pendentes dos outros workers aparecem no próximo flush deles
+        self.gravar_contadores()
+        con = self._conexao()
+        contadores = dict(con.execute('SELECT nome, valor FROM contadores').fetchall())
+        entradas = con.execute('SELECT COUNT(*) FROM entradas').fetchone()[0]
+        tamanho = contadores.get('bytes', 0)
+        hits, misses = contadores.get('hits', 0), contadores.get('misses', 0)
+        return {
+            'hits': hits,
+            'misses': misses,
+            'taxa_hit': hits / (hits + misses) if hits + misses else 0.0,
+            'removidas': contadores.get('removidas', 0),
+            'entradas': entradas,
+            'bytes': tamanho,
+            'limite_bytes': self.limite,
+        }
+
+
+# Instância do processo; None quando DASHBOARD_CACHE_DIR não está definido
+cache = CacheDisco(CACHE_DIR, CACHE_LIMITE_MB * 1024 * 1024) if CACHE_DIR else None
+if cache is not None:
+    atexit.register(cache.gravar_contadores)
+
+
+# Falhas do cache (arquivo travado, valor que não serializa) só viram log: o resultado
+# é recalculado como se o cache estivesse desligado
+def obter(chave):
+    if cache is None:
+        return False, None
+    try:
+        return cache.obter(chave)
+    except (sqlite3.Error, pickle.UnpicklingError, EOFError):
+        logger.exception('Falha ao ler o cache em disco')
+        return False, None
+
+
+def guardar(chave, valor):
+    if cache is None:
+        return
+    try:
+        cache.guardar(chave, valor)
+    except (sqlite3.Error, pickle.PicklingError, TypeError, AttributeError):
+        logger.exception('Falha ao gravar no cache em disco')
+
+
+def memoizar(chave, calcular):
+    # Valor do cache em disco ou calcular() (guardado para os outros workers)
+    achou, valor = obter(chave)
+    if not achou:
+        valor = calcular()
+        guardar(chave, valor)
+    return valor
+
+
+def registrar(server, autorizado):
+    # GET /admin/cache: contadores de hit/miss e ocupação (somados entre os workers)
+    @server.route('/admin/cache')
+    def admin_cache():
+        if not autorizado():
+            return jsonify(erro='não autorizado'), 403
+        if cache is None:
+            return jsonify(ativo=False)
+        return jsonify(ativo=True, **cache.estatisticas())
@@ -0,0 +1,302 @@
+import argparse
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+# ==============================
+# TESTE DE CARGA DOS CALLBACKS (usuários simultâneos)
+# ==============================
+
+# Uso: python carga.py --usuarios 8 --sessoes 3 --linhas 50000
+#      python carga.py --servidor http://localhost:8050 --usuarios 16
+# Cada usuário simulado repete uma sessão como o navegador faria: abre cada página
+# (display_page), dispara os callbacks iniciais dos componentes da página, troca os
+# filtros (dropdowns como day-filter/pair-filter e o date-range) e exporta os dados.
+# Sem --servidor o app roda no próprio processo (test client do Flask) sobre um CSV
+# sintético de --linhas linhas gerado com simulador.gerar_linhas; com --servidor os
+# requests vão para uma instância já rodando (ex.: gunicorn com vários workers).
+# O relatório traz requests/s e latência p50/p95/p99 por callback.
+
+PAGINAS = ['/', '/temporal', '/hour-day', '/other', '/pair']
+# Página em que o usuário exporta: a exportação usa o intervalo de datas dela (o botão de
+# cada página é {'type': 'export-button', 'index': página})
+PAGINA_EXPORTACAO = '/temporal'
+ROTA = '/_dash-update-component'
+
+
+class ClienteLocal:
+    # Test client do Flask (um por usuário; o app é compartilhado pelas threads)
+    def __init__(self, app):
+        self.cliente = app.server.test_client()
+
+    def get(self, caminho):
+        return self.cliente.get(caminho).get_data(as_text=True)
+
+    def post(self, caminho, corpo):
+        resposta = self.cliente.post(caminho, json=corpo)
+        return resposta.status_code, resposta.get_json(silent=True)
+
+
+class ClienteHttp:
+    def __init__(self, base):
+        self.base = base.rstrip('/')
+
+    def get(self, caminho):
+        with urllib.request.urlopen(self.base + caminho) as resposta:
+            return resposta.read().decode()
+
+    def post(self, caminho, corpo):
+        pedido = urllib.request.Request(self.base + caminho, data=json.dumps(corpo).encode(),
+                                        headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(pedido) as resposta:
+                dados = resposta.read()
+                return resposta.status, json.loads(dados) if dados else None
+        except urllib.error.HTTPError as erro:
+            return erro.code, None
+
+
+def _saidas(output):
+    # 'a.prop' ou '..a.prop...b.prop..' -> [{'id', 'property'}]
+    partes = output[2:-2].split('...') if output.startswith('..') else [output]
+    return [dict(zip(('id', 'property'), parte.rsplit('.', 1))) for parte in partes]
+
+
+def _nome(dep):
+    saidas = _saidas(dep['output'])
+    extra = f' +{len(saidas) - 1}' if len(saidas) > 1 else ''
+    # Saídas com allow_duplicate têm um sufixo '@hash' na propriedade
+    return f"{saidas[0]['id']}.{saidas[0]['property'].split('@')[0]}{extra}"
+
+
+def _id_texto(componente):
+    # Id como aparece em _dash-dependencies (ids dict viram JSON com chaves ordenadas)
+    return componente if isinstance(componente, str) else json.dumps(componente, sort_keys=True, separators=(',', ':'))
+
+
+def _componentes(arvore, estado, ids):
+    # Percorre o layout devolvido e guarda as props de cada componente com id
+    if isinstance(arvore, list):
+        for item in arvore:
+            _componentes(item, estado, ids)
+    elif isinstance(arvore, dict) and 'props' in arvore:
+        props = arvore['props']
+        if isinstance(props.get('id'), (str, dict)):
+            componente = _id_texto(props['id'])
+            ids.add(componente)
+            estado[f'{componente}._tipo'] = arvore.get('type')
+            for prop, valor in props.items():
+                estado[f'{componente}.{prop}'] = valor
+        _componentes(props.get('children'), estado, ids)
+
+
+class Sessao:
+    # Estado de uma aba do navegador: valores das props e componentes visíveis
+    def __init__(self, cliente, dependencias, layout, fim_id, metricas, rng):
+        self.cliente = cliente
+        self.dependencias = dependencias
+        self.rota = ROTA + (f'?endId={fim_id}&' if fim_id else '?')
+        self.metricas = metricas
+        self.rng = rng
+        self.estado = {}
+        self.ids_base = set()
+        _componentes(layout, self.estado, self.ids_base)
+        self.ids = set(self.ids_base)
+
+    def _corpo(self, dep, disparo):
+        entradas = []
+        for item in dep['inputs']:
+            chave = json.loads(item['id']) if item['id'].startswith('{') else None
+            if chave is not None and ['ALL'] in chave.values():
+                # Padrão (ALL): um componente com índice 0
+                chave = {k: 0 if v == ['ALL'] else v for k, v in chave.items()}
+                entradas.append([{'id': chave, 'property': item['property'], 'value': 1}])
+            elif chave is not None:
+                entradas.append({'id': chave, 'property': item['property'],
+                                 'value': self.estado.get(f"{item['id']}.{item['property']}")})
+            else:
+                entradas.append({**item, 'value': self.estado.get(f"{item['id']}.{item['property']}")})
+        saidas = _saidas(dep['output'])
+        return {
+            'output': dep['output'],
+            'outputs': saidas if dep['output'].startswith('..') else saidas[0],
+            'inputs': entradas,
+            'state': [{**item, 'value': self.estado.get(f"{item['id']}.{item['property']}")}
+                      for item in dep.get('state', [])],
+            'changedPropIds': disparo,
+        }
+
+    def chamar(self, dep, disparo):
+        corpo = self._corpo(dep, disparo)
+        inicio = time.perf_counter()
+        status, dados = self.cliente.post(self.rota, corpo)
+        if status == 200 and dados and 'cacheKey' in dados:
+            # Callback em segundo plano: consulta até o resultado ficar pronto
+            consulta = (f"{self.rota}cacheKey={urllib.parse.quote(dados['cacheKey'])}"
+                        f"&job={urllib.parse.quote(dados['job'])}")
+            while status == 200 and not (dados and 'response' in dados):
+                time.sleep(0.05)
+                status, dados = self.cliente.post(consulta, corpo)
+        self.metricas.registrar(_nome(dep), time.perf_counter() - inicio, status in (200, 204))
+        for componente, props in ((dados or {}).get('response') or {}).items():
+            for prop, valor in props.items():
+                self.estado[f'{componente}.{prop}'] = valor
+                if prop == 'children':
+                    _componentes(valor, self.estado, self.ids)
+
+    def disparar(self, chaves):
+        # Callbacks que têm alguma das props alteradas como input
+        for dep in self.dependencias:
+            entradas = {f"{i['id']}.{i['property']}" for i in dep['inputs']}
+            if entradas & set(chaves):
+                self.chamar(dep, [c for c in chaves if c in entradas])
+
+    def abrir(self, pagina):
+        self.estado['url.pathname'] = pagina
+        self.ids = set(self.ids_base)
+        self.disparar(['url.pathname'])
+        # Callbacks iniciais dos componentes da página
+        novos = self.ids - self.ids_base
+        for dep in self.dependencias:
+            ids = {i['id'] for i in dep['inputs'] if not i['id'].startswith('{')}
+            if ids and ids <= self.ids and ids & novos and not dep.get('prevent_initial_call'):
+                self.chamar(dep, [f"{i['id']}.{i['property']}" for i in dep['inputs']])
+
+    def interagir(self):
+        # Dropdowns (dia, par) recebem uma opção ao acaso; DatePickerRange um subintervalo
+        for componente in sorted(self.ids):
+            tipo = self.estado.get(f'{componente}._tipo')
+            opcoes = self.estado.get(f'{componente}.options')
+            if tipo == 'Dropdown' and opcoes:
+                opcao = opcoes[self.rng.integers(len(opcoes))]
+                self.estado[f'{componente}.value'] = opcao['value'] if isinstance(opcao, dict) else opcao
+                self.disparar([f'{componente}.value'])
+            if tipo == 'DatePickerRange':
+                inicio = pd.Timestamp(self.estado[f'{componente}.min_date_allowed'])
+                fim = pd.Timestamp(self.estado[f'{componente}.max_date_allowed'])
+                a, b = sorted(self.rng.random(2))
+                self.estado[f'{componente}.start_date'] = str(inicio + (fim - inicio) * a)
+                self.estado[f'{componente}.end_date'] = str(inicio + (fim - inicio) * b)
+                self.disparar([f'{componente}.start_date', f'{componente}.end_date'])
+
+    def exportar(self):
+        # Clique no botão de exportação da página aberta
+        for componente in sorted(self.ids):
+            if componente.startswith('{') and json.loads(componente).get('type') == 'export-button':
+                self.estado[f'{componente}.n_clicks'] = (self.estado.get(f'{componente}.n_clicks') or 0) + 1
+                self.disparar([f'{componente}.n_clicks'])
+
+    def executar(self):
+        for pagina in PAGINAS:
+            self.abrir(pagina)
+            self.interagir()
+            if pagina == PAGINA_EXPORTACAO:
+                self.exportar()
+
+
+class Metricas:
+    def __init__(self):
+        self.latencias = {}
+        self.erros = {}
+        self._trava = threading.Lock()
+
+    def registrar(self, nome, duracao, ok):
+        with self._trava:
+            self.latencias.setdefault(nome, []).append(duracao)
+            self.erros[nome] = self.erros.get(nome, 0) + (not ok)
+
+    def relatorio(self, duracao_total):
+        linhas = []
+        todas = [d for lista in self.latencias.values() for d in lista]
+        for nome, lista in sorted(self.latencias.items()) + [('TOTAL', todas)]:
+            if not lista:
+                continue
+            ms = np.asarray(lista) * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            erros = sum(self.erros.values()) if nome == 'TOTAL' else self.erros[nome]
+            linhas.append({'callback': nome, 'requests': len(lista), 'erros': erros,
+                           'req_s': len(lista) / duracao_total, 'p50_ms': p50, 'p95_ms': p95,
+                           'p99_ms': p99, 'max_ms': ms.max()})
+        return pd.DataFrame(linhas)
+
+
+def _dataset_sintetico(linhas, passo, seed):
+    # CSV temporário no formato do dados.csv terminando agora
+    from simulador import gerar_linhas
+    inicio = pd.Timestamp.now().floor('min') - pd.Timedelta(passo) * linhas
+    df, _ = gerar_linhas(linhas, inicio, passo, rng=np.random.default_rng(seed))
+    caminho = os.path.join(tempfile.mkdtemp(prefix='carga_'), 'dados.csv')
+    df.to_csv(caminho, index=False)
+    return caminho
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga dos callbacks do dashboard.')
+    parser.add_argument('--usuarios', type=int, default=4, help='usuários simultâneos')
+    parser.add_argument('--sessoes', type=int, default=2, help='sessões por usuário')
+    parser.add_argument('--aquecimento', type=int, default=1, help='sessões iniciais fora da medição')
+    parser.add_argument('--linhas', type=int, default=20000, help='tamanho do dataset sintético')
+    parser.add_argument('--passo', default='2min', help='distância entre timestamps sintéticos')
+    parser.add_argument('--arquivo', default=None, help='CSV existente em vez do sintético')
+    parser.add_argument('--servidor', default=None, help='URL de uma instância rodando (sem isso, test client)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', default=None, help='grava o relatório neste arquivo')
+    args = parser.parse_args()
+
+    if args.servidor:
+        def novo_cliente():
+            return ClienteHttp(args.servidor)
+        origem = args.servidor
+    else:
+        # O app lê DASHBOARD_DADOS ao importar
+        os.environ['DASHBOARD_DADOS'] = args.arquivo or _dataset_sintetico(args.linhas, args.passo, args.seed)
+        from main import app
+
+        def novo_cliente():
+            return ClienteLocal(app)
+        origem = os.environ['DASHBOARD_DADOS']
+
+    cliente = novo_cliente()
+    indice = cliente.get('/')
+    fim_id = (re.search(r'"end_id":\s*"([^"]+)"', indice) or [None, None])[1]
+    dependencias = [dep for dep in json.loads(cliente.get('/_dash-dependencies'))
+                    if not dep.get('clientside_function')]
+    layout = json.loads(cliente.get('/_dash-layout'))
+
+    for i in range(args.aquecimento):
+        Sessao(cliente, dependencias, layout, fim_id, Metricas(), np.random.default_rng(args.seed + i)).executar()
+
+    metricas = Metricas()
+
+    def usuario(indice_usuario):
+        rng = np.random.default_rng([args.seed, indice_usuario])
+        cliente_usuario = novo_cliente()
+        for _ in range(args.sessoes):
+            Sessao(cliente_usuario, dependencias, layout, fim_id, metricas, rng).executar()
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.usuarios) as executor:
+        list(executor.map(usuario, range(args.usuarios)))
+    duracao = time.perf_counter() - inicio
+
+    relatorio = metricas.relatorio(duracao)
+    print(f'Origem: {origem} | {args.usuarios} usuário(s) x {args.sessoes} sessão(ões) em {duracao:.1f}s')
+    print(relatorio.to_string(index=False, float_format=lambda v: f'{v:.1f}'))
+    if args.json:
+        with open(args.json, 'w') as arquivo:
+            json.dump({'origem': origem, 'usuarios': args.usuarios, 'sessoes': args.sessoes,
+                       'linhas': None if args.servidor or args.arquivo else args.linhas,
+                       'duracao_s': duracao, 'callbacks': relatorio.to_dict('records')}, arquivo, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import os
+
+# Configurações do dashboard (sobrescrevíveis por variáveis de ambiente)
+
+# Acima deste número de pontos visíveis os scatters viram um heatmap de densidade
+LIMITE_PONTOS_DENSIDADE = int(os.environ.get('DASHBOARD_LIMITE_DENSIDADE', 50000))
+# Resolução (bins por eixo) do histograma 2D
+BINS_DENSIDADE = int(os.environ.get('DASHBOARD_BINS_DENSIDADE', 200))
+
+# Filtros de dia (Hora e Dia) e de par recalculados no navegador a partir de um agregado
+FILTROS_CLIENTE = os.environ.get('DASHBOARD_FILTROS_CLIENTE', '0') == '1'
+
+# Respostas menores que isto (bytes) não são comprimidas
+COMPRESSAO_MINIMO = int(os.environ.get('DASHBOARD_COMPRESSAO_MINIMO', 1024))
+
+# Modo ao vivo da página temporal: intervalo de consulta e máximo de pontos por trace
+LIVE_INTERVALO_MS = int(os.environ.get('DASHBOARD_LIVE_INTERVALO_MS', 5000))
+LIVE_MAX_PONTOS = int(os.environ.get('DASHBOARD_LIVE_MAX_PONTOS', 5000))
+# Janela (em previsões) da taxa de acerto móvel
+JANELA_ROLLING = int(os.environ.get('DASHBOARD_JANELA_ROLLING', 100))
+
+# Modo ao vivo por Server-Sent Events: uma ingestão por processo, enviada a todos os clientes
+LIVE_SSE = os.environ.get('DASHBOARD_LIVE_SSE', '0') == '1'
+# Máximo de mensagens pendentes por conexão (as mais antigas são descartadas)
+SSE_FILA_MAX = int(os.environ.get('DASHBOARD_SSE_FILA_MAX', 100))
+# Conexões SSE abertas por processo: cada uma prende uma thread do worker (gthread), então
+# o limite fica abaixo de DASHBOARD_THREADS e o resto atende os callbacks; acima dele, 503
+SSE_MAX_CONEXOES = int(os.environ.get('DASHBOARD_SSE_MAX_CONEXOES', 4))
+
+# Dataset particionado (DASHBOARD_DADOS_DIR): threads de leitura, partições mantidas em cache
+# e dias carregados na partida (0, o padrão = todos, sem poda de partições; com N > 0 o
+# restante é lido sob demanda)
+PARTICOES_THREADS = int(os.environ.get('DASHBOARD_PARTICOES_THREADS', 8))
+PARTICOES_CACHE = int(os.environ.get('DASHBOARD_PARTICOES_CACHE', 64))
+JANELA_INICIAL_DIAS = int(os.environ.get('DASHBOARD_JANELA_INICIAL_DIAS', 0))
+
+# Recarga do dataset sem reiniciar: token do endpoint /admin/recarregar (vazio = só localhost)
+# e intervalo da recarga periódica em segundos (0 = desligada)
+ADMIN_TOKEN = os.environ.get('DASHBOARD_ADMIN_TOKEN', '')
+RECARGA_INTERVALO_S = float(os.environ.get('DASHBOARD_RECARGA_INTERVALO_S', 0))
+
+# Retenção: dias mantidos como linhas brutas (0 = tudo); o resto vira agregados por par e hora
+RETENCAO_DIAS = int(os.environ.get('DASHBOARD_RETENCAO_DIAS', 0))
+
+# Cache de resultados em disco compartilhado pelos workers (vazio = desligado) e tamanho máximo
+CACHE_DIR = os.environ.get('DASHBOARD_CACHE_DIR', '')
+CACHE_LIMITE_MB = int(os.environ.get('DASHBOARD_CACHE_LIMITE_MB', 512))
+
+# Callbacks lentos em segundo plano (processo separado, com progresso e cancelamento):
+# diretório do diskcache compartilhado pelos workers (vazio = rodam no request)
+SEGUNDO_PLANO_DIR = os.environ.get('DASHBOARD_SEGUNDO_PLANO_DIR', '')
+
+# Perfil da inicialização: tempo e memória por fase no stderr (ver perfil_inicio.py)
+PERFIL_INICIO = os.environ.get('DASHBOARD_PERFIL_INICIO', '0') == '1'
+
+# Vários datasets no mesmo processo (um por modelo), escolhidos no menu lateral:
+# "nome=caminho.csv,nome2=outro.csv" (vazio = só o dataset padrão, DASHBOARD_DADOS).
+# Carregados sob demanda; acima do orçamento de memória (MB, 0 = sem limite) os usados
+# há mais tempo são descarregados
+DATASETS = os.environ.get('DASHBOARD_DATASETS', '')
+MEMORIA_DATASETS_MB = float(os.environ.get('DASHBOARD_MEMORIA_DATASETS_MB', 0))
+
+# Figuras com mais pontos que isto usam WebGL (Scattergl) no lugar de SVG, e as barras de
+# intervalos entre acertos viram um histograma agregado com BINS_INTERVALOS faixas de tempo
+LIMITE_PONTOS_WEBGL = int(os.environ.get('DASHBOARD_LIMITE_WEBGL', 20000))
+BINS_INTERVALOS = int(os.environ.get('DASHBOARD_BINS_INTERVALOS', 500))
@@ -0,0 +1,51 @@
+import io
+import os
+import pandas as pd
+import perfil_inicio
+
+# Arquivo de dados padrão (sobrescrevível por variável de ambiente)
+DADOS_CSV = os.environ.get('DASHBOARD_DADOS', 'dados.csv')
+# Diretório de arquivos particionados por data (CSV ou Parquet); tem precedência sobre DADOS_CSV
+DADOS_DIR = os.environ.get('DASHBOARD_DADOS_DIR')
+
+
+def preparar(df, anterior=None):
+    # Colunas derivadas usadas pelas páginas; 'anterior' = última linha já carregada (para o diff)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df['hour'] = df['timestamp'].dt.hour
+    df['day_of_week'] = df['timestamp'].dt.day_name()
+    df['week'] = df['timestamp'].dt.isocalendar().week.astype('int32')
+    df['period_of_day'] = pd.cut(df['hour'], bins=[0, 6, 12, 18, 24], labels=['Madrugada', 'Manhã', 'Tarde', 'Noite'], right=False)
+    df['diff_previsao'] = df['valor_real'] - df['previsao']
+    df['diff_previsao_com_delta'] = df['valor_real'] - df['previsao_com_delta']
+    df['movement_magnitude'] = df['valor_real'].diff().abs()
+    if anterior is not None and len(anterior) and len(df):
+        df.loc[df.index[0], 'movement_magnitude'] = abs(df['valor_real'].iloc[0] - anterior['valor_real'].iloc[-1])
+    return df
+
+
+def carregar(caminho=DADOS_CSV):
+    with perfil_inicio.fase('carga: leitura do CSV'):
+        df = pd.read_csv(caminho)
+    with perfil_inicio.fase('carga: colunas derivadas'):
+        return preparar(df)
+
+
+def ler_novas_linhas(caminho, offset, colunas):
+    # Lê apenas o que foi anexado ao CSV depois de 'offset' (até a última linha completa)
+    with open(caminho, 'rb') as f:
+        f.seek(offset)
+        bloco = f.read()
+    fim = bloco.rfind(b'\n') + 1
+    if fim == 0:
+        return pd.DataFrame(columns=colunas), offset
+    novas = pd.read_csv(io.BytesIO(bloco[:fim]), header=None, names=colunas)
+    return novas, offset + fim
+
+
+def fonte():
+    # (caminho, carregador) da fonte configurada: diretório particionado ou o CSV único
+    if DADOS_DIR:
+        import particoes
+        return DADOS_DIR, particoes.carregar_inicial
+    return DADOS_CSV, carregar
@@ -0,0 +1,421 @@
+import contextvars
+import logging
+import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from flask import has_request_context, request
+import plotly.io as pio
+import bitmaps
+import cache_disco
+import perfil_inicio
+import prefixos
+import retencao
+from streaming import AcumuladorVolatilidade, IndiceQuantis
+from config import MEMORIA_DATASETS_MB
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# SNAPSHOTS IMUTÁVEIS DO DATASET (read-copy-update)
+# ==============================
+
+# Um snapshot reúne o DataFrame e tudo o que é derivado dele (acumuladores, KPIs,
+# agregados). Nada dentro de um snapshot é alterado depois de publicado: ingestão e
+# recarga montam um snapshot novo e trocam a referência global de uma vez.
+# Cada callback pega o snapshot atual no início (atual()) e usa só ele até o fim,
+# então uma troca no meio do request não mistura versões. Snapshots antigos são
+# liberados pelo coletor quando o último request que os usa termina.
+#
+# A ingestão não copia o DataFrame carregado: as linhas novas ficam numa cauda de blocos
+# ao lado da base (que, com DASHBOARD_SHARED_DIR, continua mapeada e compartilhada entre
+# workers). O df completo só é montado quando uma página o lê, uma vez por snapshot.
+
+
+def _tamanho(valor):
+    # Bytes aproximados de um derivado (tabelas, arrays e os containers deles)
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, (pd.Series, pd.Index)):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(_tamanho(k) + _tamanho(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple, set)):
+        return sys.getsizeof(valor) + sum(_tamanho(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+def _anexar_bloco(cauda, novas):
+    # Cada bloco tem ao menos o dobro do seguinte: anexar custa O(m log) amortizado e a
+    # cauda fica com O(log) blocos
+    cauda = list(cauda) + [novas]
+    while len(cauda) > 1 and len(cauda[-2]) < 2 * len(cauda[-1]):
+        ultimo = cauda.pop()
+        cauda[-1] = pd.concat([cauda[-1], ultimo], ignore_index=True)
+    return tuple(cauda)
+
+
+# Derivados conhecidos: nome -> construir(snapshot). As páginas registram os seus ao importar.
+DERIVADOS = {}
+# Derivados que sabem se estender: nome -> estender(valor_anterior, linhas_novas), usado
+# quando o snapshot veio de um estender() e o anterior já tinha calculado o valor
+INCREMENTAIS = {}
+
+
+def registrar_derivado(nome, estender=None):
+    def decorador(construir):
+        DERIVADOS[nome] = construir
+        if estender is not None:
+            INCREMENTAIS[nome] = estender
+        return construir
+    return decorador
+
+
+class Snapshot:
+    def __init__(self, df, versao, volatility_acc, quantis, contadores, compactado=None, indice=None, filtros=None,
+                 cauda=()):
+        # Linhas do carregamento (base) e as anexadas depois pela ingestão (cauda)
+        self.base = df
+        self.cauda = tuple(cauda)
+        self.linhas = len(df) + sum(len(bloco) for bloco in self.cauda)
+        self._df = None if self.cauda else df
+        self.versao = versao
+        self.volatility_acc = volatility_acc
+        self.quantis = quantis
+        self.contadores = contadores
+        # Linhas antigas agregadas por (par, hora) fora do df (ver retencao.py)
+        self.compactado = compactado if compactado is not None else retencao.vazio()
+        # Somas de prefixo por par sobre as linhas do df (ver prefixos.py)
+        self.indice = indice if indice is not None else prefixos.IndicePrefixos.construir(self.df)
+        # Bitmaps por valor de par, dia, hora, direções e acertos, alinhados às linhas do df
+        self.filtros = filtros if filtros is not None else bitmaps.IndiceBitmaps.construir(self.df)
+        self._derivados = {}
+        # nome -> (valor, linhas): derivado incremental de um snapshot anterior, válido para
+        # as primeiras 'linhas' linhas deste (preenchido por estender)
+        self._herdados = {}
+        # RLock: um derivado pode pedir outro ao ser construído
+        self._trava = threading.RLock()
+        # Trava própria do df: os construtores dos derivados leem snapshot.df
+        self._trava_df = threading.Lock()
+        self._memoria = None
+
+    def __len__(self):
+        return self.linhas
+
+    @property
+    def df(self):
+        # DataFrame completo (base + cauda), montado no primeiro acesso
+        if self._df is None:
+            with self._trava_df:
+                if self._df is None:
+                    self._df = pd.concat([self.base, *self.cauda], ignore_index=True)
+        return self._df
+
+    def _blocos(self):
+        return [self.base, *self.cauda]
+
+    def _fatia(self, inicio, fim=None):
+        # Linhas [inicio, fim) sem montar o df inteiro (uma view quando cabem num bloco)
+        fim = self.linhas if fim is None else fim
+        partes, deslocamento = [], 0
+        for bloco in self._blocos():
+            a, b = max(inicio - deslocamento, 0), min(fim - deslocamento, len(bloco))
+            if a < b:
+                partes.append(bloco.iloc[a:b])
+            deslocamento += len(bloco)
+        if len(partes) == 1:
+            return partes[0]
+        return pd.concat(partes, ignore_index=True) if partes else self.base.iloc[:0]
+
+    def _posicao(self, instante, lado='right'):
+        # searchsorted do timestamp nas linhas do snapshot (base e cauda estão ordenadas)
+        deslocamento = 0
+        for bloco in self._blocos():
+            if len(bloco):
+                pos = int(bloco['timestamp'].searchsorted(instante, side=lado))
+                if pos < len(bloco):
+                    return deslocamento + pos
+            deslocamento += len(bloco)
+        return deslocamento
+
+    def ultimas(self, k):
+        return self._fatia(max(self.linhas - k, 0))
+
+    def recentes(self, instante, contexto=0):
+        # (linhas posteriores a 'instante' precedidas de até 'contexto' linhas, posição da
+        # primeira nova); o modo ao vivo lê só o fim do snapshot
+        pos = self._posicao(pd.Timestamp(instante))
+        inicio = max(pos - contexto, 0)
+        return self._fatia(inicio), pos - inicio
+
+    @classmethod
+    def construir(cls, df, versao):
+        with perfil_inicio.fase('derivações: volatilidade'):
+            volatilidade = AcumuladorVolatilidade().atualizar(df)
+        with perfil_inicio.fase('derivações: quantis'):
+            quantis = IndiceQuantis().atualizar(df)
+        with perfil_inicio.fase('derivações: índice de prefixos'):
+            indice = prefixos.IndicePrefixos.construir(df)
+        with perfil_inicio.fase('derivações: bitmaps'):
+            filtros = bitmaps.IndiceBitmaps.construir(df)
+        return cls(
+            df, versao,
+            volatilidade,
+            quantis,
+            {
+                'total': len(df),
+                'acertos_sem': int(df['acerto_sem_delta'].sum()),
+                'acertos_com': int(df['acerto_com_delta'].sum()),
+            },
+            indice=indice,
+            filtros=filtros,
+        )
+
+    def estender(self, novas, versao):
+        # Snapshot novo com as linhas anexadas; as cópias dos acumuladores compartilham os
+        # buckets e duplicam só os que as linhas novas tocam
+        contadores = {
+            'total': self.contadores['total'] + len(novas),
+            'acertos_sem': self.contadores['acertos_sem'] + int(novas['acerto_sem_delta'].sum()),
+            'acertos_com': self.contadores['acertos_com'] + int(novas['acerto_com_delta'].sum()),
+        }
+        novo = Snapshot(
+            self.base, versao,
+            self.volatility_acc.copiar().atualizar(novas),
+            self.quantis.copiar().atualizar(novas),
+            contadores,
+            self.compactado,
+            self.indice.estendido(novas),
+            self.filtros.estendido(novas),
+            _anexar_bloco(self.cauda, novas),
+        )
+        # Derivados incrementais seguem para o novo snapshot (calculados só sobre as linhas novas)
+        novo._herdados = dict(self._herdados)
+        for nome in INCREMENTAIS:
+            if nome in self._derivados:
+                novo._herdados[nome] = (self._derivados[nome], self.linhas)
+        if self._memoria is not None:
+            novo._memoria = self._memoria + int(novas.memory_usage(deep=True).sum())
+        return novo
+
+    def compactar(self, dias, versao=None):
+        # Snapshot novo com as linhas fora da janela de retenção agregadas; acumuladores e
+        # contadores já incluem essas linhas e continuam valendo
+        if not dias or not self.linhas:
+            return self
+        k = self._posicao(retencao.corte(self.ultimas(1), dias), lado='left')
+        if k == 0:
+            return self
+        compactado = retencao.acumular(self.compactado, self._fatia(0, k))
+        # Corta o começo dos blocos (fatias, sem cópia); se a base inteira saiu da janela,
+        # o primeiro bloco da cauda vira a base
+        blocos, resto = self._blocos(), k
+        while len(blocos) > 1 and resto >= len(blocos[0]):
+            resto -= len(blocos.pop(0))
+        base = blocos[0].iloc[resto:]
+        return Snapshot(base, versao or f'{self.versao}-c{len(compactado)}', self.volatility_acc,
+                        self.quantis, self.contadores, compactado,
+                        self.indice.cortado(self._fatia(k, k + 1)['timestamp'].iloc[0]),
+                        self.filtros.cortado(k), blocos[1:])
+
+    def _antigos(self, inicio, fim, par):
+        # Agregados da retenção do intervalo (horas anteriores às linhas brutas)
+        antigos = retencao.recortar(self.compactado, inicio, fim, antes_de=self._fatia(0, 1)['timestamp'].min())
+        if par not in (None, 'Todos'):
+            antigos = antigos[antigos['par'] == par]
+        return antigos
+
+    def consultar(self, inicio=None, fim=None, par=None):
+        # Totais (prefixos.CAMPOS) de [inicio, fim] juntando linhas brutas e agregados
+        totais = self.indice.consultar(inicio, fim, par)
+        antigos = self._antigos(inicio, fim, par)
+        for campo in prefixos.CAMPOS:
+            totais[campo] += float(antigos[campo].sum())
+        return totais
+
+    def por_periodo(self, inicio=None, fim=None, freq='D', par=None):
+        # Totais por período (dia ou mais largo que a hora dos agregados) nas duas camadas
+        tabela = self.indice.por_periodo(inicio, fim, freq, par)
+        antigos = self._antigos(inicio, fim, par)
+        if antigos.empty:
+            return tabela
+        antigos = antigos.groupby(antigos['hora'].dt.floor(freq).rename('periodo'))[prefixos.CAMPOS].sum()
+        return pd.concat([antigos, tabela]).groupby(level=0).sum()
+
+    def derivado(self, nome, construir=None):
+        # Estruturas derivadas calculadas sob demanda uma vez por snapshot (construir(snapshot))
+        # (com DASHBOARD_CACHE_DIR, lidas do cache em disco se outro worker já calculou)
+        construir = construir or DERIVADOS[nome]
+        if nome not in self._derivados:
+            with self._trava:
+                if nome not in self._derivados:
+                    calcular = lambda: construir(self)
+                    if nome in self._herdados and construir is DERIVADOS.get(nome):
+                        anterior, linhas = self._herdados[nome]
+                        calcular = lambda: INCREMENTAIS[nome](anterior, self._fatia(linhas))
+                    self._derivados[nome] = cache_disco.memoizar(f'derivado:{nome}:{self.versao}', calcular)
+                    self._herdados.pop(nome, None)
+        return self._derivados[nome]
+
+    def aquecer(self):
+        # Calcula todos os derivados registrados (usado antes de publicar uma recarga)
+        for nome, construir in list(DERIVADOS.items()):
+            self.derivado(nome, construir)
+        return self
+
+    def memoria(self):
+        # Bytes do snapshot (orçamento do registro de datasets): linhas e agregados (calculado
+        # uma vez), índices, acumuladores e os derivados já calculados
+        if self._memoria is None:
+            self._memoria = int(sum(bloco.memory_usage(deep=True).sum() for bloco in self._blocos())
+                                + self.compactado.memory_usage(deep=True).sum())
+        estruturas = (self.indice.memoria() + self.filtros.memoria()
+                      + self.quantis.memoria() + self.volatility_acc.memoria())
+        return self._memoria + estruturas + sum(_tamanho(valor) for valor in list(self._derivados.values()))
+
+    def kpis(self):
+        total = self.contadores['total']
+        return {
+            'total': total,
+            'taxa_sem_delta': self.contadores['acertos_sem'] / total * 100 if total else 0.0,
+            'taxa_com_delta': self.contadores['acertos_com'] / total * 100 if total else 0.0,
+        }
+
+    def payload_filtros(self):
+        return self.derivado('payload_filtros')
+
+
+@registrar_derivado('payload_filtros')
+def _payload_filtros(snapshot):
+    # Agregado compacto de acertos/totais por (dia, hora, par, período) para os filtros no navegador
+    df = snapshot.df
+    agregado = df.groupby(['day_of_week', 'hour', 'par', 'period_of_day'], observed=True).agg(
+        total=('acerto_sem_delta', 'size'),
+        acertos_sem=('acerto_sem_delta', 'sum'),
+        acertos_com=('acerto_com_delta', 'sum')
+    ).reset_index()
+    dias = sorted(agregado['day_of_week'].astype(str).unique())
+    pares = sorted(agregado['par'].astype(str).unique())
+    periodos = df['period_of_day'].cat.categories.tolist()
+    # Colunar, com as dimensões de texto como índices nas listas acima
+    return {
+        'dias': dias,
+        'pares': pares,
+        'periodos': periodos,
+        'dia': agregado['day_of_week'].astype(str).map(dias.index).tolist(),
+        'hora': agregado['hour'].astype(int).tolist(),
+        'par': agregado['par'].astype(str).map(pares.index).tolist(),
+        'periodo': agregado['period_of_day'].astype(str).map(periodos.index).tolist(),
+        'total': agregado['total'].astype(int).tolist(),
+        'acertos_sem': agregado['acertos_sem'].astype(int).tolist(),
+        'acertos_com': agregado['acertos_com'].astype(int).tolist(),
+        'template': pio.templates['plotly_dark'].to_plotly_json(),
+    }
+
+
+# ==============================
+# REGISTRO DE DATASETS (um por modelo, carregados sob demanda)
+# ==============================
+
+# Cada dataset nomeado tem um carregador (utils.py registra um por fonte) e no máximo um
+# snapshot publicado. Nos requests vale o dataset escolhido no menu (cookie 'dataset');
+# fora deles (threads, scripts) o padrão, ou o fixado com usando(nome). Quando a soma
+# da memória dos carregados passa de MEMORIA_DATASETS_MB, os usados há mais tempo saem
+# do registro e são recarregados no próximo pedido.
+PADRAO = 'padrao'
+COOKIE = 'dataset'
+SELETOR = 'dataset-selecao'
+
+_carregadores = {}
+_travas_carga = {}
+_publicados = {}
+_usos = {}
+_trava_troca = threading.Lock()
+_vivos = weakref.WeakSet()
+_selecao = contextvars.ContextVar('dataset_selecao', default=None)
+
+
+def registrar(nome, carregar):
+    # carregar() -> snapshot, chamado no primeiro pedido e depois de uma descarga
+    _carregadores[nome] = carregar
+    _travas_carga[nome] = threading.Lock()
+
+
+def nomes():
+    return list(_carregadores)
+
+
+def selecionado():
+    nome = _selecao.get()
+    if nome is None and has_request_context():
+        nome = request.cookies.get(COOKIE)
+    return nome if nome in _carregadores else PADRAO
+
+
+@contextmanager
+def usando(nome):
+    # Fixa o dataset fora de um request (ex.: callbacks em segundo plano)
+    token = _selecao.set(nome)
+    try:
+        yield
+    finally:
+        _selecao.reset(token)
+
+
+def atual(nome=None):
+    # Leitura de uma referência: não bloqueia, mesmo durante uma troca; só o primeiro
+    # pedido de um dataset não carregado espera a carga
+    nome = nome or selecionado()
+    _usos[nome] = time.monotonic()
+    snapshot = _publicados.get(nome)
+    if snapshot is None:
+        if nome not in _carregadores:
+            raise KeyError(f'dataset não registrado: {nome}')
+        with _travas_carga[nome]:
+            snapshot = _publicados.get(nome)
+            if snapshot is None:
+                inicio = time.perf_counter()
+                snapshot = publicar(_carregadores[nome](), nome)
+                logger.info('Dataset %s carregado em %.2fs (%.0f MB)', nome,
+                            time.perf_counter() - inicio, snapshot.memoria() / 2 ** 20)
+    return snapshot
+
+
+def publicar(snapshot, nome=PADRAO):
+    with _trava_troca:
+        _publicados[nome] = snapshot
+        _usos[nome] = time.monotonic()
+        _vivos.add(snapshot)
+        _liberar(nome)
+    return snapshot
+
+
+def _liberar(manter):
+    # Descarrega os datasets usados há mais tempo até caber no orçamento (nunca 'manter')
+    if not MEMORIA_DATASETS_MB:
+        return
+    limite = MEMORIA_DATASETS_MB * 2 ** 20
+    total = sum(snapshot.memoria() for snapshot in _publicados.values())
+    while total > limite and len(_publicados) > 1:
+        nome = min((n for n in _publicados if n != manter), key=lambda n: _usos.get(n, 0.0))
+        total -= _publicados.pop(nome).memoria()
+        logger.info('Dataset %s descarregado (orçamento de %g MB)', nome, MEMORIA_DATASETS_MB)
+
+
+def carregados():
+    # {nome: MB} dos datasets em memória
+    return {nome: snapshot.memoria() / 2 ** 20 for nome, snapshot in list(_publicados.items())}
+
+
+def versoes():
+    return {snapshot.versao for snapshot in list(_publicados.values())}
+
+
+def vivos():
+    # Snapshots ainda referenciados (os publicados + os fixados por requests em andamento)
+    return len(_vivos)
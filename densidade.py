@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from config import BINS_DENSIDADE
+
+# ==============================
+# DENSIDADE 2D NO SERVIDOR (estilo datashader)
+# ==============================
+
+ESCALAS = ['Plasma', 'Viridis', 'Cividis', 'Inferno', 'Magma', 'Blues']
+
+
+def extensao_visivel(relayout):
+    # Extrai (x_range, y_range) de um relayoutData; None = eixo em autorange
+    relayout = relayout or {}
+    faixas = []
+    for eixo in ('xaxis', 'yaxis'):
+        if f'{eixo}.range[0]' in relayout:
+            faixas.append((float(relayout[f'{eixo}.range[0]']), float(relayout[f'{eixo}.range[1]'])))
+        elif f'{eixo}.range' in relayout:
+            faixas.append(tuple(float(v) for v in relayout[f'{eixo}.range']))
+        else:
+            faixas.append(None)
+    return faixas[0], faixas[1]
+
+
+def recortar(df, x, y, x_range=None, y_range=None):
+    mascara = df[x].notna() & df[y].notna()
+    if x_range is not None:
+        mascara &= df[x].between(*x_range)
+    if y_range is not None:
+        mascara &= df[y].between(*y_range)
+    return df[mascara]
+
+
+def histograma_2d(df, x, y, grupo='par', x_range=None, y_range=None, bins=BINS_DENSIDADE):
+    # Mesmas bordas para todos os grupos, para que os heatmaps fiquem alinhados
+    x_range = x_range or (df[x].min(), df[x].max())
+    y_range = y_range or (df[y].min(), df[y].max())
+    bordas_x = np.linspace(x_range[0], x_range[1], bins + 1)
+    bordas_y = np.linspace(y_range[0], y_range[1], bins + 1)
+
+    # Uma passada para todos os grupos: o código do grupo é a primeira dimensão do histograma
+    codigos, nomes = pd.factorize(df[grupo], sort=True)
+    contagens, _ = np.histogramdd(
+        (codigos, df[x].to_numpy(), df[y].to_numpy()),
+        bins=[np.arange(len(nomes) + 1) - 0.5, bordas_x, bordas_y]
+    )
+    # linhas = y, colunas = x (formato do go.Heatmap)
+    return {nome: contagens[i].T for i, nome in enumerate(nomes)}, bordas_x, bordas_y
+
+
+def figura_densidade(df, x, y, grupo='par', x_range=None, y_range=None, title=None, labels=None):
+    labels = labels or {}
+    contagens, bordas_x, bordas_y = histograma_2d(df, x, y, grupo, x_range, y_range)
+    centros_x = (bordas_x[:-1] + bordas_x[1:]) / 2
+    centros_y = (bordas_y[:-1] + bordas_y[1:]) / 2
+
+    fig = go.Figure()
+    for i, (nome, z) in enumerate(contagens.items()):
+        # Células vazias ficam transparentes; um par visível por vez (os outros pela legenda)
+        fig.add_trace(go.Heatmap(
+            x=centros_x,
+            y=centros_y,
+            z=np.where(z > 0, z, np.nan),
+            name=str(nome),
+            colorscale=ESCALAS[i % len(ESCALAS)],
+            showlegend=True,
+            showscale=i == 0,
+            visible=True if i == 0 else 'legendonly',
+            hovertemplate=f'{nome}<br>x: %{{x:.4g}}<br>y: %{{y:.4g}}<br>Pontos: %{{z}}<extra></extra>'
+        ))
+    fig.update_layout(
+        title=f'{title} - densidade ({len(df)} pontos)' if title else None,
+        xaxis_title=labels.get(x, x),
+        yaxis_title=labels.get(y, y),
+        xaxis=dict(range=[bordas_x[0], bordas_x[-1]]),
+        yaxis=dict(range=[bordas_y[0], bordas_y[-1]]),
+        template='plotly_dark'
+    )
+    return fig
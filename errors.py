@@ -1,6 +1,7 @@
 from dash import html, dcc, Input, Output
-import plotly.express as px
-from utils import df
+import plotly.graph_objects as go
+import dataset
+from payload import binario
 
 def layout():
     return html.Div([
@@ -14,7 +15,7 @@ def layout():
             value='acerto_sem_delta',
             className='bg-gray-700 text-white p-2 rounded-lg w-1/2 mb-4'
         ),
-        html.Button('Exportar Dados', id='export-button', className='neon-button text-white font-bold py-2 px-4 rounded mb-4'),
+        html.Button('Exportar Dados', id={'type': 'export-button', 'index': 'errors'}, className='neon-button text-white font-bold py-2 px-4 rounded mb-4'),
         html.H2('Distribuição de Erros por Hora e Dia', className='text-xl font-semibold mb-2 text-blue-300'),
         html.Div(className='loading-spinner', id='loading-error-analysis', style={'display': 'none'}),
         dcc.Graph(id='error-analysis'),
@@ -36,9 +37,13 @@ def register_callbacks(app):
          Output('loading-error-magnitude', 'style')],
         [Input('error-type', 'value')]
     )
+    @binario
     def update_errors(error_type):
-        error_df = df[df[error_type] == False]
-        error_counts = error_df.groupby(['hour', 'day_of_week']).size().reset_index(name='count')
+        import plotly.express as px
+        snapshot = dataset.atual()
+        # Contagens de erros pelos bitmaps (AND com o bitmap de erro + popcount), sem filtrar linhas
+        erros = {error_type: False}
+        error_counts = snapshot.filtros.contagens(['hour', 'day_of_week'], **erros).reset_index(name='count')
         error_fig = px.scatter(
             error_counts,
             x='hour',
@@ -52,7 +57,7 @@ def register_callbacks(app):
             hover_data={'count': True}
         )
 
-        error_direction = error_df.groupby(['direcao_prevista']).size().reset_index(name='count')
+        error_direction = snapshot.filtros.contagens('direcao_prevista', **erros).reset_index(name='count')
         error_direction_fig = px.bar(
             error_direction,
             x='direcao_prevista',
@@ -61,28 +66,24 @@ def register_callbacks(app):
             labels={'direcao_prevista': 'Direção Prevista', 'count': 'Número de Erros'},
             template='plotly_dark',
             color='count',
-            color_continuous_scale='Plasma',
-            hovertemplate='Direção: %{x}<br>Erros: %{y}<extra></extra>'
+            color_continuous_scale='Plasma'
         )
+        error_direction_fig.update_traces(hovertemplate='Direção: %{x}<br>Erros: %{y}<extra></extra>')
 
-        error_bins = pd.qcut(df[error_type.replace('acerto', 'diff')].abs(), q=4, duplicates='drop')
-        error_magnitude_metrics = df.groupby(error_bins, observed=True).agg({
-            'acerto_sem_delta': 'mean',
-            'acerto_com_delta': 'mean'
-        }).reset_index()
-        error_magnitude_metrics['acerto_sem_delta'] = error_magnitude_metrics['acerto_sem_delta'] * 100
-        error_magnitude_metrics['acerto_com_delta'] = error_magnitude_metrics['acerto_com_delta'] * 100
+        # Faixas de erro e taxa de acerto por faixa vêm dos sketches (sem ordenar as linhas)
+        metrica = 'erro_sem' if error_type == 'acerto_sem_delta' else 'erro_com'
+        error_magnitude_metrics = snapshot.quantis.bins(metrica)
         error_magnitude_fig = go.Figure()
         error_magnitude_fig.add_trace(go.Bar(
-            x=error_magnitude_metrics[error_type.replace('acerto', 'diff')],
-            y=error_magnitude_metrics['acerto_sem_delta'],
+            x=error_magnitude_metrics['intervalo'],
+            y=error_magnitude_metrics['taxa_acerto_sem_delta'],
             name='Sem Delta',
             marker_color='#3B82F6',
             hovertemplate='Erro Absoluto: %{x}<br>Taxa: %{y:.2f}%<extra></extra>'
         ))
         error_magnitude_fig.add_trace(go.Bar(
-            x=error_magnitude_metrics[error_type.replace('acerto', 'diff')],
-            y=error_magnitude_metrics['acerto_com_delta'],
+            x=error_magnitude_metrics['intervalo'],
+            y=error_magnitude_metrics['taxa_acerto_com_delta'],
             name='Com Delta',
             marker_color='#10B981',
             hovertemplate='Erro Absoluto: %{x}<br>Taxa: %{y:.2f}%<extra></extra>'
@@ -0,0 +1,27 @@
+import numpy as np
+import plotly.graph_objects as go
+
+# ==============================
+# FACETAS: VÁRIAS SÉRIES A PARTIR DE UM ÚNICO PIVOT
+# ==============================
+
+# Em vez de filtrar o agregado uma vez por grupo (custo grupos x linhas), agrupa por
+# (faceta, x) uma única vez, faz o unstack e cada trace é uma linha da matriz.
+
+
+def pivotar(df, faceta, x, valores=None, agg='size'):
+    # Linhas = um valor de 'faceta' (um trace), colunas = valores de x; NaN onde não há dados
+    grupos = df.groupby([faceta, x], observed=True, sort=True)
+    agregado = grupos.size() if valores is None else grupos[valores].agg(agg)
+    return agregado.unstack(x)
+
+
+def traces(pivot, trace=go.Bar, nome='{}', **props):
+    # Um trace por linha do pivot; combinações sem dados ficam fora do trace
+    x = pivot.columns.to_numpy()
+    matriz = pivot.to_numpy(dtype='float64', na_value=np.nan)
+    resultado = []
+    for chave, y in zip(pivot.index, matriz):
+        presentes = ~np.isnan(y)
+        resultado.append(trace(x=x[presentes], y=y[presentes], name=nome.format(chave), **props))
+    return resultado
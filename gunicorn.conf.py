@@ -0,0 +1,27 @@
+import os
+
+# Configuração do gunicorn para servir o dashboard com vários workers.
+# O master publica o dataset preparado em DASHBOARD_SHARED_DIR antes do fork;
+# cada worker apenas mapeia os arquivos (ver shared_data.py).
+os.environ.setdefault('DASHBOARD_SHARED_DIR', '/dev/shm/dashboard_pancake')
+
+bind = os.environ.get('DASHBOARD_BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('DASHBOARD_WORKERS', 4))
+# Workers com threads: conexões SSE (/stream/previsoes) ficam abertas sem bloquear o worker,
+# cada uma prendendo uma thread; DASHBOARD_SSE_MAX_CONEXOES deve ficar abaixo de threads
+worker_class = 'gthread'
+threads = int(os.environ.get('DASHBOARD_THREADS', 8))
+preload_app = False
+
+
+def on_starting(server):
+    # Importa só o carregador, sem montar o app no master
+    from dados import fonte
+    from shared_data import garantir_publicado
+    manifesto = garantir_publicado(os.environ['DASHBOARD_SHARED_DIR'], *fonte())
+    server.log.info('Dataset publicado: %s (%s linhas)', manifesto['versao'], manifesto['linhas'])
+
+
+def post_worker_init(worker):
+    from shared_data import memoria_processo
+    worker.log.info('Worker %s memória (MB): %s', worker.pid, memoria_processo())
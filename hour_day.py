@@ -1,78 +1,65 @@
-from dash import html, Input, Output
+from dash import html, Input, Output, ClientsideFunction
 from dash import dcc
-import plotly.express as px
 import plotly.graph_objects as go
-from utils import df, calculate_metrics
-from typing import cast
+import dataset
+import metricas
+import renderizacao
+import segundo_plano
+import utils  # carrega os dados e publica o snapshot inicial
+from payload import binario
+from config import FILTROS_CLIENTE
+import numpy as np
 import pandas as pd
 
-options1 = [{'label': day, 'value': day} for day in df['day_of_week'].unique()] + [{'label': 'Todos', 'value': 'Todos'}]
-options = cast(list[dict[str, str]], options1)
-
 def calcular_intervalos_entre_acertos(df, coluna_alvo='acerto_sem_delta'):
     df = df.sort_values('timestamp')
     df_acertos = df[df[coluna_alvo] == True].copy()
     df_acertos['intervalo'] = df_acertos['timestamp'].diff().dt.total_seconds() / 60  # em minutos
     return df_acertos['intervalo'].dropna()
 
-def contar_acertos_consecutivos_por(df, coluna_grupo, coluna_alvo):
-    df_sorted = df.sort_values('timestamp')
-    df_sorted['grupo'] = df_sorted[coluna_grupo]
-    resultados = {}
-
-    for grupo, grupo_df in df_sorted.groupby('grupo'):
-        atual = None
-        contador = 0
-        sequencias = []
-        for valor in grupo_df[coluna_alvo]:
-            if valor == True:
-                contador = contador + 1 if atual else 1
-                atual = True
-            else:
-                if contador > 1:
-                    sequencias.append(contador)
-                contador = 0
-                atual = False
-        if contador > 1:
-            sequencias.append(contador)
-        resultados[grupo] = len(sequencias)
-    return resultados
-
-def contar_sequencias_com_intervalo_fixo(df, coluna_alvo='acerto_sem_delta', intervalos=[5, 10, 15, 30, 60]):
+def contar_sequencias_com_intervalo_fixo(df, coluna_alvo='acerto_sem_delta', intervalos=[5, 10, 15, 30, 60], progresso=None):
+    # Uma sequência é um trecho máximo de acertos consecutivos separados exatamente pelo
+    # intervalo: conta os inícios de cada trecho de diffs iguais ao intervalo
     df = df.sort_values('timestamp')
-    acertos = df[df[coluna_alvo] == True].copy()
-    acertos['timestamp'] = pd.to_datetime(acertos['timestamp'])
-    
-    resultados = []
+    diffs = pd.to_datetime(df.loc[df[coluna_alvo] == True, 'timestamp']).diff().to_numpy()
 
+    resultados = []
     for intervalo in intervalos:
-        intervalo_td = pd.Timedelta(minutes=intervalo)
-        sequencias = 0
-        i = 0
-
-        while i < len(acertos) - 1:
-            count = 1
-            while (i + count < len(acertos)) and (acertos.iloc[i + count]['timestamp'] - acertos.iloc[i + count - 1]['timestamp'] == intervalo_td):
-                count += 1
-            if count > 1:
-                sequencias += 1
-                i = i + count  # pula toda a sequência
-            else:
-                i += 1
+        iguais = diffs == np.timedelta64(pd.Timedelta(minutes=intervalo))
+        # iguais[0] é o diff do primeiro acerto (NaT), sempre False
+        sequencias = int(np.count_nonzero(iguais[1:] & ~iguais[:-1]))
         resultados.append({'intervalo_min': intervalo, 'quantidade': sequencias})
-    
+        if progresso is not None:
+            progresso(len(resultados))
+
     return pd.DataFrame(resultados)
 
+# Métricas de cada callback, calculadas em uma única avaliação (ver metricas.py)
+PEDIDO_METRICAS = {
+    'hour': ['taxa', 'total'],
+    'day_of_week': ['taxa', 'total'],
+    'period_of_day': ['taxa', 'total'],
+    ('day_of_week', 'hour'): ['taxa'],
+}
+PEDIDO_SEQUENCIAS = {
+    'hour': ['sequencias'],
+    'day_of_week': ['sequencias'],
+}
+# Etapas do callback de sequências reportadas na barra de progresso:
+# sequências, intervalos, janelas e uma por intervalo fixo
+INTERVALOS_FIXOS = [5, 10, 15, 30, 60]
+ETAPAS_SEQUENCIAS = 3 + len(INTERVALOS_FIXOS)
+
 def layout():
     return html.Div([
         html.H1('Análise por Hora e Dia', className='text-4xl font-bold text-blue-400 mb-6'),
         dcc.Dropdown(
             id='day-filter',
-            options=options,
+            options=utils.opcoes_dias(dataset.atual()),
             value='Todos',
             className='bg-gray-700 text-white p-2 rounded-lg w-1/2 mb-4'
         ),
-        html.Button('Exportar Dados', id='export-button', className='neon-button text-white font-bold py-2 px-4 rounded mb-4'),
+        html.Button('Exportar Dados', id={'type': 'export-button', 'index': 'hour_day'}, className='neon-button text-white font-bold py-2 px-4 rounded mb-4'),
         html.H2('Taxa de Acerto por Hora', className='text-xl font-semibold mb-2 text-blue-300'),
         html.Div(className='loading-spinner', id='loading-hourly', style={'display': 'none'}),
         dcc.Graph(id='hourly-accuracy'),
@@ -85,6 +72,9 @@ def layout():
         html.H2('Taxa de Acerto por Hora e Dia', className='text-xl font-semibold mb-2 text-blue-300'),
         html.Div(className='loading-spinner', id='loading-heatmap', style={'display': 'none'}),
         dcc.Graph(id='hour-day-heatmap'),
+        # Visível enquanto o callback de sequências roda em segundo plano (segundo_plano.py)
+        html.Progress(id='progresso-hour-day', value='0', max=str(ETAPAS_SEQUENCIAS),
+                      className='w-full mb-4', style={'display': 'none'}),
         html.H2('Sequência de Acertos por Hora', className='text-xl font-semibold mb-2 text-blue-300'),
         dcc.Graph(id='sequencia-hora'),
 
@@ -96,34 +86,31 @@ def layout():
         dcc.Graph(id='acertos-por-janela'),
         html.H2('Sequências com Intervalo Fixo Entre Acertos (Sem Delta)', className='text-xl font-semibold mb-2 text-blue-300'),
         dcc.Graph(id='sequencia-fixa'),
+        dcc.Store(id='filtros-agregados', data=dataset.atual().payload_filtros() if FILTROS_CLIENTE else None),
     ])
 
-def register_callbacks(app):
+def register_metric_callbacks(app):
     @app.callback(
             [
         Output('hourly-accuracy', 'figure'),
         Output('daily-accuracy', 'figure'),
         Output('period-accuracy', 'figure'),
         Output('hour-day-heatmap', 'figure'),
-        Output('sequencia-hora', 'figure'),
-        Output('sequencia-dia', 'figure'),
-        Output('intervalo-acertos', 'figure'),
-        Output('acertos-por-janela', 'figure'),
-        Output('sequencia-fixa', 'figure'),
         Output('loading-hourly', 'style'),
         Output('loading-daily', 'style'),
         Output('loading-period', 'style'),
         Output('loading-heatmap', 'style'),
-        
-
     ],
     [Input('day-filter', 'value')]
 )
-    def update_hour_day(day):
-        filtered_df = df if day == 'Todos' else df[df['day_of_week'] == day]
-        hourly_metrics = calculate_metrics(filtered_df, 'hour')
-        daily_metrics = calculate_metrics(filtered_df, 'day_of_week')
-        period_metrics = calculate_metrics(filtered_df, 'period_of_day', categorical=True)
+    @binario
+    def update_metricas_hour_day(day):
+        import plotly.express as px
+        # Todas as taxas saem da tabela base do snapshot (uma passada pelas linhas)
+        resultado = metricas.avaliar(metricas.base_snapshot(dataset.atual(), day), PEDIDO_METRICAS)
+        hourly_metrics = resultado['hour']
+        daily_metrics = resultado['day_of_week']
+        period_metrics = resultado['period_of_day']
 
         hourly_fig = go.Figure()
         hourly_fig.add_trace(go.Bar(
@@ -197,12 +184,9 @@ def register_callbacks(app):
             hovermode='x unified'
         )
 
-        heatmap_data = filtered_df.pivot_table(
-            values='acerto_sem_delta',
-            index='day_of_week',
-            columns='hour',
-            aggfunc='mean'
-        ) * 100
+        heatmap_data = resultado[('day_of_week', 'hour')].pivot(
+            index='day_of_week', columns='hour', values='taxa_acerto_sem_delta'
+        )
         heatmap_fig = px.imshow(
             heatmap_data,
             title='Taxa de Acerto por Hora e Dia',
@@ -211,9 +195,62 @@ def register_callbacks(app):
             color_continuous_scale='Plasma',
             text_auto='.1f'
         )
+
+        return (
+    hourly_fig, daily_fig, period_fig, heatmap_fig,
+    {'display': 'none'}, {'display': 'none'}, {'display': 'none'}, {'display': 'none'}
+)
+
+def register_callbacks(app):
+    if FILTROS_CLIENTE:
+        # Gráficos de taxa refeitos no navegador a partir do agregado em 'filtros-agregados'
+        app.clientside_callback(
+            ClientsideFunction(namespace='filtros', function_name='hourDay'),
+            [
+                Output('hourly-accuracy', 'figure'),
+                Output('daily-accuracy', 'figure'),
+                Output('period-accuracy', 'figure'),
+                Output('hour-day-heatmap', 'figure'),
+                Output('loading-hourly', 'style'),
+                Output('loading-daily', 'style'),
+                Output('loading-period', 'style'),
+                Output('loading-heatmap', 'style'),
+            ],
+            [Input('day-filter', 'value'),
+             Input('filtros-agregados', 'data')]
+        )
+    else:
+        register_metric_callbacks(app)
+
+    # Callback lento: em segundo plano com progresso; mudar o dia ou sair da página
+    # encerra a execução anterior
+    @segundo_plano.callback(
+        app,
+            [
+        Output('sequencia-hora', 'figure'),
+        Output('sequencia-dia', 'figure'),
+        Output('intervalo-acertos', 'figure'),
+        Output('acertos-por-janela', 'figure'),
+        Output('sequencia-fixa', 'figure'),
+    ],
+    [Input('day-filter', 'value')],
+        progresso=[Output('progresso-hour-day', 'value'), Output('progresso-hour-day', 'max')],
+        executando=[(Output('progresso-hour-day', 'style'), {'display': 'block'}, {'display': 'none'})],
+        cancelar=[Input('url', 'pathname')],
+)
+    @binario
+    def update_hour_day(set_progress, day):
+        def progresso(etapa):
+            set_progress((str(etapa), str(ETAPAS_SEQUENCIAS)))
+
+        snapshot = dataset.atual()
+        df = snapshot.df
+        filtered_df = snapshot.filtros.selecionar(df, day_of_week=day)
+        sequencias = metricas.avaliar(metricas.base_snapshot(snapshot, day), PEDIDO_SEQUENCIAS)
         # Acertos consecutivos por hora
-        hora_sem = contar_acertos_consecutivos_por(filtered_df, 'hour', 'acerto_sem_delta')
-        hora_com = contar_acertos_consecutivos_por(filtered_df, 'hour', 'acerto_com_delta')
+        hora = sequencias['hour']
+        hora_sem = dict(zip(hora['hour'], hora['sequencias_acerto_sem_delta']))
+        hora_com = dict(zip(hora['hour'], hora['sequencias_acerto_com_delta']))
 
         sequencia_hora_fig = go.Figure()
         sequencia_hora_fig.add_trace(go.Bar(
@@ -237,8 +274,9 @@ def register_callbacks(app):
         )
 
         # Acertos consecutivos por dia da semana
-        dia_sem = contar_acertos_consecutivos_por(filtered_df, 'day_of_week', 'acerto_sem_delta')
-        dia_com = contar_acertos_consecutivos_por(filtered_df, 'day_of_week', 'acerto_com_delta')
+        dia = sequencias['day_of_week']
+        dia_sem = dict(zip(dia['day_of_week'], dia['sequencias_acerto_sem_delta']))
+        dia_com = dict(zip(dia['day_of_week'], dia['sequencias_acerto_com_delta']))
 
         sequencia_dia_fig = go.Figure()
         sequencia_dia_fig.add_trace(go.Bar(
@@ -260,6 +298,7 @@ def register_callbacks(app):
             barmode='group',
             template='plotly_dark'
         )
+        progresso(1)
         # Cálculo do intervalo entre acertos SEM DELTA
         intervalos_sem = df[df['acerto_sem_delta'] == True].copy()
         intervalos_sem['intervalo'] = intervalos_sem['timestamp'].diff().dt.total_seconds() / 60
@@ -272,20 +311,28 @@ def register_callbacks(app):
         intervalos_com = intervalos_com.dropna()
         intervalos_com = intervalos_com[intervalos_com['intervalo'] > 0]
 
-        # Gráfico combinado
+        # Gráfico combinado (com muitos acertos, média por faixa de tempo; ver renderizacao.py)
+        pontos_intervalos = len(intervalos_sem) + len(intervalos_com)
+        agregar = renderizacao.webgl(pontos_intervalos)
+        # Mesmas faixas de tempo para os dois traces (barras agrupadas lado a lado)
+        bordas = renderizacao.bordas_faixas(intervalos_sem['timestamp'], intervalos_com['timestamp']) if agregar else None
         intervalo_fig = go.Figure()
 
-        intervalo_fig.add_trace(go.Bar(
-            x=intervalos_sem['timestamp'],
-            y=intervalos_sem['intervalo'],
+        intervalo_fig.add_trace(renderizacao.barras_intervalos(
+            intervalos_sem['timestamp'],
+            intervalos_sem['intervalo'],
+            agregar,
+            bordas,
             name='Sem Delta',
             marker=dict(color='#F59E0B'),
             hovertemplate='Data: %{x}<br>Minutos: %{y:.2f}<extra></extra>'
         ))
 
-        intervalo_fig.add_trace(go.Bar(
-            x=intervalos_com['timestamp'],
-            y=intervalos_com['intervalo'],
+        intervalo_fig.add_trace(renderizacao.barras_intervalos(
+            intervalos_com['timestamp'],
+            intervalos_com['intervalo'],
+            agregar,
+            bordas,
             name='Com Delta',
             marker=dict(color='#10B981'),
             hovertemplate='Data: %{x}<br>Minutos: %{y:.2f}<extra></extra>'
@@ -300,6 +347,8 @@ def register_callbacks(app):
             hovermode='x unified',
             legend=dict(x=0.01, y=0.99, bgcolor='rgba(0,0,0,0)')
         )
+        renderizacao.registrar(intervalo_fig, pontos_intervalos, 'histograma' if agregar else 'svg')
+        progresso(2)
                 # Defina o intervalo de tempo fixo (em minutos)
         intervalo_minutos = 15
         intervalo_tempo = f'{intervalo_minutos}min'
@@ -343,7 +392,9 @@ def register_callbacks(app):
             template='plotly_dark',
             hovermode='x unified'
         )
-        sequencias_df = contar_sequencias_com_intervalo_fixo(filtered_df, 'acerto_sem_delta')
+        progresso(3)
+        sequencias_df = contar_sequencias_com_intervalo_fixo(
+            filtered_df, 'acerto_sem_delta', INTERVALOS_FIXOS, progresso=lambda feitos: progresso(3 + feitos))
 
         fig_intervalos_fixos = go.Figure()
         fig_intervalos_fixos.add_trace(go.Bar(
@@ -361,7 +412,5 @@ def register_callbacks(app):
 
 
         return (
-    hourly_fig, daily_fig, period_fig, heatmap_fig,
-    sequencia_hora_fig, sequencia_dia_fig,intervalo_fig,acertos_intervalo_fig,
-    {'display': 'none'}, {'display': 'none'}, {'display': 'none'}, {'display': 'none'}
+    sequencia_hora_fig, sequencia_dia_fig, intervalo_fig, acertos_intervalo_fig, fig_intervalos_fixos
 )
\ No newline at end of file
@@ -1,8 +1,19 @@
-import dash
-from dash import html, dcc, Output, Input, State, callback_context
-from dash.dependencies import ALL
-import resumo, temporal, hour_day, pair, errors, advanced, other
-from utils import df, export_data
+import logging
+import perfil_inicio
+
+# Fases da partida medidas com DASHBOARD_PERFIL_INICIO=1 (ver perfil_inicio.py)
+with perfil_inicio.fase('imports: dash'):
+    import dash
+    from dash import html, dcc, Output, Input, State, ClientsideFunction
+with perfil_inicio.fase('imports: dados'):
+    import dataset
+    import utils
+with perfil_inicio.fase('imports: páginas (pré-cálculos de módulo)'):
+    import resumo, temporal, hour_day, pair, errors, advanced, other
+with perfil_inicio.fase('imports: servidor'):
+    import payload, responses, push, recarga, cache_disco
+from utils import versao_dataset
+from config import LIVE_SSE
 
 # Inicializar o Dash
 app = dash.Dash(__name__, external_stylesheets=[
@@ -85,15 +96,31 @@ app.index_string = '''
 </html>
 '''
 
-# Layout principal
-app.layout = html.Div(className='flex min-h-screen', children=[
+# Seletor do dataset (modelo) em uso; escondido quando só há o padrão
+def seletor_dataset():
+    nomes = dataset.nomes()
+    return html.Div(className='mb-6', style=None if len(nomes) > 1 else {'display': 'none'}, children=[
+        html.H3('Modelo', className='text-sm font-semibold text-gray-400 mb-2'),
+        dcc.Dropdown(
+            id=dataset.SELETOR,
+            options=[{'label': nome, 'value': nome} for nome in nomes],
+            value=dataset.selecionado(),
+            clearable=False,
+            className='bg-gray-700 text-black rounded'
+        ),
+    ])
+
+# Layout principal (função: o seletor mostra o dataset do cookie de cada navegador)
+app.layout = lambda: html.Div(className='flex min-h-screen', children=[
     # Menu lateral
     html.Div(className='w-64 bg-gray-900 p-4 shadow-lg', children=[
         html.H2('Navegação', className='text-2xl font-bold text-blue-400 mb-6'),
+        seletor_dataset(),
         dcc.Link('Resumo', href='/', className='block py-2 px-4 text-lg text-gray-300 hover:bg-gray-800 hover:text-blue-400 rounded transition duration-200'),
         dcc.Link('Análise Temporal', href='/temporal', className='block py-2 px-4 text-lg text-gray-300 hover:bg-gray-800 hover:text-blue-400 rounded transition duration-200'),
         dcc.Link('Análise por Hora e Dia', href='/hour-day', className='block py-2 px-4 text-lg text-gray-300 hover:bg-gray-800 hover:text-blue-400 rounded transition duration-200'),
         dcc.Link('Análise por Par', href='/other', className='block py-2 px-4 text-lg text-gray-300 hover:bg-gray-800 hover:text-blue-400 rounded transition duration-200'),
+        dcc.Link('Pares e Direções', href='/pair', className='block py-2 px-4 text-lg text-gray-300 hover:bg-gray-800 hover:text-blue-400 rounded transition duration-200'),
     ]),
     
     # Conteúdo principal
@@ -104,39 +131,104 @@ app.layout = html.Div(className='flex min-h-screen', children=[
     ])
 ])
 
-# Registrar callbacks das páginas
-resumo.register_callbacks(app)
-temporal.register_callbacks(app)
-hour_day.register_callbacks(app)
-other.register_callbacks(app)
-
-# Callback para exportação de dados
-@app.callback(
-    Output('download-dataframe', 'data'),
-    Input({'type': 'export-button', 'index': ALL}, 'n_clicks'),
-    [State('pair-filter', 'value'),
-     State('date-range', 'start_date'),
-     State('date-range', 'end_date'),
-     State('day-filter', 'value')],
-    prevent_initial_call=True
-)
-def export_data(n_clicks, pair, start_date, end_date, day):
-    if not callback_context.triggered:
-        return None
-    return export_data(df, pair or 'Todos', start_date, end_date, day or 'Todos')
+with perfil_inicio.fase('registro de hooks e callbacks'):
+    # Tamanho/tempo de serialização dos payloads de callback no log
+    payload.registrar(app.server)
+
+    # Compressão gzip/brotli e ETag por versão do dataset (304 quando nada mudou)
+    responses.registrar(app.server, versao_dataset)
+
+    # Canal SSE /stream/previsoes para o modo ao vivo (uma ingestão para todos os clientes)
+    if LIVE_SSE:
+        push.registrar(app.server, temporal.pacote_live, temporal.estado_live, temporal.JANELA_ROLLING - 1)
+
+    # Recarga do dataset sem reiniciar: POST /admin/recarregar e recarga periódica opcional
+    recarga.registrar(app.server)
+
+    # Cache de resultados em disco entre workers (DASHBOARD_CACHE_DIR): GET /admin/cache
+    cache_disco.registrar(app.server, recarga.autorizado)
+
+    # Registrar callbacks das páginas
+    resumo.register_callbacks(app)
+    temporal.register_callbacks(app)
+    hour_day.register_callbacks(app)
+    other.register_callbacks(app)
+    pair.register_callbacks(app)
+
+    # Troca de dataset: grava o cookie e recarrega a página (assets/dataset.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace='dataset', function_name='selecionar'),
+        Output(dataset.SELETOR, 'className'),
+        Input(dataset.SELETOR, 'value'),
+        prevent_initial_call=True
+    )
+
+# Exportação de dados: o botão de cada página é {'type': 'export-button', 'index': página} e
+# o callback da página lê só os filtros que ela mostra (State de componente ausente não dispara)
+FILTROS_EXPORTACAO = {
+    'resumo': {},
+    'temporal': {'start_date': State('date-range', 'start_date'), 'end_date': State('date-range', 'end_date')},
+    'hour_day': {'day': State('day-filter', 'value')},
+    'pair': {'pair': State('pair-filter', 'value')},
+    'errors': {},
+    'advanced': {},
+}
+
+def registrar_exportacao(pagina, filtros):
+    @app.callback(
+        Output('download-dataframe', 'data', allow_duplicate=True),
+        Input({'type': 'export-button', 'index': pagina}, 'n_clicks'),
+        list(filtros.values()),
+        prevent_initial_call=True
+    )
+    def export_data(n_clicks, *valores):
+        if not n_clicks:
+            return None
+        valores = dict(zip(filtros, valores))
+        return utils.export_data(dataset.atual().df, valores.get('pair') or 'Todos', valores.get('start_date'),
+                                 valores.get('end_date'), valores.get('day') or 'Todos')
+
+for _pagina, _filtros in FILTROS_EXPORTACAO.items():
+    registrar_exportacao(_pagina, _filtros)
+
+# Layouts das páginas em cache enquanto a versão do dataset não mudar (uma por dataset carregado)
+_cache_layouts = {}
+
+# Rotas servidas; qualquer outro caminho mostra o resumo (e usa a entrada de cache dele)
+PAGINAS = {
+    '/': resumo.layout,
+    '/temporal': temporal.layout,
+    '/hour-day': hour_day.layout,
+    '/other': other.layout,
+    '/pair': pair.layout,
+}
 
 # Callback para mudar o conteúdo da página
 @app.callback(Output('page-content', 'children'), Input('url', 'pathname'))
 def display_page(pathname):
-    if pathname == '/temporal':
-        return temporal.layout()
-    elif pathname == '/hour-day':
-        return hour_day.layout()
-    elif pathname == '/other':
-        return other.layout()
-    else:
-        return resumo.layout()
+    if pathname not in PAGINAS:
+        pathname = '/'
+    versao = versao_dataset()
+    chave = (pathname, versao)
+    if chave not in _cache_layouts:
+        vigentes = dataset.versoes()
+        for antiga in [k for k in _cache_layouts if k[1] not in vigentes]:
+            del _cache_layouts[antiga]
+        _cache_layouts[chave] = PAGINAS[pathname]()
+    return _cache_layouts[chave]
+
+# Com o perfil ligado, mede também o que normalmente fica para o primeiro request
+# (derivados do snapshot e layouts das páginas) e imprime o relatório
+if perfil_inicio.ativo():
+    with perfil_inicio.fase('pré-cálculos das páginas (primeiro request)'):
+        with perfil_inicio.fase('derivados do snapshot'):
+            dataset.atual().aquecer()
+        for caminho in PAGINAS:
+            with perfil_inicio.fase(f'layout {caminho}'):
+                display_page(caminho)
+    perfil_inicio.concluir()
 
 # Rodar o servidor
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
     app.run(debug=True)
\ No newline at end of file
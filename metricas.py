@@ -0,0 +1,206 @@
+import numpy as np
+import dataset
+
+# ==============================
+# REGISTRO DE MÉTRICAS DE ACERTO (uma passada, roll-up por agrupamento)
+# ==============================
+
+# Uma única passada pelas linhas monta a tabela base: um bloco por hora do relógio
+# (data + hora) com totais, acertos, o resumo das sequências de acertos e os
+# timestamps do primeiro/último acerto de cada flag. Qualquer agrupamento cujas
+# chaves sejam constantes dentro do bloco (dia da semana, hora, período, semana)
+# sai dessa tabela: somas para as métricas aditivas e uma dobra em ordem temporal
+# para sequências e intervalos, com o mesmo resultado de percorrer as linhas.
+FLAGS = ['acerto_sem_delta', 'acerto_com_delta']
+CHAVES_BLOCO = ['day_of_week', 'hour', 'period_of_day', 'week']
+_NS_MIN = 60 * 10 ** 9
+_SEM_ACERTO = np.iinfo('int64').max
+
+
+def _registrar(nome, dobra=False):
+    def decorador(func):
+        METRICAS[nome] = (func, dobra)
+        return func
+    return decorador
+
+
+# nome -> (func(somas, dobra, flag), precisa da dobra temporal)
+METRICAS = {}
+
+
+@_registrar('total')
+def _total(somas, dobra, flag):
+    return somas['n']
+
+
+@_registrar('acertos')
+def _acertos(somas, dobra, flag):
+    return somas[f'acertos_{flag}']
+
+
+@_registrar('taxa')
+def _taxa(somas, dobra, flag):
+    return somas[f'acertos_{flag}'] / somas['n'] * 100
+
+
+@_registrar('sequencias', dobra=True)
+def _sequencias(somas, dobra, flag):
+    # Sequências de 2 ou mais acertos seguidos dentro do grupo, em ordem temporal
+    return dobra['sequencias']
+
+
+@_registrar('intervalo_medio', dobra=True)
+def _intervalo_medio(somas, dobra, flag):
+    # Minutos entre acertos consecutivos do grupo: (último - primeiro) / (acertos - 1)
+    acertos = somas[f'acertos_{flag}'].to_numpy()
+    span = (dobra['ultimo'] - dobra['primeiro']).astype('float64')
+    return np.where(acertos > 1, span / np.maximum(acertos - 1, 1) / _NS_MIN, np.nan)
+
+
+@_registrar('intervalo_maximo', dobra=True)
+def _intervalo_maximo(somas, dobra, flag):
+    return np.where(dobra['maior_intervalo'] >= 0, dobra['maior_intervalo'] / _NS_MIN, np.nan)
+
+
+def _resumo_sequencias(ids, novo_bloco, acertos, n_blocos):
+    # Por bloco: sequência de acertos que toca o início (pre), a que toca o fim (suf)
+    # e quantas sequências > 1 ficam inteiras no meio (sem tocar nenhuma borda)
+    fim_bloco = np.r_[novo_bloco[1:], True]
+    anterior = np.r_[False, acertos[:-1]]
+    inicio_seq = acertos & (novo_bloco | ~anterior)
+    posicoes = np.flatnonzero(inicio_seq)
+    # Cada sequência termina no primeiro não-acerto ou no fim do bloco
+    seq_id = np.cumsum(inicio_seq) - 1
+    comprimentos = np.bincount(seq_id[acertos], minlength=len(posicoes))
+    bloco_seq = ids[posicoes]
+    toca_inicio = novo_bloco[posicoes]
+    toca_fim = fim_bloco[posicoes + comprimentos - 1]
+
+    pre = np.zeros(n_blocos, dtype='int64')
+    suf = np.zeros(n_blocos, dtype='int64')
+    pre[bloco_seq[toca_inicio]] = comprimentos[toca_inicio]
+    suf[bloco_seq[toca_fim]] = comprimentos[toca_fim]
+    meio = np.bincount(bloco_seq[~toca_inicio & ~toca_fim & (comprimentos > 1)], minlength=n_blocos)
+    return pre, suf, meio
+
+
+def base(df):
+    # Tabela de blocos (data + hora) construída em uma passada vetorizada pelas linhas
+    if not df['timestamp'].is_monotonic_increasing:
+        df = df.sort_values('timestamp', kind='stable')
+    bloco = df['timestamp'].dt.floor('h').to_numpy()
+    ts = df['timestamp'].to_numpy().astype('datetime64[ns]').view('int64')
+    novo_bloco = np.r_[True, bloco[1:] != bloco[:-1]] if len(bloco) else np.zeros(0, dtype=bool)
+    ids = np.cumsum(novo_bloco) - 1
+    inicios = np.flatnonzero(novo_bloco)
+    n_blocos = len(inicios)
+
+    tabela = df[CHAVES_BLOCO].iloc[inicios].reset_index(drop=True)
+    tabela['bloco'] = bloco[inicios]
+    tabela['n'] = np.bincount(ids, minlength=n_blocos)
+    for flag in FLAGS:
+        acertos = df[flag].to_numpy(dtype=bool)
+        tabela[f'acertos_{flag}'] = np.bincount(ids[acertos], minlength=n_blocos)
+        pre, suf, meio = _resumo_sequencias(ids, novo_bloco, acertos, n_blocos)
+        tabela[f'pre_{flag}'], tabela[f'suf_{flag}'], tabela[f'meio_{flag}'] = pre, suf, meio
+
+        # Primeiro/último acerto e maior intervalo entre acertos dentro do bloco
+        ids_acerto, ts_acerto = ids[acertos], ts[acertos]
+        primeiro = np.full(n_blocos, _SEM_ACERTO)
+        ultimo = np.full(n_blocos, -1)
+        np.minimum.at(primeiro, ids_acerto, ts_acerto)
+        np.maximum.at(ultimo, ids_acerto, ts_acerto)
+        maior = np.full(n_blocos, -1)
+        mesmo_bloco = ids_acerto[1:] == ids_acerto[:-1]
+        np.maximum.at(maior, ids_acerto[1:][mesmo_bloco], np.diff(ts_acerto)[mesmo_bloco])
+        tabela[f'primeiro_{flag}'], tabela[f'ultimo_{flag}'], tabela[f'maior_{flag}'] = primeiro, ultimo, maior
+    return tabela
+
+
+@dataset.registrar_derivado('metricas_base')
+def _base_snapshot(snapshot):
+    return base(snapshot.df)
+
+
+def base_snapshot(snapshot, day=None):
+    # Base do snapshot (calculada uma vez por versão), opcionalmente só de um dia da semana;
+    # cada bloco pertence a um único dia, então o filtro por bloco equivale ao filtro por linha
+    tabela = snapshot.derivado('metricas_base')
+    if day not in (None, 'Todos'):
+        tabela = tabela[tabela['day_of_week'] == day]
+    return tabela
+
+
+def _dobrar(tabela, codigos, n_grupos, flag):
+    # Junta os blocos de cada grupo em ordem temporal (monoide de sequências/intervalos)
+    ordem = np.lexsort((tabela['bloco'].to_numpy(), codigos))
+    cod = codigos[ordem]
+    n = tabela['n'].to_numpy()[ordem]
+    pre = tabela[f'pre_{flag}'].to_numpy()[ordem]
+    suf = tabela[f'suf_{flag}'].to_numpy()[ordem]
+    meio = tabela[f'meio_{flag}'].to_numpy()[ordem]
+    primeiro = tabela[f'primeiro_{flag}'].to_numpy()[ordem]
+    ultimo_b = tabela[f'ultimo_{flag}'].to_numpy()[ordem]
+    maior_b = tabela[f'maior_{flag}'].to_numpy()[ordem]
+
+    sequencias = np.zeros(n_grupos, dtype='int64')
+    inicio = np.full(n_grupos, _SEM_ACERTO)
+    fim = np.full(n_grupos, -1)
+    maior = np.full(n_grupos, -1)
+
+    def fechar(g, todos, total, p, s, m):
+        sequencias[g] = (1 if total > 1 else 0) if todos else m + (p > 1) + (s > 1)
+
+    g_atual = -1
+    for i in range(len(cod)):
+        todos_b = pre[i] == n[i]
+        if cod[i] != g_atual:
+            if g_atual >= 0:
+                fechar(g_atual, todos, total, p, s, m)
+            g_atual, todos, total, p, s, m = cod[i], todos_b, n[i], pre[i], suf[i], meio[i]
+            ultimo, mg = ultimo_b[i], maior_b[i]
+            inicio[g_atual] = primeiro[i]
+        else:
+            if todos and todos_b:
+                p = s = total + n[i]
+            elif todos:
+                p, s, m = total + pre[i], suf[i], meio[i]
+            elif todos_b:
+                s = s + n[i]
+            else:
+                m = m + meio[i] + (s + pre[i] > 1)
+                s = suf[i]
+            todos = todos and todos_b
+            total += n[i]
+            if ultimo_b[i] >= 0:
+                if ultimo >= 0:
+                    mg = max(mg, primeiro[i] - ultimo)
+                else:
+                    inicio[g_atual] = primeiro[i]
+                ultimo = ultimo_b[i]
+            mg = max(mg, maior_b[i])
+        fim[g_atual], maior[g_atual] = ultimo, mg
+    if g_atual >= 0:
+        fechar(g_atual, todos, total, p, s, m)
+    return {'sequencias': sequencias, 'primeiro': inicio, 'ultimo': fim, 'maior_intervalo': maior}
+
+
+def avaliar(tabela, pedido, flags=FLAGS):
+    # pedido: {agrupamento: [métricas]}; retorna {agrupamento: DataFrame com as chaves e
+    # uma coluna '<métrica>_<flag>' por métrica e flag}
+    resultados = {}
+    for por, nomes in pedido.items():
+        chaves = [por] if isinstance(por, str) else list(por)
+        grupos = tabela.groupby(chaves, observed=True, sort=True)
+        somas = grupos[['n'] + [f'acertos_{flag}' for flag in flags]].sum()
+        codigos = grupos.ngroup().to_numpy()
+        res = somas.index.to_frame(index=False)
+        for flag in flags:
+            dobra = None
+            if any(METRICAS[nome][1] for nome in nomes):
+                dobra = _dobrar(tabela, codigos, len(somas), flag)
+            for nome in nomes:
+                valores = METRICAS[nome][0](somas, dobra, flag)
+                res[f'{nome}_{flag}'] = np.asarray(valores)
+        resultados[por] = res
+    return resultados
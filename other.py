@@ -1,8 +1,11 @@
 from dash import html, dcc, Input, Output
 import plotly.graph_objects as go
-from utils import df
+import dataset
+import facetas
+import metricas
+import utils  # carrega os dados e publica o snapshot inicial
+from payload import binario
 import pandas as pd
-from typing import cast
 
 # ==============================
 # IDs PREFIXADOS (evita conflito multipágina)
@@ -13,13 +16,13 @@ ID_PREFIX = "hourday"
 def pid(name: str):
     return f"{ID_PREFIX}-{name}"
 
-# ==============================
-# DROPDOWN OPTIONS
-# ==============================
-
-options1 = [{'label': day, 'value': day} for day in df['day_of_week'].unique()]
-options1.append({'label': 'Todos', 'value': 'Todos'})
-options = cast(list[dict[str, str]], options1)
+# Métricas calculadas pelo callback em uma única avaliação
+PEDIDO_METRICAS = {
+    ('week', 'hour'): ['acertos'],
+    'day_of_week': ['acertos', 'taxa'],
+    'hour': ['taxa'],
+    ('day_of_week', 'hour'): ['taxa'],
+}
 
 # ==============================
 # LAYOUT
@@ -31,7 +34,7 @@ def layout():
 
         dcc.Dropdown(
             id=pid('day-filter'),
-            options=options,
+            options=utils.opcoes_dias(dataset.atual()),
             value='Todos',
             className='bg-gray-700 text-white p-2 rounded-lg w-1/2 mb-4'
         ),
@@ -57,36 +60,27 @@ def register_callbacks(app):
         Output(pid('heatmap'), 'figure'),
         Input(pid('day-filter'), 'value')
     )
+    @binario
     def update_hour_day(day):
 
-        filtered_df = df if day == 'Todos' else df[df['day_of_week'] == day]
-        filtered_df = filtered_df.copy()
-        filtered_df['timestamp'] = pd.to_datetime(filtered_df['timestamp'])
-
-        # Criar coluna semana ISO
-        filtered_df['week'] = filtered_df['timestamp'].dt.isocalendar().week
+        # Uma avaliação do registro de métricas cobre os cinco gráficos (ver metricas.py)
+        resultado = metricas.avaliar(
+            metricas.base_snapshot(dataset.atual(), day), PEDIDO_METRICAS, flags=['acerto_sem_delta']
+        )
 
         # ==========================================
         # 1️⃣ ACERTOS POR HORA (SEPARADO POR SEMANA)
         # ==========================================
 
+        # Semana ISO já vem calculada na carga (coluna 'week'); um pivot semana x hora
         acertos_hora_semana = (
-            filtered_df[filtered_df['acerto_sem_delta'] == True]
-            .groupby(['week', 'hour'])
-            .size()
-            .reset_index(name='quantidade')
+            resultado[('week', 'hour')]
+            .set_index(['week', 'hour'])['acertos_acerto_sem_delta']
+            .unstack('hour')
         )
+        acertos_hora_semana = acertos_hora_semana.where(acertos_hora_semana > 0)
 
-        hourly_fig = go.Figure()
-
-        for semana in sorted(acertos_hora_semana['week'].unique()):
-            df_semana = acertos_hora_semana[acertos_hora_semana['week'] == semana]
-
-            hourly_fig.add_trace(go.Bar(
-                x=df_semana['hour'],
-                y=df_semana['quantidade'],
-                name=f'Semana {semana}'
-            ))
+        hourly_fig = go.Figure(data=facetas.traces(acertos_hora_semana, go.Bar, nome='Semana {}'))
 
         hourly_fig.update_layout(
             title='Quantidade de Acertos por Hora (Separado por Semana)',
@@ -100,18 +94,14 @@ def register_callbacks(app):
         # 2️⃣ ACERTOS POR DIA DA SEMANA
         # ==========================================
 
-        acertos_dia = (
-            filtered_df[filtered_df['acerto_sem_delta'] == True]
-            .groupby('day_of_week')
-            .size()
-            .reset_index(name='quantidade')
-        )
+        acertos_dia = resultado['day_of_week']
+        acertos_dia = acertos_dia[acertos_dia['acertos_acerto_sem_delta'] > 0]
 
         daily_fig = go.Figure()
 
         daily_fig.add_trace(go.Bar(
             x=acertos_dia['day_of_week'],
-            y=acertos_dia['quantidade'],
+            y=acertos_dia['acertos_acerto_sem_delta'],
             marker_color='#3B82F6'
         ))
 
@@ -122,25 +112,13 @@ def register_callbacks(app):
             template='plotly_dark'
         )
 
-        taxa_hora = (
-            filtered_df
-            .groupby('hour')
-            .agg(
-                total_operacoes=('acerto_sem_delta', 'count'),
-                total_acertos=('acerto_sem_delta', 'sum')
-            )
-            .reset_index()
-        )
-
-        taxa_hora['taxa_acerto'] = (
-            taxa_hora['total_acertos'] / taxa_hora['total_operacoes']
-        ) * 100
+        taxa_hora = resultado['hour']
 
         fig_hour = go.Figure()
 
         fig_hour.add_trace(go.Bar(
             x=taxa_hora['hour'],
-            y=taxa_hora['taxa_acerto'],
+            y=taxa_hora['taxa_acerto_sem_delta'],
         ))
 
         fig_hour.update_layout(
@@ -149,25 +127,13 @@ def register_callbacks(app):
             yaxis_title='Taxa de Acerto (%)',
             template='plotly_dark'
         )
-        taxa_dia = (
-            filtered_df
-            .groupby('day_of_week')
-            .agg(
-                total_operacoes=('acerto_sem_delta', 'count'),
-                total_acertos=('acerto_sem_delta', 'sum')
-            )
-            .reset_index()
-        )
-
-        taxa_dia['taxa_acerto'] = (
-            taxa_dia['total_acertos'] / taxa_dia['total_operacoes']
-        ) * 100
+        taxa_dia = resultado['day_of_week']
 
         fig_day = go.Figure()
 
         fig_day.add_trace(go.Bar(
             x=taxa_dia['day_of_week'],
-            y=taxa_dia['taxa_acerto'],
+            y=taxa_dia['taxa_acerto_sem_delta'],
         ))
 
         fig_day.update_layout(
@@ -177,22 +143,10 @@ def register_callbacks(app):
             template='plotly_dark'
         )
 
-        heatmap_df = (
-            filtered_df
-            .groupby(['day_of_week', 'hour'])
-            .agg(
-                total=('acerto_sem_delta', 'count'),
-                acertos=('acerto_sem_delta', 'sum')
-            )
-            .reset_index()
-        )
-
-        heatmap_df['taxa'] = (heatmap_df['acertos'] / heatmap_df['total']) * 100
-
-        pivot = heatmap_df.pivot(
+        pivot = resultado[('day_of_week', 'hour')].pivot(
             index='day_of_week',
             columns='hour',
-            values='taxa'
+            values='taxa_acerto_sem_delta'
         )
 
         fig_heat = go.Figure(
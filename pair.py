@@ -1,18 +1,22 @@
-from dash import html, dcc, Input, Output
-import plotly.express as px
+from dash import html, dcc, Input, Output, ClientsideFunction
 import plotly.graph_objects as go
-from utils import df, calculate_metrics
+import pandas as pd
+import dataset
+from utils import calculate_metrics
+from payload import binario
+from config import FILTROS_CLIENTE
 
 def layout():
+    snapshot = dataset.atual()
     return html.Div([
         html.H1('Análise por Par', className='text-4xl font-bold text-blue-400 mb-6'),
         dcc.Dropdown(
             id='pair-filter',
-            options=[{'label': par, 'value': par} for par in df['par'].unique()] + [{'label': 'Todos', 'value': 'Todos'}],
+            options=[{'label': par, 'value': par} for par in snapshot.df['par'].unique()] + [{'label': 'Todos', 'value': 'Todos'}],
             value='Todos',
             className='bg-gray-700 text-white p-2 rounded-lg w-1/2 mb-4'
         ),
-        html.Button('Exportar Dados', id='export-button', className='neon-button text-white font-bold py-2 px-4 rounded mb-4'),
+        html.Button('Exportar Dados', id={'type': 'export-button', 'index': 'pair'}, className='neon-button text-white font-bold py-2 px-4 rounded mb-4'),
         html.H2('Taxa de Acerto por Par', className='text-xl font-semibold mb-2 text-blue-300'),
         html.Div(className='loading-spinner', id='loading-pair-accuracy', style={'display': 'none'}),
         dcc.Graph(id='pair-accuracy'),
@@ -21,23 +25,25 @@ def layout():
         dcc.Graph(id='direction-distribution'),
         html.H2('Taxa de Acerto por Par e Período', className='text-xl font-semibold mb-2 text-blue-300'),
         html.Div(className='loading-spinner', id='loading-pair-period', style={'display': 'none'}),
-        dcc.Graph(id='pair-period-accuracy')
+        dcc.Graph(id='pair-period-accuracy'),
+        dcc.Store(id='filtros-agregados', data=snapshot.payload_filtros() if FILTROS_CLIENTE else None)
     ])
 
-def register_callbacks(app):
+def register_metric_callbacks(app):
     @app.callback(
         [Output('pair-accuracy', 'figure'),
-         Output('direction-distribution', 'figure'),
          Output('pair-period-accuracy', 'figure'),
          Output('loading-pair-accuracy', 'style'),
-         Output('loading-direction', 'style'),
          Output('loading-pair-period', 'style')],
         [Input('pair-filter', 'value')]
     )
-    def update_pair(pair):
-        filtered_df = df if pair == 'Todos' else df[df['par'] == pair]
+    @binario
+    def update_pair_metrics(pair):
+        import plotly.express as px
+        snapshot = dataset.atual()
+        filtered_df = snapshot.filtros.selecionar(snapshot.df, par=pair)
         pair_metrics = calculate_metrics(filtered_df, 'par')
-        pair_period_metrics = calculate_metrics(filtered_df.groupby(['par', 'period_of_day'], observed=True), ['par', 'period_of_day'], categorical=True)
+        pair_period_metrics = calculate_metrics(filtered_df, ['par', 'period_of_day'], categorical=True)
 
         pair_fig = go.Figure()
         pair_fig.add_trace(go.Bar(
@@ -63,22 +69,51 @@ def register_callbacks(app):
             hovermode='x unified'
         )
 
-        direction_counts = filtered_df[['direcao_real', 'direcao_prevista']].melt(var_name='tipo', value_name='direcao')
-        direction_counts = direction_counts.groupby(['tipo', 'direcao']).size().reset_index(name='count')
-        direction_fig = px.pie(direction_counts, names='direcao', values='count', facet_col='tipo',
-                              title='Distribuição de Direções (Real vs Prevista)', template='plotly_dark',
-                              color_discrete_sequence=px.colors.sequential.Plasma)
-
         pair_period_fig = px.bar(
             pair_period_metrics,
-            x='par_period_of_day',
+            x='par',
             y='taxa_acerto_sem_delta',
             color='period_of_day',
             barmode='group',
             title='Taxa de Acerto por Par e Período',
-            labels={'par_period_of_day': 'Par', 'taxa_acerto_sem_delta': 'Taxa de Acerto (%)', 'period_of_day': 'Período'},
+            labels={'par': 'Par', 'taxa_acerto_sem_delta': 'Taxa de Acerto (%)', 'period_of_day': 'Período'},
             template='plotly_dark',
             color_discrete_sequence=px.colors.sequential.Plasma
         )
 
-        return pair_fig, direction_fig, pair_period_fig, {'display': 'none'}, {'display': 'none'}, {'display': 'none'}
\ No newline at end of file
+        return pair_fig, pair_period_fig, {'display': 'none'}, {'display': 'none'}
+
+def register_callbacks(app):
+    if FILTROS_CLIENTE:
+        # Taxas por par refeitas no navegador a partir do agregado em 'filtros-agregados'
+        app.clientside_callback(
+            ClientsideFunction(namespace='filtros', function_name='pair'),
+            [Output('pair-accuracy', 'figure'),
+             Output('pair-period-accuracy', 'figure'),
+             Output('loading-pair-accuracy', 'style'),
+             Output('loading-pair-period', 'style')],
+            [Input('pair-filter', 'value'),
+             Input('filtros-agregados', 'data')]
+        )
+    else:
+        register_metric_callbacks(app)
+
+    @app.callback(
+        [Output('direction-distribution', 'figure'),
+         Output('loading-direction', 'style')],
+        [Input('pair-filter', 'value')]
+    )
+    @binario
+    def update_pair(pair):
+        import plotly.express as px
+        snapshot = dataset.atual()
+        # Contagens por direção direto dos bitmaps (AND com o par + popcount)
+        direction_counts = pd.concat(
+            {tipo: snapshot.filtros.contagens(tipo, par=pair) for tipo in ['direcao_prevista', 'direcao_real']},
+            names=['tipo', 'direcao'],
+        ).reset_index(name='count')
+        direction_fig = px.pie(direction_counts, names='direcao', values='count', facet_col='tipo',
+                              title='Distribuição de Direções (Real vs Prevista)', template='plotly_dark',
+                              color_discrete_sequence=px.colors.sequential.Plasma)
+
+        return direction_fig, {'display': 'none'}
@@ -0,0 +1,206 @@
+import functools
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from config import PARTICOES_THREADS, PARTICOES_CACHE, JANELA_INICIAL_DIAS
+from dados import preparar, ler_novas_linhas
+
+# ==============================
+# DATASET PARTICIONADO (um arquivo por período)
+# ==============================
+
+# O diretório contém arquivos CSV ou Parquet (ex.: um por dia). O manifesto guarda,
+# por arquivo, o intervalo de timestamps e os pares presentes; só os arquivos que
+# cruzam o intervalo/par pedido são lidos, em paralelo.
+#
+# O manifesto fica em memória enquanto o mtime do diretório não muda (nenhum arquivo
+# criado, removido ou renomeado); nesse caso só o último arquivo, o que recebe as linhas
+# novas, é conferido. Partições anteriores são tratadas como fechadas.
+MANIFESTO = '_manifesto.json'
+EXTENSOES = ('.csv', '.parquet')
+_manifestos = {}
+_trava_manifestos = threading.Lock()
+
+
+def listar(diretorio):
+    return sorted(
+        os.path.join(diretorio, nome) for nome in os.listdir(diretorio)
+        if nome.endswith(EXTENSOES) and not nome.startswith(('.', '_'))
+    )
+
+
+def _ler(caminho, colunas=None):
+    if caminho.endswith('.parquet'):
+        return pd.read_parquet(caminho, columns=colunas)
+    return pd.read_csv(caminho, usecols=colunas)
+
+
+def colunas(diretorio):
+    caminho = listar(diretorio)[0]
+    if caminho.endswith('.parquet'):
+        return _ler(caminho).columns.tolist()
+    return pd.read_csv(caminho, nrows=0).columns.tolist()
+
+
+def _descrever(caminho):
+    # Só timestamp e par: o bastante para a poda
+    info = os.stat(caminho)
+    amostra = _ler(caminho, ['timestamp', 'par'])
+    timestamps = pd.to_datetime(amostra['timestamp'])
+    return {
+        'mtime_ns': info.st_mtime_ns,
+        'tamanho': info.st_size,
+        'linhas': len(amostra),
+        'inicio': timestamps.min().isoformat() if len(amostra) else None,
+        'fim': timestamps.max().isoformat() if len(amostra) else None,
+        'pares': sorted(amostra['par'].astype(str).unique()),
+    }
+
+
+def atualizar_manifesto(diretorio):
+    # Reaproveita as entradas de arquivos que não mudaram (mesmo tamanho e mtime)
+    caminho_manifesto = os.path.join(diretorio, MANIFESTO)
+    try:
+        with open(caminho_manifesto) as f:
+            anterior = json.load(f)
+    except (FileNotFoundError, ValueError):
+        anterior = {}
+
+    manifesto, mudou = {}, False
+    for caminho in listar(diretorio):
+        nome = os.path.basename(caminho)
+        info = os.stat(caminho)
+        entrada = anterior.get(nome)
+        if entrada is None or (entrada['mtime_ns'], entrada['tamanho']) != (info.st_mtime_ns, info.st_size):
+            entrada, mudou = _descrever(caminho), True
+        manifesto[nome] = entrada
+    mudou = mudou or manifesto.keys() != anterior.keys()
+
+    if mudou:
+        # Troca atômica; diretório somente leitura apenas impede o cache do manifesto
+        temporario = f'{caminho_manifesto}.{os.getpid()}'
+        try:
+            with open(temporario, 'w') as f:
+                json.dump(manifesto, f)
+            os.replace(temporario, caminho_manifesto)
+        except OSError:
+            pass
+    return manifesto
+
+
+def obter_manifesto(diretorio):
+    # Manifesto em memória por diretório (ver acima); relê do disco quando o diretório muda
+    with _trava_manifestos:
+        mtime, manifesto = _manifestos.get(diretorio, (None, None))
+        if mtime != os.stat(diretorio).st_mtime_ns:
+            manifesto = atualizar_manifesto(diretorio)
+            # Depois de gravar o _manifesto.json, que também muda o mtime do diretório
+            _manifestos[diretorio] = (os.stat(diretorio).st_mtime_ns, manifesto)
+        elif manifesto:
+            ultimo = max(manifesto)
+            info = os.stat(os.path.join(diretorio, ultimo))
+            if (manifesto[ultimo]['mtime_ns'], manifesto[ultimo]['tamanho']) != (info.st_mtime_ns, info.st_size):
+                manifesto = dict(manifesto, **{ultimo: _descrever(os.path.join(diretorio, ultimo))})
+                _manifestos[diretorio] = (mtime, manifesto)
+        return manifesto
+
+
+def selecionar(manifesto, start_date=None, end_date=None, pair=None):
+    # Poda: arquivos cujo [inicio, fim] cruza o intervalo e que contêm o par
+    inicio = pd.Timestamp(start_date) if start_date is not None else None
+    fim = pd.Timestamp(end_date) if end_date is not None else None
+    escolhidos = []
+    for nome, entrada in sorted(manifesto.items()):
+        if not entrada['linhas']:
+            continue
+        if inicio is not None and pd.Timestamp(entrada['fim']) < inicio:
+            continue
+        if fim is not None and pd.Timestamp(entrada['inicio']) > fim:
+            continue
+        if pair not in (None, 'Todos') and pair not in entrada['pares']:
+            continue
+        escolhidos.append(nome)
+    return escolhidos
+
+
+@functools.lru_cache(maxsize=PARTICOES_CACHE)
+def _ler_particao(caminho, mtime_ns, tamanho):
+    # Cache por versão do arquivo: (mtime, tamanho) fazem parte da chave
+    return _ler(caminho)
+
+
+def carregar(diretorio, start_date=None, end_date=None, pair=None, manifesto=None):
+    manifesto = manifesto if manifesto is not None else obter_manifesto(diretorio)
+    caminhos = [os.path.join(diretorio, nome) for nome in selecionar(manifesto, start_date, end_date, pair)]
+    with ThreadPoolExecutor(max_workers=PARTICOES_THREADS) as pool:
+        partes = list(pool.map(
+            lambda caminho: _ler_particao(caminho, manifesto[os.path.basename(caminho)]['mtime_ns'],
+                                          manifesto[os.path.basename(caminho)]['tamanho']),
+            caminhos
+        ))
+    if not partes:
+        return preparar(pd.DataFrame(columns=colunas(diretorio)))
+
+    df = pd.concat(partes, ignore_index=True)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df = df.sort_values('timestamp', kind='stable', ignore_index=True)
+    # Partições podem cruzar as bordas do intervalo: recorte por linha
+    if start_date is not None:
+        df = df[df['timestamp'] >= pd.Timestamp(start_date)]
+    if end_date is not None:
+        df = df[df['timestamp'] <= pd.Timestamp(end_date)]
+    return preparar(df.reset_index(drop=True))
+
+
+def carregar_inicial(diretorio):
+    # Na partida só os últimos JANELA_INICIAL_DIAS (0, o padrão = tudo, sem poda); o resto é
+    # lido sob demanda
+    manifesto = obter_manifesto(diretorio)
+    inicio = None
+    if JANELA_INICIAL_DIAS:
+        fins = [pd.Timestamp(e['fim']) for e in manifesto.values() if e['linhas']]
+        if fins:
+            inicio = max(fins).normalize() - pd.Timedelta(days=JANELA_INICIAL_DIAS - 1)
+    return carregar(diretorio, start_date=inicio, manifesto=manifesto)
+
+
+def limites(manifesto):
+    # (primeiro, último) timestamp de todo o diretório, inclusive o que não está carregado
+    entradas = [e for e in manifesto.values() if e['linhas']]
+    if not entradas:
+        return None, None
+    return (min(pd.Timestamp(e['inicio']) for e in entradas),
+            max(pd.Timestamp(e['fim']) for e in entradas))
+
+
+def offsets_iniciais(diretorio):
+    # Tudo o que já existe no diretório conta como lido (inclusive o que ficou fora da janela)
+    return {caminho: os.path.getsize(caminho) for caminho in listar(diretorio)}
+
+
+def ler_novas_linhas_diretorio(diretorio, offsets, colunas):
+    # Cauda de cada CSV a partir do seu offset; arquivos novos (rotação) são lidos desde o cabeçalho
+    offsets = dict(offsets)
+    partes = []
+    for caminho in listar(diretorio):
+        tamanho = os.path.getsize(caminho)
+        if caminho.endswith('.parquet'):
+            if caminho not in offsets:
+                partes.append(_ler(caminho))
+            offsets[caminho] = tamanho
+            continue
+        offset = offsets.get(caminho)
+        if offset is None:
+            with open(caminho, 'rb') as f:
+                offset = len(f.readline())
+        if tamanho > offset:
+            novas, offset = ler_novas_linhas(caminho, offset, colunas)
+            partes.append(novas)
+        offsets[caminho] = offset
+    if not partes:
+        return pd.DataFrame(columns=colunas), offsets
+    novas = pd.concat(partes, ignore_index=True)
+    novas['timestamp'] = pd.to_datetime(novas['timestamp'])
+    return novas.sort_values('timestamp', kind='stable', ignore_index=True), offsets
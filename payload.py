@@ -0,0 +1,133 @@
+import base64
+import functools
+import logging
+import time
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+from flask import g, has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+# JSON rápido com suporte a NumPy quando o orjson está instalado
+try:
+    import orjson  # noqa: F401
+    pio.json.config.default_engine = 'orjson'
+except ImportError:
+    pass
+
+# ==============================
+# ARRAYS BINÁRIOS (base64 tipado do plotly.js)
+# ==============================
+
+# dtypes aceitos pelo plotly.js; int64 não existe no navegador
+_DTYPES = {'int8': 'i1', 'uint8': 'u1', 'int16': 'i2', 'uint16': 'u2',
+           'int32': 'i4', 'uint32': 'u4', 'float32': 'f4', 'float64': 'f8'}
+_CAMPOS = ('x', 'y', 'z', 'customdata', 'text')
+_CAMPOS_MARKER = ('size', 'color')
+
+
+def _array_binario(valores):
+    arr = np.asarray(valores)
+    if arr.dtype == bool:
+        arr = arr.astype('uint8')
+    elif arr.dtype.kind in 'iu' and arr.dtype.name not in _DTYPES:
+        info = np.iinfo('int32')
+        arr = arr.astype('int32') if arr.size == 0 or (arr.min() >= info.min and arr.max() <= info.max) else arr.astype('float64')
+    if arr.dtype.name not in _DTYPES:
+        return None
+    arr = np.ascontiguousarray(arr)
+    codificado = {'dtype': _DTYPES[arr.dtype.name], 'bdata': base64.b64encode(arr.tobytes()).decode('ascii')}
+    if arr.ndim == 2:
+        codificado['shape'] = f'{arr.shape[0]}, {arr.shape[1]}'
+    return codificado
+
+
+def _converter(valores):
+    # Retorna (valor codificado, é_data) ou (None, False) se não der para codificar
+    if isinstance(valores, (pd.Series, pd.Index)):
+        valores = valores.to_numpy()
+    if not isinstance(valores, np.ndarray) or valores.ndim not in (1, 2):
+        return None, False
+    if valores.dtype.kind == 'M':
+        # Datas como ms desde a época (eixo do tipo 'date' aceita números)
+        if valores.ndim != 1:
+            return None, False
+        ms = valores.astype('datetime64[ms]').astype('int64').astype('float64')
+        ms[np.isnat(valores)] = np.nan
+        return _array_binario(ms), True
+    if valores.dtype.kind in 'biuf':
+        return _array_binario(valores), False
+    return None, False
+
+
+def codificar_figura(fig):
+    if not isinstance(fig, go.Figure):
+        return fig
+    dados = fig.to_plotly_json()
+    eixos_data = set()
+    for trace in dados['data']:
+        for campo in _CAMPOS:
+            if campo in trace:
+                codificado, e_data = _converter(trace[campo])
+                if codificado is not None:
+                    trace[campo] = codificado
+                    if e_data and campo in ('x', 'y'):
+                        eixo = trace.get(f'{campo}axis', campo)
+                        eixos_data.add(eixo.replace(campo, f'{campo}axis', 1))
+        marker = trace.get('marker')
+        if isinstance(marker, dict):
+            for campo in _CAMPOS_MARKER:
+                if campo in marker:
+                    codificado, _ = _converter(marker[campo])
+                    if codificado is not None:
+                        marker[campo] = codificado
+    for eixo in eixos_data:
+        dados['layout'].setdefault(eixo, {})['type'] = 'date'
+    return dados
+
+
+# ==============================
+# MÉTRICAS POR CALLBACK
+# ==============================
+
+def binario(func):
+    # Converte as figuras retornadas pelo callback e mede montagem/conversão
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        inicio = time.perf_counter()
+        resultado = func(*args, **kwargs)
+        meio = time.perf_counter()
+        if isinstance(resultado, (tuple, list)):
+            resultado = type(resultado)(codificar_figura(item) for item in resultado)
+        else:
+            resultado = codificar_figura(resultado)
+        if has_request_context():
+            g.payload_callback = (f'{func.__module__}.{func.__name__}', meio - inicio, time.perf_counter() - meio)
+        return resultado
+    return wrapper
+
+
+def registrar(server):
+    # Tamanho do payload e tempo de serialização de cada _dash-update-component
+    @server.before_request
+    def _inicio():
+        if request.path.endswith('_dash-update-component'):
+            g.payload_inicio = time.perf_counter()
+
+    @server.after_request
+    def _fim(response):
+        if request.path.endswith('_dash-update-component') and 'payload_inicio' in g:
+            total = time.perf_counter() - g.payload_inicio
+            nome, montagem, conversao = g.get('payload_callback', (None, 0.0, 0.0))
+            if nome is None:
+                nome = (request.get_json(silent=True) or {}).get('output', '?')
+            # serializacao = restante do request (encode JSON do Dash + resposta)
+            logger.info(
+                'callback=%s bytes=%d montagem=%.1fms conversao=%.1fms serializacao=%.1fms',
+                nome, response.calculate_content_length() or 0,
+                montagem * 1000, conversao * 1000, (total - montagem - conversao) * 1000
+            )
+        return response
+
@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+from config import PERFIL_INICIO
+
+# ==============================
+# PERFIL DA INICIALIZAÇÃO (tempo e memória por fase)
+# ==============================
+
+# Uso: DASHBOARD_PERFIL_INICIO=1 python main.py   (ou python perfil_inicio.py)
+# Com a flag ligada, main.py, utils.py, dados.py e dataset.py marcam as fases da partida
+# (imports, carga do CSV, colunas derivadas, acumuladores, pré-cálculos das páginas,
+# registro dos callbacks) e o relatório sai no stderr quando main.py termina de montar
+# o app. Fases aninhadas aparecem indentadas dentro da fase que as contém; a memória é
+# o RSS do processo. Depois do relatório as marcações não registram mais nada (recargas
+# e benchmarks chamam as mesmas funções).
+
+_ativo = PERFIL_INICIO
+_inicio = time.perf_counter()
+_fases = []
+_profundidade = 0
+
+
+def _rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        import resource
+        # Fora do Linux: pico de RSS (KB no Linux, bytes no macOS)
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico / 2 ** 20 if sys.platform == 'darwin' else pico / 1024
+
+
+@contextmanager
+def fase(nome):
+    global _profundidade
+    if not _ativo:
+        yield
+        return
+    registro = {'fase': nome, 'nivel': _profundidade, 'rss_antes': _rss_mb()}
+    _fases.append(registro)
+    _profundidade += 1
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registro['segundos'] = time.perf_counter() - inicio
+        registro['rss_depois'] = _rss_mb()
+        _profundidade -= 1
+
+
+def ativo():
+    return _ativo
+
+
+def concluir():
+    # Imprime o relatório (uma vez) e desliga as marcações
+    global _ativo
+    if not _ativo:
+        return None
+    _ativo = False
+    total = time.perf_counter() - _inicio
+    linhas = [f'Perfil da inicialização: {total:.2f}s, RSS {_rss_mb():.0f} MB',
+              f'{"fase":<52}{"tempo (ms)":>12}{"Δ RSS (MB)":>12}{"RSS (MB)":>10}']
+    for registro in _fases:
+        nome = '  ' * registro['nivel'] + registro['fase']
+        linhas.append(f'{nome:<52}{registro["segundos"] * 1000:>12.1f}'
+                      f'{registro["rss_depois"] - registro["rss_antes"]:>12.1f}{registro["rss_depois"]:>10.0f}')
+    relatorio = '\n'.join(linhas)
+    print(relatorio, file=sys.stderr, flush=True)
+    return relatorio
+
+
+if __name__ == '__main__':
+    # Monta o app com o perfil ligado, sem subir o servidor
+    import perfil_inicio
+    perfil_inicio._ativo = True
+    import main  # noqa: F401
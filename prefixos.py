@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+
+# ==============================
+# ÍNDICE DE SOMAS DE PREFIXO (taxa de acerto de qualquer intervalo em O(log n))
+# ==============================
+
+# Por par (e para todos os pares juntos, chave None): timestamps ordenados e, alinhadas
+# a eles, as contagens acumuladas de acertos (int32), com um zero à frente. O total de um
+# intervalo [inicio, fim] sai de dois searchsorted e uma subtração; 'n' é a distância entre
+# as duas posições. Os nomes das colunas são os mesmos dos agregados da retenção
+# (retencao.COLUNAS), então as duas camadas se somam direto. Só as contagens entram no
+# índice: são elas que as páginas leem, e cada linha custa 16 bytes por série (ts + 2 int32).
+#
+# Na ingestão o índice é estendido sem recalcular o que já existe: as linhas novas vão
+# para o fim de um buffer com folga (capacidade dobra quando enche; a carga inicial
+# aloca o tamanho exato, a folga só aparece na primeira ingestão). Um snapshot antigo
+# continua lendo só as suas primeiras n posições, então o buffer pode ser compartilhado.
+ACERTOS = ['acertos_acerto_sem_delta', 'acertos_acerto_com_delta']
+CAMPOS = ['n', *ACERTOS]
+_CAPACIDADE_MINIMA = 1024
+
+
+def _valores(df):
+    return np.column_stack([
+        df['acerto_sem_delta'].to_numpy(dtype='int32'),
+        df['acerto_com_delta'].to_numpy(dtype='int32'),
+    ])
+
+
+def _ns(valor):
+    return pd.Timestamp(valor).value
+
+
+class _Serie:
+    # ts[:n] ordenado e soma[:n + 1] (soma[i] = total das i primeiras linhas + constante);
+    # 'cauda' é compartilhada pelas séries do mesmo buffer e aponta quem pode anexar
+    __slots__ = ('ts', 'soma', 'n', 'cauda')
+
+    def __init__(self, ts, soma, n, cauda=None):
+        self.ts, self.soma, self.n = ts, soma, n
+        self.cauda = cauda if cauda is not None else [self]
+        self.cauda[0] = self
+
+    @classmethod
+    def construir(cls, ts, valores):
+        serie = cls(np.empty(0, dtype='int64'), np.zeros((1, len(ACERTOS)), dtype='int32'), 0)
+        return serie.estendida(ts, valores, folga=False)
+
+    def estendida(self, ts, valores, folga=True):
+        n, m = self.n, len(ts)
+        if self.cauda[0] is self and n + m <= len(self.ts):
+            buf_ts, buf_soma, cauda = self.ts, self.soma, self.cauda
+        else:
+            # Sem folga (ou outra série já anexou neste buffer): copia para um buffer novo
+            capacidade = max(2 * (n + m), _CAPACIDADE_MINIMA) if folga else n + m
+            buf_ts = np.empty(capacidade, dtype='int64')
+            buf_soma = np.empty((capacidade + 1, len(ACERTOS)), dtype='int32')
+            buf_ts[:n] = self.ts[:n]
+            buf_soma[:n + 1] = self.soma[:n + 1]
+            cauda = None
+        buf_ts[n:n + m] = ts
+        buf_soma[n + 1:n + m + 1] = buf_soma[n] + np.cumsum(valores, axis=0)
+        return _Serie(buf_ts, buf_soma, n + m, cauda)
+
+    def cortada(self, inicio_ns):
+        # Sem as linhas anteriores a inicio_ns (views; as somas são usadas só em diferenças)
+        i = int(np.searchsorted(self.ts[:self.n], inicio_ns, side='left'))
+        if i == 0:
+            return self
+        # Só quem é dono da cauda passa o direito de anexar no mesmo buffer para a view
+        dono = self.cauda[0] is self
+        serie = _Serie(self.ts[i:], self.soma[i:], self.n - i, self.cauda if dono else [None])
+        if not dono:
+            serie.cauda[0] = None
+        return serie
+
+    def posicoes(self, limites_ns, lado):
+        return np.searchsorted(self.ts[:self.n], limites_ns, side=lado)
+
+
+class IndicePrefixos:
+    def __init__(self, series=None):
+        self.series = series or {}
+
+    @classmethod
+    def construir(cls, df):
+        return cls().estendido(df)
+
+    def estendido(self, novas):
+        # Índice novo com as linhas anexadas (timestamps >= os já indexados); este não muda
+        if novas.empty:
+            return self
+        if not novas['timestamp'].is_monotonic_increasing:
+            novas = novas.sort_values('timestamp', kind='stable')
+        ts = novas['timestamp'].to_numpy().astype('datetime64[ns]').view('int64')
+        valores = _valores(novas)
+        series = dict(self.series)
+        grupos = [(None, slice(None))] + list(novas.groupby('par', observed=True, sort=False).indices.items())
+        for par, posicoes in grupos:
+            anterior = series.get(par)
+            if anterior is None:
+                series[par] = _Serie.construir(ts[posicoes], valores[posicoes])
+            else:
+                series[par] = anterior.estendida(ts[posicoes], valores[posicoes])
+        return IndicePrefixos(series)
+
+    def cortado(self, inicio):
+        # Sem as linhas anteriores a 'inicio' (usado quando a retenção compacta o começo do df)
+        inicio_ns = _ns(inicio)
+        return IndicePrefixos({par: serie.cortada(inicio_ns) for par, serie in self.series.items()})
+
+    def memoria(self):
+        # Bytes dos buffers (com a folga; buffers compartilhados contam em cada snapshot)
+        return sum(serie.ts.nbytes + serie.soma.nbytes for serie in self.series.values())
+
+    def pares(self):
+        return sorted(par for par in self.series if par is not None)
+
+    def consultar(self, inicio=None, fim=None, par=None):
+        # Totais de [inicio, fim] (fim inclusivo, como nos filtros das páginas)
+        serie = self.series.get(None if par in (None, 'Todos') else par)
+        if serie is None:
+            return dict.fromkeys(CAMPOS, 0)
+        i = 0 if inicio is None else int(serie.posicoes(_ns(inicio), 'left'))
+        j = serie.n if fim is None else int(serie.posicoes(_ns(fim), 'right'))
+        j = max(i, j)
+        return dict(zip(CAMPOS, [j - i, *(serie.soma[j] - serie.soma[i]).tolist()]))
+
+    def por_periodo(self, inicio=None, fim=None, freq='D', par=None):
+        # Totais por período (dia, hora...) dentro de [inicio, fim]; períodos sem linhas ficam de fora
+        serie = self.series.get(None if par in (None, 'Todos') else par)
+        if serie is None or serie.n == 0:
+            return pd.DataFrame(columns=CAMPOS, index=pd.DatetimeIndex([], name='periodo'))
+        ts = serie.ts[:serie.n]
+        i = 0 if inicio is None else int(serie.posicoes(_ns(inicio), 'left'))
+        j = serie.n if fim is None else int(serie.posicoes(_ns(fim), 'right'))
+        if j <= i:
+            return pd.DataFrame(columns=CAMPOS, index=pd.DatetimeIndex([], name='periodo'))
+        periodos = pd.date_range(pd.Timestamp(ts[i]).floor(freq), pd.Timestamp(ts[j - 1]).floor(freq), freq=freq)
+        bordas = np.clip(serie.posicoes(periodos.asi8, 'left'), i, j)
+        bordas = np.append(bordas, j)
+        bordas[0] = i
+        somas = np.column_stack([np.diff(bordas), serie.soma[bordas[1:]] - serie.soma[bordas[:-1]]])
+        tabela = pd.DataFrame(somas, columns=CAMPOS, index=periodos.rename('periodo'))
+        return tabela[tabela['n'] > 0]
+
+
+def taxas(tabela):
+    # Taxas de acerto (%) por período a partir dos totais
+    return pd.DataFrame({
+        'timestamp': tabela.index,
+        'acerto_sem_delta': (tabela['acertos_acerto_sem_delta'] / tabela['n'] * 100).to_numpy(dtype='float64'),
+        'acerto_com_delta': (tabela['acertos_acerto_com_delta'] / tabela['n'] * 100).to_numpy(dtype='float64'),
+    })
+
+
+def agregar_por_periodo(df, freq='D'):
+    # Mesmo resultado de por_periodo a partir das linhas (para dados fora da memória)
+    if df.empty:
+        return pd.DataFrame(columns=CAMPOS, index=pd.DatetimeIndex([], name='periodo'))
+    tabela = pd.DataFrame(_valores(df), columns=ACERTOS, dtype='int64')
+    tabela.insert(0, 'n', 1)
+    tabela['periodo'] = df['timestamp'].dt.floor(freq).to_numpy()
+    return tabela.groupby('periodo').sum()
@@ -0,0 +1,160 @@
+import logging
+import queue
+import threading
+import time
+import pandas as pd
+import plotly.io as pio
+from flask import Response, request, stream_with_context
+import dataset
+import utils
+from config import LIVE_INTERVALO_MS, SSE_FILA_MAX, SSE_MAX_CONEXOES
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CANAL SSE DE NOVAS PREVISÕES
+# ==============================
+
+# Uma única thread por processo lê o arquivo e monta o pacote; cada conexão só recebe
+# a mensagem já serializada. N dashboards abertos custam uma ingestão, não N polls.
+# O canal acompanha o dataset padrão (com vários datasets, os demais usam o polling).
+# O id de cada evento é o último timestamp do pacote: ao reconectar, o navegador manda
+# Last-Event-ID e recebe só o que ainda não tem.
+# Cada conexão aberta prende uma thread do worker até fechar: acima de SSE_MAX_CONEXOES
+# por processo a rota responde 503 e o cliente tenta de novo mais tarde.
+HEARTBEAT_S = 15
+RETRY_APOS_S = 5
+
+
+def _evento(pacote, ultimo):
+    return f'id: {ultimo}\ndata: {pio.json.to_json_plotly(pacote)}\n\n'
+
+
+class Transmissor:
+    def __init__(self, montar, estado_inicial, contexto=0, intervalo=LIVE_INTERVALO_MS / 1000, fila_max=SSE_FILA_MAX,
+                 max_conexoes=SSE_MAX_CONEXOES):
+        # montar(dados, pos, estado) -> pacote; estado_inicial(dados) -> estado (ver temporal.py);
+        # contexto = linhas anteriores a pos que montar precisa
+        self.montar = montar
+        self.estado_inicial = estado_inicial
+        self.contexto = contexto
+        self.intervalo = intervalo
+        self.fila_max = fila_max
+        self.max_conexoes = max_conexoes
+        self.assinantes = set()
+        # Conexões abertas (inclusive as que ainda recebem o pacote de atualização)
+        self._abertas = set()
+        self._trava = threading.Lock()
+        self._thread = None
+        self._estado = None
+        self._kpis = None
+
+    def _iniciar(self):
+        with self._trava:
+            if self._thread is None:
+                snapshot = dataset.atual(dataset.PADRAO)
+                self._estado = self.estado_inicial(snapshot.df)
+                self._kpis = snapshot.kpis()
+                self._thread = threading.Thread(target=self._loop, name='sse-ingestao', daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            time.sleep(self.intervalo)
+            try:
+                if self.assinantes:
+                    self._ciclo()
+            except Exception:
+                logger.exception('Falha na ingestão do canal SSE')
+
+    def _ciclo(self):
+        utils.ingerir(nome=dataset.PADRAO)
+        snapshot = dataset.atual(dataset.PADRAO)
+        dados, pos = snapshot.recentes(self._estado['ultimo'], self.contexto)
+        if pos >= len(dados):
+            return
+        pacote = self.montar(dados, pos, self._estado)
+        self._estado = pacote.pop('estado')
+        atuais = snapshot.kpis()
+        pacote['kpis'] = atuais
+        pacote['kpis_delta'] = {nome: atuais[nome] - self._kpis[nome] for nome in atuais}
+        self._kpis = atuais
+        self.publicar(_evento(pacote, self._estado['ultimo']))
+
+    def publicar(self, mensagem):
+        for fila in list(self.assinantes):
+            try:
+                fila.put_nowait(mensagem)
+            except queue.Full:
+                # Cliente lento: descarta a mensagem mais antiga dessa conexão
+                try:
+                    fila.get_nowait()
+                except queue.Empty:
+                    pass
+                fila.put_nowait(mensagem)
+
+    def assinar(self, desde=None):
+        # None quando o processo já tem max_conexoes abertas
+        fila = queue.Queue(maxsize=self.fila_max)
+        with self._trava:
+            if len(self._abertas) >= self.max_conexoes:
+                return None
+            self._abertas.add(fila)
+        try:
+            self._atualizar(fila, desde)
+        except Exception:
+            self.cancelar(fila)
+            raise
+        self.assinantes.add(fila)
+        return fila
+
+    def _atualizar(self, fila, desde):
+        self._iniciar()
+        if desde is not None:
+            # Atualiza o cliente desde o último ponto que ele já tem
+            snapshot = dataset.atual(dataset.PADRAO)
+            dados = snapshot.df
+            pos = dados['timestamp'].searchsorted(pd.Timestamp(desde), side='right')
+            if pos < len(dados):
+                pacote = self.montar(dados, pos, self.estado_inicial(dados.iloc[:pos]))
+                estado = pacote.pop('estado')
+                pacote['kpis'] = snapshot.kpis()
+                pacote['kpis_delta'] = None
+                fila.put_nowait(_evento(pacote, estado['ultimo']))
+
+    def cancelar(self, fila):
+        # Idempotente: chamado pelo fim do gerador e pelo fechamento da resposta
+        self.assinantes.discard(fila)
+        with self._trava:
+            self._abertas.discard(fila)
+
+
+def registrar(server, montar, estado_inicial, contexto=0):
+    transmissor = Transmissor(montar, estado_inicial, contexto)
+
+    @server.route('/stream/previsoes')
+    def stream_previsoes():
+        # Reconexão automática do EventSource: Last-Event-ID vale mais que o desde da URL
+        fila = transmissor.assinar(request.headers.get('Last-Event-ID') or request.args.get('desde'))
+        if fila is None:
+            return Response('Limite de conexões SSE atingido', status=503,
+                            headers={'Retry-After': str(RETRY_APOS_S)})
+
+        def eventos():
+            try:
+                yield 'retry: 5000\n\n'
+                while True:
+                    try:
+                        yield fila.get(timeout=HEARTBEAT_S)
+                    except queue.Empty:
+                        yield ': heartbeat\n\n'
+            finally:
+                transmissor.cancelar(fila)
+
+        resposta = Response(stream_with_context(eventos()), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        # Libera a vaga mesmo se o cliente sair antes do primeiro evento (o gerador nem começa)
+        resposta.call_on_close(lambda: transmissor.cancelar(fila))
+        return resposta
+
+    return transmissor
@@ -0,0 +1,92 @@
+import hmac
+import logging
+import threading
+import time
+import pandas as pd
+from flask import jsonify, request
+import dataset
+import utils
+from config import ADMIN_TOKEN, RECARGA_INTERVALO_S
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# RECARGA DO DATASET SEM REINICIAR
+# ==============================
+
+# A recarga roda em segundo plano: relê a fonte, reconstrói volatilidade, quantis,
+# médias de intervalo e tabelas de blocos em um snapshot novo e só então troca
+# (ver utils.recarregar). Cada processo recarrega o seu próprio snapshot. Com vários
+# datasets o endpoint recarrega o de ?dataset= (padrão se omitido) e a recarga
+# periódica, os que estão em memória.
+
+
+class Recarregador:
+    def __init__(self):
+        self.ultimo = None
+        self.em_andamento = False
+        self._trava = threading.Lock()
+
+    def iniciar(self, origem='endpoint', nomes=(dataset.PADRAO,)):
+        # False se já existe uma recarga em andamento
+        with self._trava:
+            if self.em_andamento:
+                return False
+            self.em_andamento = True
+        threading.Thread(target=self._executar, args=(origem, list(nomes)), name='recarga', daemon=True).start()
+        return True
+
+    def _executar(self, origem, nomes):
+        for nome in nomes:
+            try:
+                relatorio = utils.recarregar(nome)
+                relatorio.update(origem=origem, concluida=pd.Timestamp.now().isoformat())
+                logger.info('Recarga de %s (%s): %.2fs, %+d linhas, versão %s', nome, origem,
+                            relatorio['duracao_s'], relatorio['linhas_adicionadas'], relatorio['versao'])
+            except Exception as erro:
+                logger.exception('Falha na recarga do dataset %s', nome)
+                relatorio = {'dataset': nome, 'origem': origem, 'erro': str(erro),
+                             'concluida': pd.Timestamp.now().isoformat()}
+            self.ultimo = relatorio
+        with self._trava:
+            self.em_andamento = False
+
+    def agendar(self, intervalo):
+        def loop():
+            while True:
+                time.sleep(intervalo)
+                self.iniciar(origem='agendada', nomes=list(dataset.carregados()))
+        threading.Thread(target=loop, name='recarga-agendada', daemon=True).start()
+
+
+def autorizado():
+    if ADMIN_TOKEN:
+        return hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN)
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+
+def registrar(server):
+    recarregador = Recarregador()
+
+    @server.route('/admin/recarregar', methods=['POST'])
+    def admin_recarregar():
+        if not autorizado():
+            return jsonify(erro='não autorizado'), 403
+        nome = request.args.get('dataset', dataset.PADRAO)
+        if nome not in dataset.nomes():
+            return jsonify(erro=f'dataset desconhecido: {nome}'), 404
+        if not recarregador.iniciar(nomes=[nome]):
+            return jsonify(status='em andamento'), 409
+        return jsonify(status='iniciada'), 202
+
+    @server.route('/admin/recarga')
+    def admin_recarga():
+        # Estado e relatório da última recarga (duração, linhas adicionadas, versão)
+        if not autorizado():
+            return jsonify(erro='não autorizado'), 403
+        return jsonify(em_andamento=recarregador.em_andamento, ultima=recarregador.ultimo,
+                       carregados=dataset.carregados())
+
+    if RECARGA_INTERVALO_S > 0:
+        recarregador.agendar(RECARGA_INTERVALO_S)
+    return recarregador
@@ -0,0 +1,278 @@
+import argparse
+import html
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# ==============================
+# RELATÓRIO EM LOTE (sem servidor Dash)
+# ==============================
+
+# Uso: python relatorio.py --saida relatorio_diario
+#      python relatorio.py --arquivo dados.csv --dia Monday --par BNB/USDC --processos 4
+#      python relatorio.py --dataset modelo_a --inicio 2025-06-01 --fim 2025-06-30
+# Carrega o dataset uma vez, calcula as páginas (os mesmos callbacks do app) em um pool
+# de processos e grava um pacote estático: index.html (gráficos interativos, sem
+# servidor), relatorio.json (figuras e tempos) e plotly.min.js. Com fork (Linux/macOS)
+# os processos herdam o dataset já carregado; nos demais sistemas cada um carrega o seu.
+# O tempo de cada página (cálculo e serialização no processo) sai no fim e no relatório.
+
+# Os callbacks em segundo plano rodam aqui no próprio processo do pool
+os.environ.pop('DASHBOARD_SEGUNDO_PLANO_DIR', None)
+
+# (página, callback 'módulo.função' ou None para o layout, argumentos a partir dos filtros)
+PAGINAS = [
+    ('Resumo', None, lambda f: ()),
+    ('Análise Temporal', 'temporal.update_graficos', lambda f: (f['inicio'], f['fim'])),
+    ('Taxas por Hora e Dia', 'hour_day.update_metricas_hour_day', lambda f: (f['dia'],)),
+    ('Sequências por Hora e Dia', 'hour_day.update_hour_day', lambda f: (f['dia'],)),
+    ('Taxas por Par', 'pair.update_pair_metrics', lambda f: (f['par'],)),
+    ('Direções por Par', 'pair.update_pair', lambda f: (f['par'],)),
+    ('Análise de Erros', 'errors.update_errors', lambda f: (f['erro'],)),
+    ('Análise Avançada', 'advanced.update_advanced', lambda f: (f['erro'],)),
+    ('Erro vs Movimento', 'advanced.update_error_vs_movement', lambda f: (f['erro'], None)),
+    ('Hora e Dia por Par', 'other.update_hour_day', lambda f: (f['dia'],)),
+]
+_MODULOS = ('resumo', 'temporal', 'hour_day', 'pair', 'errors', 'advanced', 'other')
+
+
+class _Coletor:
+    # Faz o papel do app em register_callbacks: guarda cada função com as suas saídas
+    def __init__(self):
+        self.callbacks = {}
+
+    def callback(self, *args, **kwargs):
+        from dash import Output
+        saidas = []
+        for arg in args:
+            for item in (arg if isinstance(arg, (list, tuple)) else [arg]):
+                if isinstance(item, Output):
+                    saidas.append(item)
+
+        def decorador(func):
+            self.callbacks[f'{func.__module__}.{func.__name__}'] = (func, saidas)
+            return func
+        return decorador
+
+    def clientside_callback(self, *args, **kwargs):
+        pass
+
+
+_callbacks = None
+
+
+def _iniciar(arquivo=None, nome=None):
+    # Importa as páginas e coleta os callbacks (no fork já vem pronto do processo pai)
+    global _callbacks
+    if _callbacks is not None:
+        return
+    if arquivo:
+        os.environ['DASHBOARD_DADOS'] = arquivo
+    import importlib
+    import dataset
+    modulos = [importlib.import_module(nome_modulo) for nome_modulo in _MODULOS]
+    coletor = _Coletor()
+    for modulo in modulos:
+        modulo.register_callbacks(coletor)
+        # Com DASHBOARD_FILTROS_CLIENTE as taxas são clientside no app; aqui vêm do servidor
+        if hasattr(modulo, 'register_metric_callbacks'):
+            modulo.register_metric_callbacks(coletor)
+    _callbacks = coletor.callbacks
+    if nome:
+        dataset.atual(nome)
+
+
+def _calcular(pagina, chave, args, nome):
+    # Roda no processo do pool: (página, saídas serializadas, segundos de cálculo e de JSON)
+    import plotly.io as pio
+    import dataset
+    import resumo
+    inicio = time.perf_counter()
+    with dataset.usando(nome):
+        if chave is None:
+            saidas = {'layout': resumo.layout()}
+        else:
+            func, ids = _callbacks[chave]
+            resultado = func(*args)
+            resultado = resultado if isinstance(resultado, (list, tuple)) else [resultado]
+            # Só as figuras e conteúdos; estilos dos spinners ficam de fora
+            saidas = {str(saida.component_id): valor for saida, valor in zip(ids, resultado)
+                      if saida.component_property in ('figure', 'children')}
+    calculo = time.perf_counter() - inicio
+    texto = pio.json.to_json_plotly(saidas)
+    return {'pagina': pagina, 'callback': chave or 'resumo.layout', 'saidas': texto, 'pid': os.getpid(),
+            'calculo_s': calculo, 'serializacao_s': time.perf_counter() - inicio - calculo}
+
+
+# ==============================
+# HTML ESTÁTICO
+# ==============================
+
+def _css(estilo):
+    def propriedade(nome):
+        return ''.join('-' + c.lower() if c.isupper() else c for c in nome)
+    return ';'.join(f'{propriedade(k)}:{v}' for k, v in (estilo or {}).items())
+
+
+def _componente_html(no, figuras):
+    # Árvore de componentes Dash (JSON) -> HTML; dcc.Graph vira um div com a figura
+    if no is None:
+        return ''
+    if isinstance(no, (list, tuple)):
+        return ''.join(_componente_html(item, figuras) for item in no)
+    if not isinstance(no, dict) or 'type' not in no:
+        return html.escape(str(no))
+    tipo, props = no['type'], no.get('props', {})
+    if tipo == 'Graph':
+        return _figura_html(props.get('figure'), figuras)
+    if no.get('namespace') != 'dash_html_components':
+        return ''
+    tag = tipo.lower()
+    atributos = ''
+    if props.get('className'):
+        atributos += f' class="{html.escape(props["className"])}"'
+    if props.get('style'):
+        atributos += f' style="{html.escape(_css(props["style"]))}"'
+    return f'<{tag}{atributos}>{_componente_html(props.get("children"), figuras)}</{tag}>'
+
+
+def _figura_html(figura, figuras):
+    if not figura:
+        return ''
+    figuras.append(figura)
+    return f'<div id="figura-{len(figuras) - 1}" class="mb-6" style="min-height:450px"></div>'
+
+
+def _saida_html(valor, figuras):
+    # Saída de callback: figura (data/layout) ou árvore de componentes
+    if isinstance(valor, dict) and 'type' not in valor:
+        return _figura_html(valor, figuras)
+    return _componente_html(valor, figuras)
+
+
+def _montar_html(resultados, tempos, filtros, titulo):
+    figuras = []
+    secoes = []
+    for resultado in resultados:
+        saidas = json.loads(resultado['saidas'])
+        corpo = ''.join(_saida_html(valor, figuras) for valor in saidas.values())
+        secoes.append(f'<section class="mb-10"><h2 class="text-2xl font-bold text-blue-400 mb-4">'
+                      f'{html.escape(resultado["pagina"])}</h2>{corpo}</section>')
+    linhas = ''.join(
+        f'<tr><td>{html.escape(r["pagina"])}</td><td>{r["callback"]}</td><td class="num">{r["calculo_s"] * 1000:.0f}</td>'
+        f'<td class="num">{r["serializacao_s"] * 1000:.0f}</td><td class="num">{len(r["saidas"]) / 1024:.0f}</td></tr>'
+        for r in resultados)
+    etapas = ''.join(f'<li>{html.escape(etapa)}: {segundos:.2f}s</li>' for etapa, segundos in tempos.items())
+    # Figuras no <script>: '</' escapado para não fechar a tag
+    dados_figuras = json.dumps(figuras).replace('</', '<\\/')
+    descricao = ', '.join(f'{k}={v}' for k, v in filtros.items() if v is not None)
+    return f'''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{html.escape(titulo)}</title>
+<link href="https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css" rel="stylesheet">
+<script src="plotly.min.js"></script>
+<style>
+body {{ background: #0a1128; color: #e2e8f0; padding: 2rem; }}
+table {{ border-collapse: collapse; margin-bottom: 2rem; }}
+td, th {{ border: 1px solid #334155; padding: 0.25rem 0.75rem; }}
+td.num {{ text-align: right; }}
+</style>
+</head>
+<body>
+<h1 class="text-4xl font-bold text-blue-400 mb-2">{html.escape(titulo)}</h1>
+<p class="mb-6 text-gray-400">{html.escape(descricao)}</p>
+<h2 class="text-xl font-semibold text-blue-300 mb-2">Tempos</h2>
+<ul class="mb-4">{etapas}</ul>
+<table>
+<tr><th>Página</th><th>Callback</th><th>Cálculo (ms)</th><th>JSON (ms)</th><th>Tamanho (KB)</th></tr>
+{linhas}
+</table>
+{''.join(secoes)}
+<script>
+var figuras = {dados_figuras};
+figuras.forEach(function (figura, i) {{
+    Plotly.newPlot('figura-' + i, figura.data || [], figura.layout || {{}}, {{responsive: true}});
+}});
+</script>
+</body>
+</html>
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Relatório estático de todas as páginas do dashboard.')
+    parser.add_argument('--saida', default='relatorio', help='diretório do pacote HTML/JSON')
+    parser.add_argument('--arquivo', default=None, help='CSV de dados (padrão: DASHBOARD_DADOS)')
+    parser.add_argument('--dataset', default=None, help='dataset nomeado (DASHBOARD_DATASETS)')
+    parser.add_argument('--processos', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--inicio', default=None, help='início do intervalo da página temporal')
+    parser.add_argument('--fim', default=None, help='fim do intervalo da página temporal')
+    parser.add_argument('--dia', default='Todos', help='filtro de dia da semana')
+    parser.add_argument('--par', default='Todos', help='filtro de par')
+    parser.add_argument('--erro', default='acerto_sem_delta', choices=['acerto_sem_delta', 'acerto_com_delta'])
+    args = parser.parse_args()
+
+    tempos = {}
+    inicio = time.perf_counter()
+    _iniciar(args.arquivo, args.dataset)
+    import dataset
+    snapshot = dataset.atual(args.dataset)
+    tempos['carga do dataset e das páginas'] = time.perf_counter() - inicio
+    # Derivados calculados uma vez aqui; com fork os processos do pool já os herdam
+    inicio = time.perf_counter()
+    snapshot.aquecer()
+    tempos['derivados do snapshot'] = time.perf_counter() - inicio
+    filtros = {'dataset': args.dataset or dataset.PADRAO, 'inicio': args.inicio, 'fim': args.fim,
+               'dia': args.dia, 'par': args.par, 'erro': args.erro}
+
+    # fork: os processos herdam o dataset carregado; sem fork, cada um carrega no initializer
+    metodos = multiprocessing.get_all_start_methods()
+    contexto = multiprocessing.get_context('fork' if 'fork' in metodos else None)
+    inicio = time.perf_counter()
+    resultados = []
+    with ProcessPoolExecutor(max_workers=max(1, args.processos), mp_context=contexto,
+                             initializer=_iniciar, initargs=(args.arquivo, args.dataset)) as pool:
+        pendentes = {pool.submit(_calcular, pagina, chave, argumentos(filtros), args.dataset): pagina
+                     for pagina, chave, argumentos in PAGINAS}
+        for futuro in as_completed(pendentes):
+            resultado = futuro.result()
+            resultados.append(resultado)
+            print(f'{resultado["pagina"]}: {resultado["calculo_s"] * 1000:.0f} ms '
+                  f'(+{resultado["serializacao_s"] * 1000:.0f} ms JSON, processo {resultado["pid"]})', flush=True)
+    tempos['páginas (pool de processos)'] = time.perf_counter() - inicio
+    ordem = [pagina for pagina, _, _ in PAGINAS]
+    resultados.sort(key=lambda r: ordem.index(r['pagina']))
+
+    inicio = time.perf_counter()
+    os.makedirs(args.saida, exist_ok=True)
+    import plotly.offline
+    with open(os.path.join(args.saida, 'plotly.min.js'), 'w', encoding='utf-8') as arquivo:
+        arquivo.write(plotly.offline.get_plotlyjs())
+    titulo = f'Relatório de Previsões - {filtros["dataset"]} ({time.strftime("%d/%m/%Y %H:%M")})'
+    tempos['soma do cálculo das páginas'] = sum(r['calculo_s'] + r['serializacao_s'] for r in resultados)
+    with open(os.path.join(args.saida, 'index.html'), 'w', encoding='utf-8') as arquivo:
+        arquivo.write(_montar_html(resultados, tempos, filtros, titulo))
+    with open(os.path.join(args.saida, 'relatorio.json'), 'w', encoding='utf-8') as arquivo:
+        arquivo.write('{"titulo": %s, "versao": %s, "linhas": %d, "filtros": %s, "processos": %d, "tempos": %s, '
+                      '"paginas": [%s]}' % (
+                          json.dumps(titulo), json.dumps(snapshot.versao), len(snapshot), json.dumps(filtros),
+                          args.processos, json.dumps(tempos),
+                          ', '.join('{"pagina": %s, "callback": %s, "calculo_s": %f, "serializacao_s": %f, '
+                                    '"saidas": %s}' % (json.dumps(r['pagina']), json.dumps(r['callback']),
+                                                       r['calculo_s'], r['serializacao_s'], r['saidas'])
+                                    for r in resultados)))
+    tempos['escrita do pacote'] = time.perf_counter() - inicio
+
+    total = sum(v for k, v in tempos.items() if k != 'soma do cálculo das páginas')
+    print(f'\nRelatório em {args.saida}/index.html ({total:.2f}s)', file=sys.stderr)
+    for etapa, segundos in tempos.items():
+        print(f'  {etapa:<40}{segundos:>8.2f}s', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
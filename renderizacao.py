@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from config import BINS_INTERVALOS, LIMITE_PONTOS_WEBGL
+
+# ==============================
+# WEBGL AUTOMÁTICO PARA SÉRIES GRANDES
+# ==============================
+
+# Com dezenas de milhares de pontos o SVG trava o navegador. Acima de LIMITE_PONTOS_WEBGL
+# pontos na figura os scatters passam a Scattergl e as barras de intervalos viram um
+# histograma agregado no servidor (média por faixa de tempo). A decisão fica em
+# layout.meta['renderizacao'] (modo, pontos, limite) para calibrar o limite.
+
+
+def webgl(pontos):
+    return pontos > LIMITE_PONTOS_WEBGL
+
+
+def scatter(pontos, **props):
+    # go.Scatter ou go.Scattergl conforme o total de pontos da figura
+    return (go.Scattergl if webgl(pontos) else go.Scatter)(**props)
+
+
+def modo_px(pontos):
+    # render_mode do plotly.express com a mesma decisão
+    return 'webgl' if webgl(pontos) else 'svg'
+
+
+def registrar(fig, pontos, modo=None):
+    modo = modo or modo_px(pontos)
+    meta = fig.layout.meta if isinstance(fig.layout.meta, dict) else {}
+    fig.update_layout(meta=dict(meta, renderizacao={'modo': modo, 'pontos': int(pontos),
+                                                    'limite': LIMITE_PONTOS_WEBGL}))
+    return fig
+
+
+def _ns(x):
+    return pd.to_datetime(pd.Series(x)).to_numpy(dtype='datetime64[ns]').view('int64')
+
+
+def bordas_faixas(*series, bins=BINS_INTERVALOS):
+    # Bordas comuns (em ns) a várias séries de datas: traces da mesma figura com as mesmas faixas
+    ns = np.concatenate([_ns(x) for x in series])
+    if not len(ns):
+        return None
+    return np.linspace(ns.min(), ns.max() + 1, bins + 1)
+
+
+def media_por_faixa(x, y, bins=BINS_INTERVALOS, bordas=None):
+    # Histograma agregado: (centros das faixas de x, média de y, contagem), só faixas
+    # com pontos; x são datas. Sem 'bordas', bins faixas iguais entre o mínimo e o máximo de x
+    ns = _ns(x)
+    y = np.asarray(y, dtype='float64')
+    if not len(ns):
+        return pd.DatetimeIndex([]), y, np.zeros(0, dtype='int64')
+    if bordas is None:
+        bordas = bordas_faixas(x, bins=bins)
+    soma, _ = np.histogram(ns, bordas, weights=y)
+    contagem, _ = np.histogram(ns, bordas)
+    centros = ((bordas[:-1] + bordas[1:]) / 2).astype('int64')
+    com_dados = contagem > 0
+    return pd.to_datetime(centros[com_dados]), soma[com_dados] / contagem[com_dados], contagem[com_dados]
+
+
+def barras_intervalos(x, y, agregar, bordas=None, **props):
+    # Barras de intervalos: uma por acerto, ou a média por faixa de tempo quando 'agregar'
+    # (passe as mesmas 'bordas' aos traces que dividem o eixo, ver bordas_faixas)
+    if not agregar:
+        return go.Bar(x=x, y=y, **props)
+    centros, medias, contagem = media_por_faixa(x, y, bordas=bordas)
+    props['hovertemplate'] = 'Faixa: %{x}<br>Média: %{y:.2f} min<br>Acertos: %{customdata}<extra></extra>'
+    return go.Bar(x=centros, y=medias, customdata=contagem, **props)
@@ -0,0 +1,104 @@
+import gzip
+import hashlib
+from flask import request
+import cache_disco
+import segundo_plano
+from config import COMPRESSAO_MINIMO
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# ==============================
+# COMPRESSÃO E CACHE CONDICIONAL (ETag / If-None-Match)
+# ==============================
+
+_TIPOS_COMPRIMIVEIS = ('application/json', 'text/html', 'text/css', 'application/javascript', 'text/javascript')
+# Rotas cujo conteúdo depende só do código e da versão do dataset
+_ROTAS_CONDICIONAIS = ('_dash-layout', '_dash-dependencies', '_dash-update-component')
+# Callbacks fora do cache em disco: modo ao vivo (lê linhas novas) e download do CSV
+_SEM_CACHE_DISCO = ('extendData', 'download-dataframe')
+
+
+def _etag(versao):
+    # Chave = versão do dataset + rota + corpo do request (inputs do callback)
+    h = hashlib.sha1()
+    h.update(str(versao).encode())
+    h.update(request.path.encode())
+    h.update(request.get_data(cache=True))
+    return h.hexdigest()
+
+
+def _segundo_plano():
+    # Requests de callbacks em segundo plano (início, consulta ou cancelamento de um job)
+    if request.args.get('cacheKey') or request.args.get('job') or request.args.get('oldJob'):
+        return True
+    if not segundo_plano.SAIDAS:
+        return False
+    saida = str((request.get_json(silent=True) or {}).get('output', ''))
+    return any(item in saida for item in segundo_plano.SAIDAS)
+
+
+def _cache_disco_aplicavel():
+    # Respostas de callback que dependem só dos inputs e da versão do dataset
+    if cache_disco.cache is None or not request.path.endswith('_dash-update-component'):
+        return False
+    saida = str((request.get_json(silent=True) or {}).get('output', ''))
+    return not any(marcador in saida for marcador in _SEM_CACHE_DISCO)
+
+
+def _comprimir(response):
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code not in (200, 201)
+            or 'Content-Encoding' in response.headers
+            or not response.mimetype.startswith(_TIPOS_COMPRIMIVEIS)):
+        return response
+    corpo = response.get_data()
+    if len(corpo) < COMPRESSAO_MINIMO:
+        return response
+
+    aceitos = request.headers.get('Accept-Encoding', '')
+    if brotli is not None and 'br' in aceitos:
+        response.set_data(brotli.compress(corpo, quality=5))
+        response.headers['Content-Encoding'] = 'br'
+    elif 'gzip' in aceitos:
+        response.set_data(gzip.compress(corpo, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        return response
+    response.headers.add('Vary', 'Accept-Encoding')
+    return response
+
+
+def registrar(server, versao):
+    # versao: função que retorna a versão atual do dataset
+    @server.before_request
+    def _condicional():
+        if not request.path.endswith(_ROTAS_CONDICIONAIS) or _segundo_plano():
+            return None
+        etag = _etag(versao())
+        request.environ['dashboard.etag'] = etag
+        if etag in request.if_none_match:
+            return server.response_class(status=304, headers={'ETag': f'"{etag}"'})
+        # Mesma chave no cache em disco: resposta já calculada por este ou outro worker
+        if _cache_disco_aplicavel():
+            request.environ['dashboard.cache_disco'] = True
+            achou, corpo = cache_disco.obter(f'resposta:{etag}')
+            if achou:
+                request.environ['dashboard.cache_disco'] = False
+                return server.response_class(corpo, mimetype='application/json',
+                                             headers={'X-Cache': 'HIT'})
+        return None
+
+    @server.after_request
+    def _finalizar(response):
+        etag = request.environ.get('dashboard.etag')
+        if etag and response.status_code == 200:
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            # Guardado antes da compressão (cada cliente negocia a sua)
+            if request.environ.get('dashboard.cache_disco') and not response.direct_passthrough:
+                cache_disco.guardar(f'resposta:{etag}', response.get_data())
+                response.headers['X-Cache'] = 'MISS'
+        return _comprimir(response)
@@ -1,6 +1,7 @@
 from dash import html, dcc
-import plotly.express as px
-from utils import df, calculate_metrics
+import dataset
+import prefixos
+from utils import calculate_metrics
 import plotly.graph_objects as go
 import pandas as pd
 
@@ -72,20 +73,20 @@ def gerar_grafico_sequencias(df, usar_com_delta=True):
     return dcc.Graph(figure=fig)
 
 def layout():
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df_sorted = df.sort_values('timestamp')
+    snapshot = dataset.atual()
+    df = snapshot.df
 
-    total_previsoes = len(df)
-    taxa_sem_delta = df['acerto_sem_delta'].mean() * 100
-    taxa_com_delta = df['acerto_com_delta'].mean() * 100
-    acertos_sem_total = df['acerto_sem_delta'].sum()
-    acertos_com_total = df['acerto_com_delta'].sum()
-    ultima_previsao = df_sorted['timestamp'].max().strftime('%d/%m/%Y %H:%M')
+    # Totais e taxas pelo índice de prefixos (linhas brutas + agregados da retenção);
+    # as sequências abaixo usam só as linhas brutas
+    totais = snapshot.consultar()
+    total_previsoes = int(totais['n'])
+    taxa_sem_delta = totais['acertos_acerto_sem_delta'] / totais['n'] * 100
+    taxa_com_delta = totais['acertos_acerto_com_delta'] / totais['n'] * 100
+    acertos_sem_total = int(totais['acertos_acerto_sem_delta'])
+    acertos_com_total = int(totais['acertos_acerto_com_delta'])
+    ultima_previsao = df['timestamp'].max().strftime('%d/%m/%Y %H:%M')
 
-    taxa_diaria = df.groupby(df['timestamp'].dt.date).agg({
-        'acerto_sem_delta': 'mean',
-        'acerto_com_delta': 'mean'
-    }) * 100
+    taxa_diaria = prefixos.taxas(snapshot.por_periodo())
 
     taxa_media_diaria_sem = taxa_diaria['acerto_sem_delta'].mean()
     taxa_media_diaria_com = taxa_diaria['acerto_com_delta'].mean()
@@ -137,5 +138,5 @@ def layout():
             gerar_grafico_sequencias(df, usar_com_delta=False)
         ]),
 
-        html.Button('Exportar Dados', id='export-button', className='neon-button text-white font-bold py-2 px-4 rounded')
+        html.Button('Exportar Dados', id={'type': 'export-button', 'index': 'resumo'}, className='neon-button text-white font-bold py-2 px-4 rounded')
     ])
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+# ==============================
+# RETENÇÃO EM CAMADAS (linhas recentes + agregados por par e hora)
+# ==============================
+
+# Linhas mais antigas que a janela de retenção saem do DataFrame e viram um
+# agregado por (par, hora do relógio): contagens de acerto, somas de erro, OHLC
+# do preço e médias das previsões. Os agregados se combinam por soma, então taxas
+# diárias e totais continuam exatos. Sequências de acertos dependem da ordem das
+# linhas e não entram no agregado: só existem na janela bruta.
+FLAGS = ['acerto_sem_delta', 'acerto_com_delta']
+COLUNAS = (
+    ['par', 'hora', 'n']
+    + [f'acertos_{flag}' for flag in FLAGS]
+    + ['soma_erro_sem', 'soma_erro_com', 'soma_abs_erro_sem', 'soma_abs_erro_com',
+       'soma_previsao', 'soma_previsao_com_delta', 'abertura', 'maxima', 'minima', 'fechamento']
+)
+
+
+def vazio():
+    return pd.DataFrame({coluna: pd.Series(dtype='datetime64[ns]' if coluna == 'hora' else 'object' if coluna == 'par' else 'float64')
+                         for coluna in COLUNAS})
+
+
+def compactar(df):
+    # Agregado por (par, hora); abertura e fechamento na ordem temporal de cada par
+    if df.empty:
+        return vazio()
+    linhas = df.assign(hora=df['timestamp'].dt.floor('h'))
+    linhas = linhas.sort_values(['par', 'timestamp'], kind='stable')
+    erro_sem = linhas['valor_real'] - linhas['previsao']
+    erro_com = linhas['valor_real'] - linhas['previsao_com_delta']
+    agregado = linhas.assign(
+        _erro_sem=erro_sem, _erro_com=erro_com, _abs_sem=erro_sem.abs(), _abs_com=erro_com.abs()
+    ).groupby(['par', 'hora'], observed=True, sort=True).agg(
+        n=('valor_real', 'size'),
+        acertos_acerto_sem_delta=('acerto_sem_delta', 'sum'),
+        acertos_acerto_com_delta=('acerto_com_delta', 'sum'),
+        soma_erro_sem=('_erro_sem', 'sum'),
+        soma_erro_com=('_erro_com', 'sum'),
+        soma_abs_erro_sem=('_abs_sem', 'sum'),
+        soma_abs_erro_com=('_abs_com', 'sum'),
+        soma_previsao=('previsao', 'sum'),
+        soma_previsao_com_delta=('previsao_com_delta', 'sum'),
+        abertura=('valor_real', 'first'),
+        maxima=('valor_real', 'max'),
+        minima=('valor_real', 'min'),
+        fechamento=('valor_real', 'last'),
+    ).reset_index()
+    agregado['par'] = agregado['par'].astype(str)
+    return agregado[COLUNAS]
+
+
+def corte(df, dias):
+    # Início do dia mais antigo mantido bruto
+    return df['timestamp'].max().normalize() - pd.Timedelta(days=dias - 1)
+
+
+def separar(df, compactado, dias):
+    # (recentes, compactado atualizado); df ordenado por timestamp, então o recorte é uma fatia
+    if not dias or df.empty:
+        return df, compactado
+    pos = df['timestamp'].searchsorted(corte(df, dias), side='left')
+    if pos == 0:
+        return df, compactado
+    return df.iloc[pos:], acumular(compactado, df.iloc[:pos])
+
+
+def acumular(compactado, linhas):
+    # Agregados existentes seguidos dos das linhas que saíram da janela
+    antigos = compactar(linhas)
+    return antigos if compactado is None or compactado.empty else pd.concat([compactado, antigos], ignore_index=True)
+
+
+def recortar(compactado, start_date=None, end_date=None, antes_de=None):
+    # Agregados do intervalo; 'antes_de' evita contar de novo horas que também estão brutas
+    if compactado is None or compactado.empty:
+        return vazio()
+    mascara = np.ones(len(compactado), dtype=bool)
+    if start_date is not None:
+        mascara &= compactado['hora'] >= pd.Timestamp(start_date).floor('h')
+    if end_date is not None:
+        mascara &= compactado['hora'] <= pd.Timestamp(end_date)
+    if antes_de is not None:
+        mascara &= compactado['hora'] < pd.Timestamp(antes_de).floor('h')
+    return compactado[mascara]
+
+
+def serie_precos(df, compactado):
+    # Preço por hora (fechamento) e previsões médias dos agregados, seguidos das linhas brutas
+    colunas = ['timestamp', 'valor_real', 'previsao', 'previsao_com_delta']
+    if compactado is None or compactado.empty:
+        return df[colunas]
+    antigos = pd.DataFrame({
+        'timestamp': compactado['hora'],
+        'valor_real': compactado['fechamento'],
+        'previsao': compactado['soma_previsao'] / compactado['n'],
+        'previsao_com_delta': compactado['soma_previsao_com_delta'] / compactado['n'],
+    }).sort_values('timestamp', kind='stable')
+    return pd.concat([antigos, df[colunas]], ignore_index=True)
@@ -0,0 +1,81 @@
+import functools
+import logging
+from dash import State
+import dataset
+from config import SEGUNDO_PLANO_DIR
+
+try:
+    import diskcache
+    import multiprocess  # noqa: F401  (usado pelo DiskcacheManager)
+    from dash import DiskcacheManager
+except ImportError:
+    diskcache = None
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CALLBACKS EM SEGUNDO PLANO (Dash background callbacks)
+# ==============================
+
+# Com DASHBOARD_SEGUNDO_PLANO_DIR os callbacks lentos rodam em um processo separado
+# (DiskcacheManager): o request volta na hora, o navegador acompanha o progresso e,
+# quando os inputs mudam antes do fim, o Dash encerra o processo da execução
+# anterior (oldJob) em vez de deixá-lo consumindo CPU. Os resultados ficam no
+# diretório por versão do dataset, compartilhados entre os workers.
+# Sem o diretório (ou sem diskcache/multiprocess instalados) os mesmos callbacks
+# rodam no request, como antes.
+
+# Resultados de execuções concluídas guardados por até 1 hora
+_EXPIRA_S = 3600
+
+# Outputs dos callbacks em segundo plano; as respostas desses callbacks trazem
+# handles assinados por página e ficam fora do ETag e do cache em disco (responses.py)
+SAIDAS = set()
+
+
+def _criar_gerenciador():
+    if not SEGUNDO_PLANO_DIR:
+        return None
+    if diskcache is None:
+        logger.warning('DASHBOARD_SEGUNDO_PLANO_DIR definido, mas diskcache/multiprocess não estão '
+                       'instalados (pip install "dash[diskcache]"); callbacks rodam no request')
+        return None
+    return DiskcacheManager(diskcache.Cache(SEGUNDO_PLANO_DIR),
+                            cache_by=[lambda: dataset.atual().versao], expire=_EXPIRA_S)
+
+
+gerenciador = _criar_gerenciador()
+
+
+def _sem_progresso(*valores):
+    pass
+
+
+def callback(app, saidas, entradas, progresso, executando, cancelar=()):
+    # Registra func(set_progress, *inputs) em segundo plano quando há gerenciador;
+    # caso contrário como callback comum, com set_progress sem efeito
+    def decorador(func):
+        if gerenciador is None:
+            @functools.wraps(func)
+            def sincrono(*valores):
+                return func(_sem_progresso, *valores)
+            return app.callback(saidas, entradas)(sincrono)
+        SAIDAS.update(str(saida) for saida in saidas)
+
+        # O processo da execução não tem o cookie do request: o dataset escolhido vai
+        # como State do seletor e fica fixado durante a execução
+        @functools.wraps(func)
+        def no_dataset(set_progress, *valores):
+            *valores, nome = valores
+            with dataset.usando(nome):
+                return func(set_progress, *valores)
+
+        return app.callback(
+            saidas, list(entradas) + [State(dataset.SELETOR, 'value')],
+            background=True,
+            manager=gerenciador,
+            progress=progresso,
+            running=executando,
+            cancel=list(cancelar),
+        )(no_dataset)
+    return decorador
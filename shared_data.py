@@ -0,0 +1,129 @@
+import fcntl
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+# ==============================
+# DATASET EM MEMÓRIA COMPARTILHADA (arquivos NumPy mapeados)
+# ==============================
+
+# Cada coluna é gravada uma vez como .npy; os workers mapeiam os arquivos em modo
+# somente leitura, então as páginas do sistema operacional são compartilhadas entre
+# processos e o custo de memória não cresce com o número de workers.
+DIRETORIO = os.environ.get('DASHBOARD_SHARED_DIR')
+MANIFESTO = 'atual.json'
+
+
+def _assinatura(caminho):
+    if os.path.isdir(caminho):
+        # Diretório particionado: muda quando qualquer arquivo muda ou é adicionado
+        arquivos = sorted(os.scandir(caminho), key=lambda e: e.name)
+        infos = [e.stat() for e in arquivos if e.is_file() and not e.name.startswith(('.', '_'))]
+        return {'origem': os.path.abspath(caminho),
+                'mtime_ns': max((i.st_mtime_ns for i in infos), default=0),
+                'tamanho': sum(i.st_size for i in infos),
+                'arquivos': len(infos)}
+    info = os.stat(caminho)
+    return {'origem': os.path.abspath(caminho), 'mtime_ns': info.st_mtime_ns, 'tamanho': info.st_size}
+
+
+def publicar(df, diretorio, assinatura=None):
+    # Nova versão em subdiretório próprio; o manifesto é trocado de forma atômica,
+    # então processos que já mapearam a versão anterior continuam válidos
+    versao = f"v{os.getpid()}-{pd.Timestamp.now().value}"
+    destino = os.path.join(diretorio, versao)
+    os.makedirs(destino)
+
+    colunas = []
+    for i, coluna in enumerate(df.columns):
+        serie = df[coluna]
+        arquivo = f'{i}.npy'
+        info = {'nome': coluna, 'arquivo': arquivo}
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            info['tipo'] = 'datetime'
+            valores = serie.to_numpy(dtype='datetime64[ns]').view('int64')
+        elif isinstance(serie.dtype, pd.CategoricalDtype) or not (pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_bool_dtype(serie)):
+            # Texto vira categoria: códigos inteiros no arquivo, categorias no manifesto
+            categorias = serie.astype('category')
+            info['tipo'] = 'categoria'
+            info['categorias'] = categorias.cat.categories.tolist()
+            info['ordenada'] = bool(categorias.cat.ordered)
+            valores = categorias.cat.codes.to_numpy()
+        else:
+            info['tipo'] = 'numero'
+            valores = serie.to_numpy()
+        np.save(os.path.join(destino, arquivo), np.ascontiguousarray(valores))
+        colunas.append(info)
+
+    manifesto = {'versao': versao, 'linhas': len(df), 'colunas': colunas, 'assinatura': assinatura}
+    temporario = os.path.join(diretorio, f'.{MANIFESTO}.{os.getpid()}')
+    with open(temporario, 'w') as f:
+        json.dump(manifesto, f)
+    os.replace(temporario, os.path.join(diretorio, MANIFESTO))
+    _limpar_versoes(diretorio, manter=versao)
+    return manifesto
+
+
+def _limpar_versoes(diretorio, manter):
+    # Arquivos apagados continuam acessíveis a quem já os mapeou (semântica POSIX)
+    for nome in os.listdir(diretorio):
+        if nome.startswith('v') and nome != manter:
+            shutil.rmtree(os.path.join(diretorio, nome), ignore_errors=True)
+
+
+def ler_manifesto(diretorio):
+    try:
+        with open(os.path.join(diretorio, MANIFESTO)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def anexar(diretorio):
+    # Monta o DataFrame sobre os arquivos mapeados, sem copiar os dados
+    manifesto = ler_manifesto(diretorio)
+    base = os.path.join(diretorio, manifesto['versao'])
+    series = {}
+    for info in manifesto['colunas']:
+        valores = np.load(os.path.join(base, info['arquivo']), mmap_mode='r')
+        if info['tipo'] == 'datetime':
+            series[info['nome']] = pd.Series(valores.view('datetime64[ns]'), copy=False)
+        elif info['tipo'] == 'categoria':
+            dtype = pd.CategoricalDtype(info['categorias'], ordered=info['ordenada'])
+            series[info['nome']] = pd.Series(pd.Categorical.from_codes(valores, dtype=dtype), copy=False)
+        else:
+            series[info['nome']] = pd.Series(valores, copy=False)
+    return pd.DataFrame(series, copy=False)
+
+
+def garantir_publicado(diretorio, caminho, carregar):
+    # Publica (uma única vez entre todos os processos) se não houver versão atual do arquivo
+    os.makedirs(diretorio, exist_ok=True)
+    assinatura = _assinatura(caminho)
+    with open(os.path.join(diretorio, '.lock'), 'w') as trava:
+        fcntl.flock(trava, fcntl.LOCK_EX)
+        try:
+            manifesto = ler_manifesto(diretorio)
+            if manifesto is None or manifesto.get('assinatura') != assinatura:
+                manifesto = publicar(carregar(caminho), diretorio, assinatura)
+        finally:
+            fcntl.flock(trava, fcntl.LOCK_UN)
+    return manifesto
+
+
+def carregar_compartilhado(diretorio, caminho, carregar):
+    garantir_publicado(diretorio, caminho, carregar)
+    return anexar(diretorio)
+
+
+def memoria_processo():
+    # RSS do processo separado em privada (anônima) e compartilhada (arquivos mapeados)
+    campos = {}
+    with open('/proc/self/status') as f:
+        for linha in f:
+            if linha.startswith(('VmRSS', 'RssAnon', 'RssFile', 'RssShmem')):
+                nome, valor = linha.split(':')
+                campos[nome] = int(valor.split()[0]) // 1024
+    return campos
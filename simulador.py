@@ -0,0 +1,93 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# ==============================
+# SIMULADOR DE PREVISÕES (anexa linhas ao CSV)
+# ==============================
+
+# Uso: python simulador.py --arquivo dados.csv --intervalo 2 --linhas 3
+# Gera previsões sintéticas no formato do dados.csv, continuando a partir da última linha,
+# para testar o modo ao vivo (polling ou SSE) sem o modelo real.
+
+COLUNAS = ['timestamp', 'par', 'valor_real', 'previsao', 'previsao_com_delta', 'direcao_real',
+           'direcao_prevista', 'direcao_com_delta', 'acerto_sem_delta', 'acerto_com_delta',
+           'total_previsoes', 'acertos_sem_delta_total', 'acertos_com_delta_total']
+PRECOS_INICIAIS = {'BNB/USDC': 660.0, 'ETH/USDC': 3500.0}
+
+
+def gerar_linhas(n, inicio, passo='2min', precos=None, rng=None):
+    # n previsões a partir do timestamp 'inicio', alternando os pares ao acaso
+    rng = rng or np.random.default_rng()
+    precos = dict(precos or PRECOS_INICIAIS)
+    timestamps = pd.date_range(inicio, periods=n, freq=passo)
+    pares = rng.choice(list(precos), n)
+
+    valores = np.empty(n)
+    for i, par in enumerate(pares):
+        precos[par] += rng.normal(0, precos[par] * 0.0015)
+        valores[i] = precos[par]
+    escala = valores * 0.002
+    previsao = valores + rng.normal(0, 1, n) * escala
+    previsao_delta = valores + rng.normal(0, 0.8, n) * escala
+
+    direcao_real = np.where(rng.random(n) > 0.5, 'UP', 'DOWN')
+    direcao_prevista = np.where(rng.random(n) > 0.5, 'UP', 'DOWN')
+    direcao_delta = np.where(rng.random(n) > 0.48, direcao_real, np.where(direcao_real == 'UP', 'DOWN', 'UP'))
+    acerto_sem = direcao_real == direcao_prevista
+    acerto_com = direcao_real == direcao_delta
+
+    return pd.DataFrame({
+        'timestamp': timestamps.strftime('%Y-%m-%d %H:%M:%S'),
+        'par': pares,
+        'valor_real': valores,
+        'previsao': previsao,
+        'previsao_com_delta': previsao_delta,
+        'direcao_real': direcao_real,
+        'direcao_prevista': direcao_prevista,
+        'direcao_com_delta': direcao_delta,
+        'acerto_sem_delta': acerto_sem,
+        'acerto_com_delta': acerto_com,
+        'total_previsoes': 1,
+        'acertos_sem_delta_total': acerto_sem.astype(int),
+        'acertos_com_delta_total': acerto_com.astype(int),
+    }, columns=COLUNAS), precos
+
+
+def ultimo_estado(arquivo):
+    # Último timestamp e último preço de cada par já gravados
+    df = pd.read_csv(arquivo, usecols=['timestamp', 'par', 'valor_real'])
+    precos = dict(PRECOS_INICIAIS)
+    precos.update(df.groupby('par')['valor_real'].last().to_dict())
+    return pd.to_datetime(df['timestamp']).max(), precos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Anexa previsões sintéticas a um CSV em intervalos regulares.')
+    parser.add_argument('--arquivo', default='dados.csv')
+    parser.add_argument('--intervalo', type=float, default=2.0, help='segundos entre gravações')
+    parser.add_argument('--linhas', type=int, default=1, help='linhas por gravação')
+    parser.add_argument('--passo', default='2min', help='distância entre timestamps simulados')
+    parser.add_argument('--iniciais', type=int, default=1000, help='linhas geradas se o arquivo não existir')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if not os.path.exists(args.arquivo):
+        inicio = pd.Timestamp.now().floor('min') - pd.Timedelta(args.passo) * args.iniciais
+        linhas, _ = gerar_linhas(args.iniciais, inicio, args.passo, rng=rng)
+        linhas.to_csv(args.arquivo, index=False)
+    ultimo, precos = ultimo_estado(args.arquivo)
+
+    while True:
+        linhas, precos = gerar_linhas(args.linhas, ultimo + pd.Timedelta(args.passo), args.passo, precos, rng)
+        linhas.to_csv(args.arquivo, mode='a', header=False, index=False)
+        ultimo = pd.Timestamp(linhas['timestamp'].iloc[-1])
+        print(f'{len(linhas)} linha(s) anexada(s), último timestamp {ultimo}', flush=True)
+        time.sleep(args.intervalo)
+
+
+if __name__ == '__main__':
+    main()
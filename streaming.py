@@ -0,0 +1,279 @@
+import numpy as np
+import pandas as pd
+
+# ==============================
+# VARIÂNCIA ONLINE (Welford / Chan)
+# ==============================
+
+# Cada bucket guarda (n, média, M2) de valor_real por par, dia, hora e dia da semana.
+# Buckets são combinados pela fórmula de Chan, então qualquer filtro custa O(buckets).
+CHAVES_VOLATILIDADE = ['par', 'data', 'hour', 'day_of_week']
+
+
+def _combinar(partes, por):
+    # Chan et al.: junta estados (n, media, m2) de vários buckets em um por grupo
+    partes = partes.assign(_soma=partes['n'] * partes['media'])
+    grupos = partes.groupby(por, observed=True, sort=False)
+    total = grupos['n'].transform('sum')
+    media = grupos['_soma'].transform('sum') / total
+    partes = partes.assign(_m2=partes['m2'] + partes['n'] * (partes['media'] - media) ** 2)
+
+    res = partes.groupby(por, observed=True).agg(
+        n=('n', 'sum'),
+        _soma=('_soma', 'sum'),
+        m2=('_m2', 'sum')
+    ).reset_index()
+    res['media'] = res['_soma'] / res['n']
+    return res[list(por) + ['n', 'media', 'm2']]
+
+
+class AcumuladorVolatilidade:
+    def __init__(self, coluna='valor_real'):
+        self.coluna = coluna
+        self.estado = pd.DataFrame({
+            **{chave: pd.Series(dtype='object') for chave in CHAVES_VOLATILIDADE},
+            'n': pd.Series(dtype='int64'),
+            'media': pd.Series(dtype='float64'),
+            'm2': pd.Series(dtype='float64'),
+        })
+
+    def atualizar(self, linhas):
+        # Momentos do lote novo por bucket, depois merge com o estado atual
+        if linhas.empty:
+            return self
+        linhas = linhas.assign(data=linhas['timestamp'].dt.normalize())
+        grupos = linhas.groupby(CHAVES_VOLATILIDADE, observed=True)[self.coluna]
+        lote = grupos.agg(['count', 'mean']).rename(columns={'count': 'n', 'mean': 'media'})
+        lote['m2'] = grupos.var(ddof=0) * lote['n']
+        lote = lote.reset_index()
+
+        if self.estado.empty:
+            self.estado = lote
+            return self
+        # Só os buckets tocados pelo lote são recombinados; o estado é sempre substituído,
+        # nunca alterado no lugar, então cópias podem compartilhá-lo
+        tocados = pd.MultiIndex.from_frame(self.estado[CHAVES_VOLATILIDADE]).isin(
+            pd.MultiIndex.from_frame(lote[CHAVES_VOLATILIDADE]))
+        combinados = _combinar(pd.concat([self.estado[tocados], lote], ignore_index=True), CHAVES_VOLATILIDADE)
+        self.estado = pd.concat([self.estado[~tocados], combinados], ignore_index=True)
+        return self
+
+    def copiar(self):
+        novo = AcumuladorVolatilidade(self.coluna)
+        novo.estado = self.estado
+        return novo
+
+    def memoria(self):
+        return int(self.estado.memory_usage(deep=True).sum())
+
+    def consultar(self, por=('hour', 'day_of_week'), pair=None, start_date=None, end_date=None, day=None):
+        estado = self.estado
+        if pair not in (None, 'Todos'):
+            estado = estado[estado['par'] == pair]
+        if day not in (None, 'Todos'):
+            estado = estado[estado['day_of_week'] == day]
+        # Granularidade dos buckets é o dia: o intervalo de datas é aplicado por dia inteiro
+        if start_date is not None:
+            estado = estado[estado['data'] >= pd.Timestamp(start_date).normalize()]
+        if end_date is not None:
+            estado = estado[estado['data'] <= pd.Timestamp(end_date).normalize()]
+
+        res = _combinar(estado, list(por))
+        # Desvio padrão amostral (ddof=1), igual ao groupby().std() anterior
+        res['volatility'] = np.sqrt(res['m2'] / (res['n'] - 1)).where(res['n'] > 1)
+        return res
+
+
+# ==============================
+# QUANTIS APROXIMADOS (sketch KLL)
+# ==============================
+
+class SketchKLL:
+    # Sketch KLL mesclável: erro de rank ~ O(1/k), memória O(k log n)
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.seed = seed
+        self.n = 0
+        self.minimo = np.inf
+        self.maximo = -np.inf
+        self.niveis = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacidade(self, nivel):
+        # Níveis mais baixos (peso menor) guardam menos itens, fator 2/3 por nível
+        profundidade = len(self.niveis) - nivel - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** profundidade)))
+
+    def _compactar(self):
+        nivel = 0
+        while nivel < len(self.niveis):
+            itens = self.niveis[nivel]
+            if len(itens) > self._capacidade(nivel):
+                if nivel + 1 == len(self.niveis):
+                    self.niveis.append(np.empty(0))
+                itens = np.sort(itens)
+                resto = itens[:0]
+                if len(itens) % 2:
+                    resto, itens = itens[-1:], itens[:-1]
+                # Mantém metade dos itens (pares ou ímpares ao acaso) com o dobro do peso
+                promovidos = itens[self._rng.integers(2)::2]
+                self.niveis[nivel] = resto
+                self.niveis[nivel + 1] = np.concatenate([self.niveis[nivel + 1], promovidos])
+            nivel += 1
+
+    def atualizar(self, valores):
+        valores = np.asarray(valores, dtype='float64')
+        valores = valores[~np.isnan(valores)]
+        if len(valores) == 0:
+            return self
+        self.n += len(valores)
+        self.minimo = min(self.minimo, valores.min())
+        self.maximo = max(self.maximo, valores.max())
+        self.niveis[0] = np.concatenate([self.niveis[0], valores])
+        self._compactar()
+        return self
+
+    def mesclar(self, outro):
+        while len(self.niveis) < len(outro.niveis):
+            self.niveis.append(np.empty(0))
+        for nivel, itens in enumerate(outro.niveis):
+            self.niveis[nivel] = np.concatenate([self.niveis[nivel], itens])
+        self.n += outro.n
+        self.minimo = min(self.minimo, outro.minimo)
+        self.maximo = max(self.maximo, outro.maximo)
+        self._compactar()
+        return self
+
+    def copiar(self):
+        novo = SketchKLL(self.k, self.seed)
+        novo.n, novo.minimo, novo.maximo = self.n, self.minimo, self.maximo
+        novo.niveis = [itens.copy() for itens in self.niveis]
+        return novo
+
+    def rank(self, x):
+        # Quantidade (aproximada) de valores <= x, para um escalar ou array
+        x = np.atleast_1d(np.asarray(x, dtype='float64'))
+        total = np.zeros(len(x))
+        for nivel, itens in enumerate(self.niveis):
+            if len(itens):
+                total += np.searchsorted(np.sort(itens), x, side='right') * 2 ** nivel
+        return total
+
+    def quantis(self, qs):
+        qs = np.asarray(qs, dtype='float64')
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+        itens = np.concatenate(self.niveis)
+        pesos = np.concatenate([np.full(len(v), 2.0 ** nivel) for nivel, v in enumerate(self.niveis)])
+        ordem = np.argsort(itens)
+        itens, acumulado = itens[ordem], np.cumsum(pesos[ordem])
+        pos = np.searchsorted(acumulado, qs * acumulado[-1], side='left')
+        res = itens[np.minimum(pos, len(itens) - 1)]
+        # Extremos são exatos
+        res[qs <= 0] = self.minimo
+        res[qs >= 1] = self.maximo
+        return res
+
+
+# Métricas de magnitude acompanhadas por (par, dia): um sketch por métrica para as bordas
+# das faixas e os valores acumulados com as flags de acerto para contar cada faixa exatamente
+METRICAS_QUANTIS = {
+    'erro_sem': lambda df: (df['valor_real'] - df['previsao']).abs(),
+    'erro_com': lambda df: (df['valor_real'] - df['previsao_com_delta']).abs(),
+    'movimento': lambda df: df['movement_magnitude'],
+}
+FLAGS_QUANTIS = ['acerto_sem_delta', 'acerto_com_delta']
+# Semente fixa: compactação (e portanto as bordas) reprodutível entre chamadas e workers
+SEMENTE_QUANTIS = 0
+
+
+class IndiceQuantis:
+    def __init__(self, k=200):
+        self.k = k
+        self.buckets = {}
+        # (par, data) -> {coluna: array} com os valores das métricas e as flags de acerto;
+        # cada atualização troca os arrays do bucket por novos (nunca altera os compartilhados)
+        self.valores = {}
+        # Buckets exclusivos deste índice; os demais são compartilhados com cópias (copy-on-write)
+        self._proprios = set()
+
+    def atualizar(self, linhas):
+        if linhas.empty:
+            return self
+        valores = pd.DataFrame({nome: func(linhas) for nome, func in METRICAS_QUANTIS.items()})
+        valores['par'] = linhas['par'].to_numpy()
+        valores['data'] = linhas['timestamp'].dt.normalize().to_numpy()
+        for flag in FLAGS_QUANTIS:
+            valores[flag] = linhas[flag].to_numpy(dtype=bool)
+
+        for chave, grupo in valores.groupby(['par', 'data'], observed=True):
+            if chave not in self._proprios:
+                # Primeiro toque depois de uma cópia: só este bucket é duplicado
+                self.buckets[chave] = {nome: s.copiar() for nome, s in self.buckets.get(chave, {}).items()}
+                self._proprios.add(chave)
+            sketches = self.buckets[chave]
+            for metrica in METRICAS_QUANTIS:
+                sketch = sketches.setdefault(metrica, SketchKLL(self.k, SEMENTE_QUANTIS))
+                sketch.atualizar(grupo[metrica].to_numpy())
+            antigos = self.valores.get(chave)
+            self.valores[chave] = {
+                coluna: grupo[coluna].to_numpy() if antigos is None
+                else np.concatenate([antigos[coluna], grupo[coluna].to_numpy()])
+                for coluna in [*METRICAS_QUANTIS, *FLAGS_QUANTIS]
+            }
+        return self
+
+    def copiar(self):
+        # Cópia rasa: os buckets passam a ser compartilhados pelos dois índices e quem
+        # atualizar um deles copia só esse bucket antes
+        novo = IndiceQuantis(self.k)
+        novo.buckets = dict(self.buckets)
+        novo.valores = dict(self.valores)
+        self._proprios = set()
+        return novo
+
+    def memoria(self):
+        # Bytes dos itens guardados nos sketches e dos valores acumulados de todos os buckets
+        return (sum(itens.nbytes for sketches in self.buckets.values()
+                    for sketch in sketches.values() for itens in sketch.niveis)
+                + sum(v.nbytes for colunas in self.valores.values() for v in colunas.values()))
+
+    def _selecionados(self, pair=None, start_date=None, end_date=None, day=None):
+        inicio = pd.Timestamp(start_date).normalize() if start_date is not None else None
+        fim = pd.Timestamp(end_date).normalize() if end_date is not None else None
+        for par, data in self.buckets:
+            if pair not in (None, 'Todos') and par != pair:
+                continue
+            if (inicio is not None and data < inicio) or (fim is not None and data > fim):
+                continue
+            if day not in (None, 'Todos') and data.day_name() != day:
+                continue
+            yield par, data
+
+    def bins(self, metrica, q=4, pair=None, start_date=None, end_date=None, day=None):
+        # Equivalente a pd.qcut(q) + taxa de acerto por faixa: bordas pelo sketch mesclado,
+        # contagens exatas dos valores acumulados de cada faixa (sem ordenar as linhas)
+        chaves = list(self._selecionados(pair, start_date, end_date, day))
+        todos = SketchKLL(self.k, SEMENTE_QUANTIS)
+        for chave in chaves:
+            todos.mesclar(self.buckets[chave][metrica])
+        bordas = np.unique(todos.quantis(np.linspace(0, 1, q + 1)))
+        if len(bordas) < 2:
+            return pd.DataFrame(columns=['intervalo', 'total', 'taxa_acerto_sem_delta', 'taxa_acerto_com_delta'])
+
+        colunas = [self.valores[chave] for chave in chaves]
+        valores = np.concatenate([c[metrica] for c in colunas])
+        validos = ~np.isnan(valores)
+        # Faixas (a, b], com a primeira incluindo o mínimo, como no qcut
+        faixa = np.clip(np.searchsorted(bordas, valores[validos], side='left') - 1, 0, len(bordas) - 2)
+        total = np.bincount(faixa, minlength=len(bordas) - 1)
+        res = pd.DataFrame({
+            'intervalo': [f'({a:.4g}, {b:.4g}]' for a, b in zip(bordas[:-1], bordas[1:])],
+            'total': total,
+        })
+        for flag in FLAGS_QUANTIS:
+            acertos = np.bincount(faixa, weights=np.concatenate([c[flag] for c in colunas])[validos],
+                                  minlength=len(bordas) - 1)
+            taxa = np.divide(acertos, total, out=np.full(len(total), np.nan), where=total > 0)
+            res[f'taxa_{flag}'] = taxa * 100
+        return res
@@ -1,92 +1,187 @@
-from dash import html, dcc, Input, Output
+from dash import html, dcc, Input, Output, State, ClientsideFunction
+from dash.exceptions import PreventUpdate
 import plotly.graph_objects as go
-from utils import df, calculate_metrics
+import dataset
+import prefixos
+import renderizacao
+import retencao
+import utils
+from utils import calculate_metrics
+from payload import binario
+from config import LIVE_INTERVALO_MS, LIVE_MAX_PONTOS, JANELA_ROLLING, LIVE_SSE
+import numpy as np
 import pandas as pd
 
 # Parte 1: Cálculo do tempo médio sem e com delta (com outliers removidos)
 limite_max_min = 60  # minutos
 
-df['intervalo_sem_delta'] = df[df['acerto_sem_delta'] == True]['timestamp'].diff().dt.total_seconds() / 60
-df['intervalo_com_delta'] = df[df['acerto_com_delta'] == True]['timestamp'].diff().dt.total_seconds() / 60
-
-media_sem = df['intervalo_sem_delta']
-media_sem = media_sem[(media_sem > 0) & (media_sem < limite_max_min)].mean()
-
-media_com = df['intervalo_com_delta']
-media_com = media_com[(media_com > 0) & (media_com < limite_max_min)].mean()
-
-# Função para calcular blocos de acertos
-def calcular_blocos(acertos, limite_bloco=10):
-    acertos = acertos.reset_index(drop=True)
-    blocos, bloco_atual = [], [acertos.loc[0]]
-
-    for i in range(1, len(acertos)):
-        anterior = acertos.loc[i - 1, 'timestamp']
-        atual = acertos.loc[i, 'timestamp']
-        intervalo = (atual - anterior).total_seconds() / 60
+def _intervalos(acertos, anterior=None):
+    # Minutos entre acertos consecutivos (o primeiro contra 'anterior', o último acerto já visto)
+    if anterior is not None:
+        acertos = pd.concat([pd.Series([anterior]), acertos], ignore_index=True)
+    intervalos = acertos.diff().dt.total_seconds().iloc[1:] / 60
+    return intervalos[(intervalos > 0) & (intervalos < limite_max_min)]
+
+def media_intervalo(df, coluna):
+    return _intervalos(df.loc[df[coluna] == True, 'timestamp']).mean()
+
+# Função para calcular blocos de acertos (acertos separados por até limite_bloco minutos);
+# com 'anteriores', estende a tabela já calculada com os acertos seguintes
+def calcular_blocos(acertos, limite_bloco=10, anteriores=None):
+    ts = acertos['timestamp'].reset_index(drop=True)
+    novo = (ts.diff().dt.total_seconds() / 60 > limite_bloco).to_numpy()
+    # O primeiro acerto (diff NaN) fica no grupo 0; cada intervalo longo abre um grupo
+    grupos = ts.groupby(np.cumsum(novo))
+    blocos = pd.DataFrame({
+        'inicio_bloco': grupos.first().to_numpy(),
+        'fim_bloco': grupos.last().to_numpy(),
+        'acertos': grupos.size().to_numpy(),
+    })
+
+    if anteriores is not None and len(anteriores):
+        anteriores = anteriores[['inicio_bloco', 'fim_bloco', 'acertos']]
+        if len(blocos) and (blocos['inicio_bloco'].iloc[0] - anteriores['fim_bloco'].iloc[-1]).total_seconds() / 60 <= limite_bloco:
+            # O primeiro bloco novo continua o último bloco já calculado
+            ultimo = anteriores.iloc[-1]
+            blocos.loc[0, 'inicio_bloco'] = ultimo['inicio_bloco']
+            blocos.loc[0, 'acertos'] += ultimo['acertos']
+            anteriores = anteriores.iloc[:-1]
+        blocos = pd.concat([anteriores, blocos], ignore_index=True)
+
+    blocos['espera_min'] = ((blocos['inicio_bloco'] - blocos['fim_bloco'].shift()).dt.total_seconds() / 60).fillna(0)
+    blocos['acertos_acumulados'] = blocos['acertos'].cumsum()
+    return blocos
+
+FLAGS_TEMPORAL = {'sem': 'acerto_sem_delta', 'com': 'acerto_com_delta'}
+
+def _derivados(df, anterior=None):
+    # Médias de intervalo (via soma e contagem, para estender) e tabelas de blocos
+    res = {}
+    for sufixo, coluna in FLAGS_TEMPORAL.items():
+        acertos = df.loc[df[coluna] == True, ['timestamp']]
+        soma, contagem, ultimo = anterior[f'_intervalos_{sufixo}'] if anterior else (0.0, 0, None)
+        intervalos = _intervalos(acertos['timestamp'], ultimo)
+        soma, contagem = soma + float(intervalos.sum()), contagem + len(intervalos)
+        if len(acertos):
+            ultimo = acertos['timestamp'].iloc[-1]
+        res[f'_intervalos_{sufixo}'] = (soma, contagem, ultimo)
+        res[f'media_{sufixo}'] = soma / contagem if contagem else np.nan
+        res[f'blocos_{sufixo}'] = calcular_blocos(acertos, anteriores=anterior[f'blocos_{sufixo}'] if anterior else None)
+    return res
+
+def estender_derivados(anterior, novas):
+    # Snapshot estendido: só as linhas novas são percorridas
+    return _derivados(novas, anterior)
+
+@dataset.registrar_derivado('temporal', estender=estender_derivados)
+def derivados(snapshot):
+    # Médias de intervalo e tabelas de blocos, calculadas uma vez por snapshot do dataset
+    return _derivados(snapshot.df)
+
+def estado_live(dados):
+    # Último timestamp enviado ao cliente e último acerto de cada tipo (para os intervalos)
+    return {
+        'max_pontos': LIVE_MAX_PONTOS,
+        'ultimo': dados['timestamp'].max().isoformat(),
+        'acerto_sem_delta': dados.loc[dados['acerto_sem_delta'] == True, 'timestamp'].max().isoformat(),
+        'acerto_com_delta': dados.loc[dados['acerto_com_delta'] == True, 'timestamp'].max().isoformat(),
+    }
+
+def taxa_movel(dados):
+    return dados[['acerto_sem_delta', 'acerto_com_delta']].astype(float).rolling(JANELA_ROLLING, min_periods=1).mean() * 100
+
+def _epoch_ms(timestamps):
+    # Mesmo formato dos eixos de data das figuras (payload.codificar_figura: Float64 em epoch-ms);
+    # com strings o extendTraces misturaria tipos no array tipado e geraria NaN
+    return timestamps.to_numpy().astype('datetime64[ms]').astype('int64').astype('float64').tolist()
+
+def pacote_live(dados, pos, estado):
+    # Pontos novos (a partir da posição pos) já no formato dos traces; usado pelo polling e pelo SSE
+    novas = dados.iloc[pos:]
+    x = _epoch_ms(novas['timestamp'])
+    rolling = taxa_movel(dados.iloc[max(0, pos - JANELA_ROLLING + 1):]).iloc[-len(novas):]
+
+    estado = dict(estado, ultimo=novas['timestamp'].max().isoformat())
+    intervalos = []
+    for coluna in ['acerto_sem_delta', 'acerto_com_delta']:
+        acertos = novas.loc[novas[coluna] == True, 'timestamp']
+        anterior = pd.Series([pd.Timestamp(estado[coluna])])
+        intervalo = pd.concat([anterior, acertos], ignore_index=True).diff().dt.total_seconds().iloc[1:] / 60
+        valido = ((intervalo > 0) & (intervalo < limite_max_min)).to_numpy()
+        intervalos.append({'x': _epoch_ms(acertos[valido]),
+                           'y': intervalo[valido].tolist()})
+        if len(acertos):
+            estado[coluna] = acertos.max().isoformat()
+
+    return {
+        'x': x,
+        'precos': [novas['valor_real'].tolist(), novas['previsao'].tolist(), novas['previsao_com_delta'].tolist()],
+        'rolling': [rolling['acerto_sem_delta'].tolist(), rolling['acerto_com_delta'].tolist()],
+        'intervalos': intervalos,
+        'estado': estado,
+    }
+
+def extend_data(pacote):
+    x = pacote['x']
+    sem, com = pacote['intervalos']
+    return (
+        (dict(x=[x, x, x], y=pacote['precos']), [0, 1, 2], LIVE_MAX_PONTOS),
+        (dict(x=[x, x], y=pacote['rolling']), [0, 1], LIVE_MAX_PONTOS),
+        (dict(x=[sem['x']], y=[sem['y']]), [0], LIVE_MAX_PONTOS),
+        (dict(x=[com['x']], y=[com['y']]), [0], LIVE_MAX_PONTOS),
+    )
 
-        if intervalo <= limite_bloco:
-            bloco_atual.append(acertos.loc[i])
-        else:
-            blocos.append(bloco_atual)
-            bloco_atual = [acertos.loc[i]]
-
-    if bloco_atual:
-        blocos.append(bloco_atual)
-
-    blocos_data = []
-    ultimo_fim = None
-
-    for bloco in blocos:
-        inicio = bloco[0]['timestamp']
-        fim = bloco[-1]['timestamp']
-        quantidade = len(bloco)
-        tempo_entre_blocos = (inicio - ultimo_fim).total_seconds() / 60 if ultimo_fim else 0
-        blocos_data.append({
-            'inicio_bloco': inicio,
-            'fim_bloco': fim,
-            'acertos': quantidade,
-            'espera_min': tempo_entre_blocos
-        })
-        ultimo_fim = fim
-
-    df_blocos = pd.DataFrame(blocos_data)
-    df_blocos['acertos_acumulados'] = df_blocos['acertos'].cumsum()
-    return df_blocos
-
-df_blocos_sem = calcular_blocos(df[df['acerto_sem_delta'] == True])
-df_blocos_com = calcular_blocos(df[df['acerto_com_delta'] == True])
+def texto_kpis(atuais, anteriores):
+    return (f"Previsões: {atuais['total']} (+{atuais['total'] - anteriores['total']}) | "
+            f"Sem Delta: {atuais['taxa_sem_delta']:.2f}% ({atuais['taxa_sem_delta'] - anteriores['taxa_sem_delta']:+.2f}) | "
+            f"Com Delta: {atuais['taxa_com_delta']:.2f}% ({atuais['taxa_com_delta'] - anteriores['taxa_com_delta']:+.2f})")
 
 def layout():
+    snapshot = dataset.atual()
+    df = snapshot.df
+    temporal = snapshot.derivado('temporal')
+    inicio, fim = utils.limites_datas(snapshot)
     return html.Div([
         html.H1('Análise Temporal', className='text-4xl font-bold text-blue-400 mb-6'),
         dcc.DatePickerRange(
             id='date-range',
-            min_date_allowed=df['timestamp'].min(),
-            max_date_allowed=df['timestamp'].max(),
+            min_date_allowed=inicio,
+            max_date_allowed=fim,
             initial_visible_month=df['timestamp'].min(),
             start_date=df['timestamp'].min(),
             end_date=df['timestamp'].max(),
             className='bg-gray-700 text-white p-2 rounded-lg mb-4'
         ),
-        html.Button('Exportar Dados', id='export-button', className='neon-button text-white font-bold py-2 px-4 rounded mb-4'),
+        html.Button('Exportar Dados', id={'type': 'export-button', 'index': 'temporal'}, className='neon-button text-white font-bold py-2 px-4 rounded mb-4'),
+        dcc.Checklist(
+            id='live-toggle',
+            options=[{'label': ' Ao vivo', 'value': 'live'}],
+            value=[],
+            className='text-white mb-4'
+        ),
+        html.Div(id='live-kpis', className='text-gray-300 mb-4'),
+        dcc.Interval(id='live-interval', interval=LIVE_INTERVALO_MS, disabled=True),
+        dcc.Store(id='live-ultimo', data=estado_live(df)),
                 html.H1('Análise Temporal', className='text-4xl font-bold text-blue-400 mb-6'),
 
         html.Div([
             html.Div([
                 html.H4("Média de Intervalo Sem Delta", className='text-blue-200 text-lg'),
-                html.P(f"{media_sem:.2f} minutos", className='text-white text-2xl')
+                html.P(f"{temporal['media_sem']:.2f} minutos", className='text-white text-2xl')
             ], className='bg-gray-800 p-4 rounded-lg shadow-lg mr-4'),
 
             html.Div([
                 html.H4("Média de Intervalo Com Delta", className='text-green-200 text-lg'),
-                html.P(f"{media_com:.2f} minutos", className='text-white text-2xl')
+                html.P(f"{temporal['media_com']:.2f} minutos", className='text-white text-2xl')
             ], className='bg-gray-800 p-4 rounded-lg shadow-lg'),
         ], className='flex mb-6'),
 
         html.H2('Evolução Temporal da Taxa de Acerto', className='text-xl font-semibold mb-2 text-blue-300'),
         dcc.Graph(id='temporal-accuracy'),
 
+        html.H2(f'Taxa de Acerto Móvel ({JANELA_ROLLING} previsões)', className='text-xl font-semibold mb-2 text-blue-300'),
+        dcc.Graph(id='rolling-accuracy'),
+
         html.H2('Série Temporal de Preços', className='text-xl font-semibold mb-2 text-blue-300'),
         dcc.Graph(id='price-series'),
 
@@ -103,6 +198,7 @@ def layout():
 def register_callbacks(app):
     @app.callback(
         [Output('temporal-accuracy', 'figure'),
+         Output('rolling-accuracy', 'figure'),
          Output('price-series', 'figure'),
          Output('intervalo-sem', 'figure'),
          Output('intervalo-com', 'figure'),
@@ -110,16 +206,25 @@ def register_callbacks(app):
         [Input('date-range', 'start_date'),
          Input('date-range', 'end_date')]
     )
+    @binario
     def update_graficos(start_date, end_date):
-        filtered_df = df[(df['timestamp'] >= start_date) & (df['timestamp'] <= end_date)]
-
-        # Temporal accuracy
-        temporal_metrics = filtered_df.groupby(filtered_df['timestamp'].dt.date).agg({
-            'acerto_sem_delta': 'mean',
-            'acerto_com_delta': 'mean'
-        }).reset_index()
-        temporal_metrics['acerto_sem_delta'] *= 100
-        temporal_metrics['acerto_com_delta'] *= 100
+        # Snapshot fixo durante todo o callback (inclui as linhas ingeridas no modo ao vivo)
+        snapshot = dataset.atual()
+        df = snapshot.df
+        df_blocos_sem = snapshot.derivado('temporal')['blocos_sem']
+        # Com dados particionados, intervalos fora da memória leem só as partições necessárias
+        filtered_df = utils.dados_intervalo(df, start_date, end_date)
+        # Horas anteriores às linhas brutas vêm dos agregados da retenção
+        antigos = retencao.recortar(snapshot.compactado, start_date, end_date,
+                                    antes_de=filtered_df['timestamp'].min() if len(filtered_df) else None)
+
+        # Temporal accuracy: totais por dia pelo índice de prefixos (duas buscas por dia);
+        # intervalos lidos das partições são agregados a partir das linhas
+        if utils.em_memoria(df, start_date):
+            diario = snapshot.por_periodo(start_date, end_date)
+        else:
+            diario = prefixos.agregar_por_periodo(filtered_df)
+        temporal_metrics = prefixos.taxas(diario)
 
         temporal_fig = go.Figure()
         temporal_fig.add_trace(go.Scatter(
@@ -138,20 +243,46 @@ def register_callbacks(app):
                                    xaxis_title='Data', yaxis_title='Taxa de Acerto (%)',
                                    template='plotly_dark')
 
-        # Price series
+        # Taxa de acerto móvel
+        rolling = taxa_movel(filtered_df)
+        # Séries longas em WebGL acima de LIMITE_PONTOS_WEBGL (ver renderizacao.py)
+        pontos_rolling = 2 * len(filtered_df)
+        rolling_fig = go.Figure()
+        rolling_fig.add_trace(renderizacao.scatter(
+            pontos_rolling,
+            x=filtered_df['timestamp'], y=rolling['acerto_sem_delta'],
+            name='Sem Delta', line=dict(color='#3B82F6')
+        ))
+        rolling_fig.add_trace(renderizacao.scatter(
+            pontos_rolling,
+            x=filtered_df['timestamp'], y=rolling['acerto_com_delta'],
+            name='Com Delta', line=dict(color='#10B981')
+        ))
+        renderizacao.registrar(rolling_fig, pontos_rolling)
+        rolling_fig.update_layout(title=f'Taxa de Acerto Móvel ({JANELA_ROLLING} previsões)',
+                                  xaxis_title='Data', yaxis_title='Taxa de Acerto (%)',
+                                  template='plotly_dark')
+
+        # Price series (agregados antigos: fechamento e previsões médias por hora)
+        precos = retencao.serie_precos(filtered_df, antigos)
+        pontos_precos = 3 * len(precos)
         price_fig = go.Figure()
-        price_fig.add_trace(go.Scatter(
-            x=filtered_df['timestamp'], y=filtered_df['valor_real'],
+        price_fig.add_trace(renderizacao.scatter(
+            pontos_precos,
+            x=precos['timestamp'], y=precos['valor_real'],
             name='Valor Real', line=dict(color='#3B82F6')
         ))
-        price_fig.add_trace(go.Scatter(
-            x=filtered_df['timestamp'], y=filtered_df['previsao'],
+        price_fig.add_trace(renderizacao.scatter(
+            pontos_precos,
+            x=precos['timestamp'], y=precos['previsao'],
             name='Previsão', line=dict(color='#10B981', dash='dash')
         ))
-        price_fig.add_trace(go.Scatter(
-            x=filtered_df['timestamp'], y=filtered_df['previsao_com_delta'],
+        price_fig.add_trace(renderizacao.scatter(
+            pontos_precos,
+            x=precos['timestamp'], y=precos['previsao_com_delta'],
             name='Previsão com Delta', line=dict(color='#8B5CF6', dash='dot')
         ))
+        renderizacao.registrar(price_fig, pontos_precos)
         price_fig.update_layout(title='Série Temporal de Preços',
                                 xaxis_title='Data', yaxis_title='Preço',
                                 template='plotly_dark')
@@ -164,7 +295,8 @@ def register_callbacks(app):
 
 
         intervalo_fig_sem = go.Figure()
-        intervalo_fig_sem.add_trace(go.Scatter(
+        intervalo_fig_sem.add_trace(renderizacao.scatter(
+            len(intervalos_sem),
             x=intervalos_sem['timestamp'],
             y=intervalos_sem['intervalo'],
             name='Intervalo',
@@ -177,6 +309,7 @@ def register_callbacks(app):
             yaxis_title='Minutos',
             template='plotly_dark'
         )
+        renderizacao.registrar(intervalo_fig_sem, len(intervalos_sem))
 
         # Intervalos COM DELTA
         intervalos_delta = df[df['acerto_com_delta'] == True].copy()
@@ -186,7 +319,8 @@ def register_callbacks(app):
 
 
         intervalo_fig_com = go.Figure()
-        intervalo_fig_com.add_trace(go.Scatter(
+        intervalo_fig_com.add_trace(renderizacao.scatter(
+            len(intervalos_delta),
             x=intervalos_delta['timestamp'],
             y=intervalos_delta['intervalo'],
             name='Intervalo',
@@ -199,6 +333,7 @@ def register_callbacks(app):
             yaxis_title='Minutos',
             template='plotly_dark'
         )
+        renderizacao.registrar(intervalo_fig_com, len(intervalos_delta))
 
         # Blocos de acertos acumulados
         blocos_fig = go.Figure()
@@ -222,4 +357,49 @@ def register_callbacks(app):
             template='plotly_dark'
         )
 
-        return temporal_fig, price_fig, intervalo_fig_sem, intervalo_fig_com, blocos_fig
+        return temporal_fig, rolling_fig, price_fig, intervalo_fig_sem, intervalo_fig_com, blocos_fig
+
+    @app.callback(Output('live-interval', 'disabled'), Input('live-toggle', 'value'))
+    def toggle_live(valor):
+        return 'live' not in (valor or [])
+
+    if LIVE_SSE:
+        # Linhas novas chegam por SSE (push.py); o Interval só drena o buffer no navegador
+        app.clientside_callback(
+            ClientsideFunction(namespace='live', function_name='sse'),
+            [Output('price-series', 'extendData'),
+             Output('rolling-accuracy', 'extendData'),
+             Output('intervalo-sem', 'extendData'),
+             Output('intervalo-com', 'extendData'),
+             Output('live-kpis', 'children')],
+            [Input('live-interval', 'n_intervals'),
+             Input('live-interval', 'disabled')],
+            [State('live-ultimo', 'data')],
+            prevent_initial_call=True
+        )
+        return
+
+    @app.callback(
+        [Output('price-series', 'extendData'),
+         Output('rolling-accuracy', 'extendData'),
+         Output('intervalo-sem', 'extendData'),
+         Output('intervalo-com', 'extendData'),
+         Output('live-kpis', 'children'),
+         Output('live-ultimo', 'data')],
+        [Input('live-interval', 'n_intervals')],
+        [State('live-ultimo', 'data')],
+        prevent_initial_call=True
+    )
+    def update_live(n_intervals, estado):
+        # Só as linhas mais novas que as do cliente: custo proporcional às linhas novas
+        utils.ingerir(intervalo_minimo=LIVE_INTERVALO_MS / 2000)
+        snapshot = dataset.atual()
+        # Fim do snapshot com as linhas anteriores que a média móvel precisa
+        dados, pos = snapshot.recentes(estado['ultimo'], JANELA_ROLLING - 1)
+        if pos >= len(dados):
+            raise PreventUpdate
+        pacote = pacote_live(dados, pos, estado)
+        atuais = snapshot.kpis()
+        anteriores = estado.get('kpis') or atuais
+        estado = dict(pacote['estado'], kpis=atuais)
+        return (*extend_data(pacote), texto_kpis(atuais, anteriores), estado)
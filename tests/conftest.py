@@ -0,0 +1,24 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# Dados sintéticos apontados antes de importar dados/utils (DASHBOARD_DADOS é lido na importação)
+_DIR = tempfile.mkdtemp(prefix='dashboard-testes-')
+CSV = os.path.join(_DIR, 'dados.csv')
+os.environ.setdefault('DASHBOARD_DADOS', CSV)
+
+import simulador  # noqa: E402
+from dados import preparar  # noqa: E402
+
+simulador.gerar_linhas(3000, '2024-01-01', rng=np.random.default_rng(7))[0].to_csv(CSV, index=False)
+
+
+@pytest.fixture
+def df():
+    return preparar(simulador.gerar_linhas(3000, '2024-01-01', rng=np.random.default_rng(7))[0])
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from bitmaps import IndiceBitmaps
+
+
+def _esperado(df, colunas, **filtros):
+    for coluna, valor in filtros.items():
+        df = df[df[coluna] == valor]
+    return df.groupby(colunas, observed=True).size()
+
+
+def _conferir(indice, df):
+    assert indice.n == len(df)
+    pd.testing.assert_series_equal(indice.contagens('par'), _esperado(df, 'par'), check_names=False)
+    par = df['par'].iloc[0]
+    pd.testing.assert_series_equal(indice.contagens(['day_of_week', 'hour'], par=par),
+                                   _esperado(df, ['day_of_week', 'hour'], par=par),
+                                   check_names=False, check_index_type=False)
+    assert indice.contar(par=par, acerto_sem_delta=True) == int(((df['par'] == par) & df['acerto_sem_delta']).sum())
+
+
+def test_estendido_duas_vezes_do_mesmo_pai(df):
+    pai = IndiceBitmaps.construir(df.iloc[:1000]).estendido(df.iloc[1000:1003])
+    # Dois filhos do mesmo pai: o segundo não pode escrever no buffer (com folga) do primeiro
+    a = pai.estendido(df.iloc[1003:1500])
+    b = pai.estendido(df.iloc[2000:2100])
+    neto = a.estendido(df.iloc[1500:1510])
+    _conferir(pai, df.iloc[:1003])
+    _conferir(a, df.iloc[:1500])
+    _conferir(b, pd.concat([df.iloc[:1003], df.iloc[2000:2100]]))
+    _conferir(neto, df.iloc[:1510])
+
+
+def test_cortado(df):
+    indice = IndiceBitmaps.construir(df.iloc[:2000]).estendido(df.iloc[2000:2500])
+    cortado = indice.cortado(700)
+    _conferir(cortado, df.iloc[700:2500])
+    _conferir(indice, df.iloc[:2500])
+    # Estender o cortado e o original a partir do mesmo estado
+    _conferir(cortado.estendido(df.iloc[2500:2600]), df.iloc[700:2600])
+    _conferir(indice.estendido(df.iloc[2500:2550]), df.iloc[:2550])
+    _conferir(cortado, df.iloc[700:2500])
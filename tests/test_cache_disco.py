@@ -0,0 +1,39 @@
+import sqlite3
+
+import cache_disco
+from cache_disco import CacheDisco
+
+
+def _soma(cache):
+    return sqlite3.connect(cache.caminho).execute('SELECT COALESCE(SUM(tamanho), 0) FROM entradas').fetchone()[0]
+
+
+def test_total_mantido_em_contadores(tmp_path):
+    cache = CacheDisco(str(tmp_path), 50_000)
+    for i in range(20):
+        cache.guardar(f'k{i}', b'x' * 4000)
+    cache.guardar('k19', b'x' * 8000)  # substituição desconta o tamanho anterior
+    estatisticas = cache.estatisticas()
+    assert estatisticas['bytes'] == _soma(cache) <= 50_000
+    assert estatisticas['removidas'] > 0
+    # Um arquivo já existente começa com o total somado
+    assert CacheDisco(str(tmp_path), 50_000).estatisticas()['bytes'] == _soma(cache)
+
+
+def test_acerto_nao_escreve(tmp_path, monkeypatch):
+    cache = CacheDisco(str(tmp_path), 50_000)
+    cache.guardar('k', 1)
+    con = sqlite3.connect(cache.caminho)
+    acesso = con.execute("SELECT acesso FROM entradas WHERE chave = 'k'").fetchone()[0]
+    for _ in range(10):
+        assert cache.obter('k') == (True, 1)
+    assert cache.obter('outra') == (False, None)
+    # Nada gravado ainda: contadores pendentes em memória, acesso recente não é renovado
+    assert con.execute("SELECT COUNT(*) FROM contadores WHERE nome IN ('hits', 'misses')").fetchone()[0] == 0
+    assert con.execute("SELECT acesso FROM entradas WHERE chave = 'k'").fetchone()[0] == acesso
+    estatisticas = cache.estatisticas()
+    assert (estatisticas['hits'], estatisticas['misses']) == (10, 1)
+
+    monkeypatch.setattr(cache_disco, 'RENOVAR_ACESSO_S', -1)
+    cache.obter('k')
+    assert con.execute("SELECT acesso FROM entradas WHERE chave = 'k'").fetchone()[0] > acesso
@@ -0,0 +1,54 @@
+import threading
+
+import pandas as pd
+import pytest
+
+import dataset
+import metricas  # noqa: F401 (registra 'metricas_base')
+import temporal  # noqa: F401 (registra 'temporal')
+
+
+def _com_limite(funcao, segundos=30):
+    # Roda em outra thread para que um deadlock falhe o teste em vez de travá-lo
+    resultado = {}
+    t = threading.Thread(target=lambda: resultado.setdefault('valor', funcao()), daemon=True)
+    t.start()
+    t.join(segundos)
+    assert not t.is_alive(), 'derivado travou'
+    return resultado['valor']
+
+
+def test_derivado_em_snapshot_estendido(df):
+    snapshot = dataset.Snapshot.construir(df.iloc[:-50].reset_index(drop=True), 'v1')
+    estendido = snapshot.estender(df.iloc[-50:].reset_index(drop=True), 'v2')
+    assert estendido.cauda
+
+    for nome in ('metricas_base', 'temporal'):
+        assert _com_limite(lambda: estendido.derivado(nome)) is not None
+    assert len(estendido.df) == len(df)
+
+
+def test_derivado_aninhado(df):
+    snapshot = dataset.Snapshot.construir(df.iloc[:-50].reset_index(drop=True), 'v1')
+    snapshot = snapshot.estender(df.iloc[-50:].reset_index(drop=True), 'v2')
+    externo = lambda s: (s.derivado('metricas_base'), len(s.df))
+    assert _com_limite(lambda: snapshot.derivado('teste_aninhado', externo))[1] == len(df)
+
+
+def test_derivado_incremental_igual_ao_completo(df):
+    snapshot = dataset.Snapshot.construir(df.iloc[:2000].reset_index(drop=True), 'v1')
+    snapshot.derivado('temporal')
+    # Dois ramos a partir do mesmo snapshot: cada um estende o valor do anterior sem alterá-lo
+    antes = snapshot.derivado('temporal')['blocos_sem'].copy()
+    ramo = snapshot.estender(df.iloc[2000:2010].reset_index(drop=True), 'v2')
+    ramo.derivado('temporal')
+    estendido = snapshot.estender(df.iloc[2000:2005].reset_index(drop=True), 'v3')
+    estendido = estendido.estender(df.iloc[2005:].reset_index(drop=True), 'v4')
+    assert 'temporal' in estendido._herdados
+
+    incremental = estendido.derivado('temporal')
+    completo = temporal.derivados(dataset.Snapshot.construir(df, 'v5'))
+    for sufixo in temporal.FLAGS_TEMPORAL:
+        pd.testing.assert_frame_equal(incremental[f'blocos_{sufixo}'], completo[f'blocos_{sufixo}'])
+        assert incremental[f'media_{sufixo}'] == pytest.approx(completo[f'media_{sufixo}'])
+    pd.testing.assert_frame_equal(snapshot.derivado('temporal')['blocos_sem'], antes)
@@ -0,0 +1,15 @@
+import pandas as pd
+
+import hour_day
+
+
+def test_sequencias_com_intervalo_fixo():
+    minutos = [0, 5, 10, 20, 25, 27, 32, 37, 42, 60, 70, 80]
+    df = pd.DataFrame({
+        'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(minutos, unit='min'),
+        'acerto_sem_delta': True,
+    })
+    # Linhas sem acerto no meio não quebram a sequência dos acertos
+    df = pd.concat([df, df.assign(acerto_sem_delta=False, timestamp=df['timestamp'] + pd.Timedelta('1min'))])
+    res = hour_day.contar_sequencias_com_intervalo_fixo(df.sample(frac=1, random_state=0), intervalos=[5, 10, 15])
+    assert res['quantidade'].tolist() == [3, 2, 0]
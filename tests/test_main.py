@@ -0,0 +1,15 @@
+import main
+
+
+def test_caminho_desconhecido_usa_o_resumo():
+    main._cache_layouts.clear()
+    for caminho in ['/x', '/y/z', None, '/', '/temporal']:
+        main.display_page(caminho)
+    assert sorted(caminho for caminho, _ in main._cache_layouts) == ['/', '/temporal']
+
+
+def test_pagina_de_pares_roteada():
+    layout = main.display_page('/pair')
+    assert layout is main._cache_layouts[('/pair', main.versao_dataset())]
+    saidas = ' '.join(main.app.callback_map)
+    assert 'pair-accuracy.figure' in saidas and 'direction-distribution.figure' in saidas
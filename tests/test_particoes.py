@@ -0,0 +1,35 @@
+import os
+
+import particoes
+
+
+def _gravar(diretorio, df):
+    for dia, grupo in df.groupby(df['timestamp'].dt.date):
+        grupo.assign(timestamp=grupo['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')).to_csv(
+            os.path.join(diretorio, f'{dia}.csv'), index=False)
+
+
+def test_manifesto_em_memoria(df, tmp_path, monkeypatch):
+    _gravar(tmp_path, df.iloc[:-1])
+    diretorio = str(tmp_path)
+    manifesto = particoes.obter_manifesto(diretorio)
+    assert sum(e['linhas'] for e in manifesto.values()) == len(df) - 1
+
+    leituras = []
+    atualizar = particoes.atualizar_manifesto
+    monkeypatch.setattr(particoes, 'atualizar_manifesto', lambda d: leituras.append(d) or atualizar(d))
+    assert particoes.obter_manifesto(diretorio) is manifesto
+    assert not leituras
+
+    # Linha anexada ao último arquivo: só ele é descrito de novo
+    ultimo = max(manifesto)
+    linha = df.iloc[-1:].assign(timestamp=df['timestamp'].iloc[-1].strftime('%Y-%m-%d %H:%M:%S'))
+    with open(os.path.join(diretorio, ultimo), 'a') as f:
+        linha.to_csv(f, header=False, index=False)
+    assert particoes.obter_manifesto(diretorio)[ultimo]['linhas'] == manifesto[ultimo]['linhas'] + 1
+    assert not leituras
+
+    # Arquivo novo muda o diretório e relê o manifesto
+    linha.to_csv(os.path.join(diretorio, '2099-01-01.csv'), index=False)
+    assert '2099-01-01.csv' in particoes.obter_manifesto(diretorio)
+    assert leituras == [diretorio]
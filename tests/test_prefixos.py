@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+import prefixos
+from prefixos import IndicePrefixos
+
+
+def _esperado(df, inicio=None, fim=None, par=None):
+    if inicio is not None:
+        df = df[df['timestamp'] >= inicio]
+    if fim is not None:
+        df = df[df['timestamp'] <= fim]
+    if par is not None:
+        df = df[df['par'] == par]
+    return {'n': len(df),
+            'acertos_acerto_sem_delta': int(df['acerto_sem_delta'].sum()),
+            'acertos_acerto_com_delta': int(df['acerto_com_delta'].sum())}
+
+
+def _conferir(indice, df):
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        inicio, fim = sorted(rng.choice(df['timestamp'].to_numpy(), 2))
+        par = rng.choice([None, *df['par'].unique()])
+        assert indice.consultar(inicio, fim, par) == _esperado(df, inicio, fim, par)
+    assert indice.consultar() == _esperado(df)
+    pd.testing.assert_frame_equal(indice.por_periodo(), prefixos.agregar_por_periodo(df),
+                                  check_names=False, check_freq=False, check_index_type=False)
+
+
+def test_estendido_duas_vezes_do_mesmo_pai(df):
+    pai = IndicePrefixos.construir(df.iloc[:1000]).estendido(df.iloc[1000:1003])
+    a = pai.estendido(df.iloc[1003:1500])
+    # Ramo concorrente com linhas diferentes (timestamps posteriores aos do pai)
+    b = pai.estendido(df.iloc[2000:2100])
+    neto = a.estendido(df.iloc[1500:1510])
+    _conferir(pai, df.iloc[:1003])
+    _conferir(a, df.iloc[:1500])
+    _conferir(b, pd.concat([df.iloc[:1003], df.iloc[2000:2100]]))
+    _conferir(neto, df.iloc[:1510])
+
+
+def test_cortado(df):
+    indice = IndicePrefixos.construir(df.iloc[:2000]).estendido(df.iloc[2000:2500])
+    cortado = indice.cortado(df['timestamp'].iloc[700])
+    _conferir(cortado, df.iloc[700:2500])
+    _conferir(cortado.estendido(df.iloc[2500:2600]), df.iloc[700:2600])
+    _conferir(indice.estendido(df.iloc[2500:2550]), df.iloc[:2550])
+    _conferir(cortado, df.iloc[700:2500])
+    _conferir(indice, df.iloc[:2500])
@@ -0,0 +1,16 @@
+import numpy as np
+import pandas as pd
+
+import renderizacao
+
+
+def test_traces_com_as_mesmas_faixas():
+    a = pd.Series(pd.date_range('2024-01-01', periods=50, freq='7min'))
+    b = pd.Series(pd.date_range('2024-01-01 03:00', periods=80, freq='3min'))
+    bordas = renderizacao.bordas_faixas(a, b, bins=20)
+    barras = [renderizacao.barras_intervalos(x, np.ones(len(x)), True, bordas) for x in (a, b)]
+    # Centros de faixa de um trace são um subconjunto das faixas comuns
+    centros = pd.to_datetime(((bordas[:-1] + bordas[1:]) / 2).astype('int64'))
+    for barra in barras:
+        assert set(pd.to_datetime(barra.x)) <= set(centros)
+    assert sum(barra.customdata.sum() for barra in barras) == len(a) + len(b)
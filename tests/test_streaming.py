@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from streaming import METRICAS_QUANTIS, IndiceQuantis
+
+
+def _qcut(df, metrica, q=4):
+    valores = METRICAS_QUANTIS[metrica](df)
+    faixas = pd.qcut(valores, q, duplicates='drop')
+    grupos = df.groupby(faixas, observed=True)
+    return pd.DataFrame({
+        'total': grupos.size().to_numpy(),
+        'taxa_acerto_sem_delta': grupos['acerto_sem_delta'].mean().to_numpy() * 100,
+        'taxa_acerto_com_delta': grupos['acerto_com_delta'].mean().to_numpy() * 100,
+    })
+
+
+def test_bins_reprodutiveis(df):
+    indice = IndiceQuantis().atualizar(df)
+    pd.testing.assert_frame_equal(indice.bins('erro_sem'), indice.bins('erro_sem'))
+    pd.testing.assert_frame_equal(indice.bins('erro_sem'), IndiceQuantis().atualizar(df).bins('erro_sem'))
+
+
+def test_bins_proximos_do_qcut(df):
+    # Índice montado em duas partes (como nas extensões do snapshot)
+    indice = IndiceQuantis().atualizar(df.iloc[:2000]).copiar().atualizar(df.iloc[2000:])
+    for metrica in METRICAS_QUANTIS:
+        res = indice.bins(metrica)
+        esperado = _qcut(df, metrica)
+        assert len(res) == len(esperado)
+        # Contagens exatas: todas as linhas válidas caem em alguma faixa
+        assert res['total'].sum() == METRICAS_QUANTIS[metrica](df).notna().sum()
+        # Bordas aproximadas: cada faixa fica a poucos % do quartil exato
+        np.testing.assert_allclose(res['total'], esperado['total'], rtol=0.05)
+        for coluna in ['taxa_acerto_sem_delta', 'taxa_acerto_com_delta']:
+            np.testing.assert_allclose(res[coluna], esperado[coluna], atol=2.5)
+
+
+def test_bins_filtrados(df):
+    indice = IndiceQuantis().atualizar(df)
+    par = df['par'].iloc[0]
+    res = indice.bins('erro_com', pair=par)
+    assert res['total'].sum() == (df['par'] == par).sum()
@@ -1,17 +1,183 @@
+import os
+import threading
+import time
 import pandas as pd
 import io
 from dash import dcc
+import dataset
+from dados import DADOS_DIR, carregar, fonte, preparar, ler_novas_linhas
+from shared_data import DIRETORIO as SHARED_DIR, carregar_compartilhado
+import particoes
+import perfil_inicio
+from config import DATASETS, RETENCAO_DIAS
 
-# Carregar e preparar os dados
-df = pd.read_csv('dados.csv')
-df['timestamp'] = pd.to_datetime(df['timestamp'])
-df['hour'] = df['timestamp'].dt.hour
-df['day_of_week'] = df['timestamp'].dt.day_name()
-df['period_of_day'] = pd.cut(df['hour'], bins=[0, 6, 12, 18, 24], labels=['Madrugada', 'Manhã', 'Tarde', 'Noite'], right=False)
-df['diff_previsao'] = df['valor_real'] - df['previsao']
-df['diff_previsao_com_delta'] = df['valor_real'] - df['previsao_com_delta']
-df['movement_magnitude'] = df['valor_real'].diff().abs()
-volatility = df.groupby(['hour', 'day_of_week'])['valor_real'].std().reset_index(name='volatility')
+# ==============================
+# FONTES DOS DATASETS
+# ==============================
+
+# Uma Fonte por dataset nomeado (dataset.registrar): de onde vêm as linhas e até onde a
+# ingestão incremental já leu. A padrão segue DASHBOARD_DADOS / DASHBOARD_DADOS_DIR /
+# DASHBOARD_SHARED_DIR; as de DASHBOARD_DATASETS são CSVs, um por modelo.
+class Fonte:
+    def __init__(self, nome, caminho, carregador, particionado=False, compartilhado=False):
+        self.nome = nome
+        self.caminho = caminho
+        self.carregador = carregador
+        self.particionado = particionado
+        self.compartilhado = compartilhado
+        self.offsets = {}
+        self.colunas = None
+        self.ultima_ingestao = 0.0
+        self.trava = threading.Lock()
+
+    def _versao(self, texto):
+        # A versão muda quando os dados mudam (chave de ETag e de caches); o nome separa os datasets
+        return texto if self.nome == dataset.PADRAO else f'{self.nome}-{texto}'
+
+    def _ler(self):
+        # Tamanho do(s) arquivo(s) antes da carga: a ingestão continua a partir daqui
+        if self.particionado:
+            offsets = particoes.offsets_iniciais(self.caminho)
+            colunas = particoes.colunas(self.caminho)
+        else:
+            offsets = {self.caminho: os.path.getsize(self.caminho)}
+            colunas = pd.read_csv(self.caminho, nrows=0).columns.tolist()
+        # Com DASHBOARD_SHARED_DIR os workers mapeiam as colunas já preparadas (somente leitura)
+        if self.compartilhado:
+            df = carregar_compartilhado(SHARED_DIR, self.caminho, self.carregador)
+        else:
+            df = self.carregador(self.caminho)
+        versao = self._versao(f"{len(df)}-{df['timestamp'].max().value}-{os.stat(self.caminho).st_mtime_ns}")
+        # Snapshot com df + volatilidade + quantis + KPIs e os derivados registrados; ver dataset.py
+        # Acumuladores sobre todas as linhas; depois as antigas viram agregados (RETENCAO_DIAS)
+        snapshot = dataset.Snapshot.construir(df, versao)
+        with perfil_inicio.fase('derivações: retenção'):
+            snapshot = snapshot.compactar(RETENCAO_DIAS, versao)
+        return snapshot, offsets, colunas
+
+    def carregar(self):
+        # Carregador do registro (primeiro pedido ou depois de uma descarga)
+        snapshot, self.offsets, self.colunas = self._ler()
+        self.ultima_ingestao = 0.0
+        return snapshot
+
+    def ingerir(self, intervalo_minimo=0.0):
+        # Várias sessões podem pedir ao mesmo tempo; só uma lê o arquivo por intervalo
+        with self.trava:
+            atual = dataset.atual(self.nome)
+            # Só a última linha: o df completo do snapshot não é montado na ingestão
+            ultima = atual.ultimas(1)
+            if time.monotonic() - self.ultima_ingestao < intervalo_minimo:
+                return ultima.iloc[:0]
+            self.ultima_ingestao = time.monotonic()
+            if self.particionado:
+                novas, self.offsets = particoes.ler_novas_linhas_diretorio(self.caminho, self.offsets, self.colunas)
+            else:
+                novas, offset = ler_novas_linhas(self.caminho, self.offsets[self.caminho], self.colunas)
+                self.offsets = {self.caminho: offset}
+            if novas.empty:
+                return ultima.iloc[:0]
+            novas = preparar(novas, anterior=ultima)
+            # Linhas gravadas durante a carga inicial já estão no df
+            novas = novas[novas['timestamp'] > ultima['timestamp'].max()]
+            if novas.empty:
+                return ultima.iloc[:0]
+            versao = self._versao(f"{len(atual) + len(novas)}-{novas['timestamp'].max().value}-{sum(self.offsets.values())}")
+            dataset.publicar(atual.estender(novas, versao).compactar(RETENCAO_DIAS), self.nome)
+            return novas
+
+    def recarregar(self):
+        # Relê a fonte inteira e reconstrói todas as estruturas derivadas antes da troca;
+        # requests em andamento continuam com o snapshot anterior
+        inicio = time.perf_counter()
+        with self.trava:
+            anterior = dataset.atual(self.nome)
+            snapshot, offsets, colunas = self._ler()
+            snapshot.aquecer()
+            dataset.publicar(snapshot, self.nome)
+            self.offsets, self.colunas = offsets, colunas
+        return {
+            'dataset': self.nome,
+            'duracao_s': round(time.perf_counter() - inicio, 3),
+            'linhas_antes': len(anterior),
+            'linhas_depois': len(snapshot),
+            'linhas_adicionadas': len(snapshot) - len(anterior),
+            'versao': snapshot.versao,
+        }
+
+
+def _criar_fontes():
+    caminho, carregador = fonte()
+    fontes = {dataset.PADRAO: Fonte(dataset.PADRAO, caminho, carregador,
+                                    particionado=bool(DADOS_DIR), compartilhado=bool(SHARED_DIR))}
+    for item in filter(None, (parte.strip() for parte in DATASETS.split(','))):
+        nome, _, caminho = item.rpartition('=')
+        nome = nome.strip() or os.path.splitext(os.path.basename(caminho))[0]
+        fontes[nome] = Fonte(nome, caminho.strip(), carregar)
+    return fontes
+
+fontes = _criar_fontes()
+for _nome, _fonte in fontes.items():
+    dataset.registrar(_nome, _fonte.carregar)
+
+# O padrão é carregado na partida; os demais no primeiro pedido
+with perfil_inicio.fase('dados: carga e snapshot inicial'):
+    dataset.atual(dataset.PADRAO)
+
+def versao_dataset():
+    return dataset.atual().versao
+
+def _diretorio_particionado():
+    # Diretório do dataset selecionado quando ele é particionado
+    atual = fontes.get(dataset.selecionado())
+    return atual.caminho if atual is not None and atual.particionado else None
+
+# Intervalo total disponível (inclui os agregados da retenção e, no modo particionado,
+# o que ainda não foi carregado)
+def limites_datas(snapshot):
+    df = snapshot.df
+    inicio, fim = df['timestamp'].min(), df['timestamp'].max()
+    if not snapshot.compactado.empty:
+        inicio = min(inicio, snapshot.compactado['hora'].min())
+    diretorio = _diretorio_particionado()
+    if diretorio:
+        inicio_dir, fim_dir = particoes.limites(particoes.obter_manifesto(diretorio))
+        if inicio_dir is not None:
+            inicio, fim = min(inicio, inicio_dir), max(fim, fim_dir)
+    return inicio, fim
+
+# Opções do filtro de dia da semana do snapshot (montadas a cada layout, não na importação)
+DIAS_SEMANA = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+def opcoes_dias(snapshot):
+    dias = sorted(snapshot.filtros.valores('day_of_week'), key=DIAS_SEMANA.index)
+    return [{'label': dia, 'value': dia} for dia in dias] + [{'label': 'Todos', 'value': 'Todos'}]
+
+def em_memoria(df, start_date=None):
+    # False quando, no modo particionado, o intervalo começa antes do que está carregado
+    return not (_diretorio_particionado() and start_date is not None
+                and pd.Timestamp(start_date) < df['timestamp'].min())
+
+def dados_intervalo(df, start_date=None, end_date=None, pair=None):
+    # Linhas do intervalo pedido; no modo particionado, se o intervalo começa antes do que
+    # está em memória, lê só as partições que cruzam o intervalo (e o par)
+    dados = df
+    if not em_memoria(df, start_date):
+        dados = particoes.carregar(_diretorio_particionado(), start_date, end_date, pair)
+    if start_date is not None:
+        dados = dados[dados['timestamp'] >= start_date]
+    if end_date is not None:
+        dados = dados[dados['timestamp'] <= end_date]
+    if pair not in (None, 'Todos'):
+        dados = dados[dados['par'] == pair]
+    return dados
+
+# Ingestão incremental: linhas anexadas ao CSV viram um snapshot novo (o anterior não é alterado)
+def ingerir(intervalo_minimo=0.0, nome=None):
+    return fontes[nome or dataset.selecionado()].ingerir(intervalo_minimo)
+
+def recarregar(nome=None):
+    return fontes[nome or dataset.selecionado()].recarregar()
 
 # Função para calcular métricas
 def calculate_metrics(df, group_by, categorical=False):
@@ -19,18 +185,17 @@ def calculate_metrics(df, group_by, categorical=False):
         'acerto_sem_delta': ['mean', 'count'],
         'acerto_com_delta': ['mean', 'count']
     }).reset_index()
-    metrics.columns = [group_by if isinstance(group_by, str) else '_'.join(group_by), 'taxa_acerto_sem_delta', 'total_previsoes_sem_delta',
-                      'taxa_acerto_com_delta', 'total_previsoes_com_delta']
+    chaves = [group_by] if isinstance(group_by, str) else list(group_by)
+    metrics.columns = chaves + ['taxa_acerto_sem_delta', 'total_previsoes_sem_delta',
+                                'taxa_acerto_com_delta', 'total_previsoes_com_delta']
     metrics['taxa_acerto_sem_delta'] = metrics['taxa_acerto_sem_delta'] * 100
     metrics['taxa_acerto_com_delta'] = metrics['taxa_acerto_com_delta'] * 100
     return metrics
 
 # Função para exportar dados filtrados
 def export_data(df, pair, start_date, end_date, day):
-    filtered_df = df.copy()
-    if pair != 'Todos':
-        filtered_df = filtered_df[filtered_df['par'] == pair]
-    filtered_df = filtered_df[(filtered_df['timestamp'] >= start_date) & (filtered_df['timestamp'] <= end_date)]
+    # Datas ausentes (página sem seletor de intervalo) não filtram
+    filtered_df = dados_intervalo(df, start_date, end_date, pair)
     if day != 'Todos':
         filtered_df = filtered_df[filtered_df['day_of_week'] == day]
     
@@ -0,0 +1,4 @@
+# Ponto de entrada WSGI (ex.: gunicorn -c gunicorn.conf.py wsgi:server)
+from main import app
+
+server = app.server